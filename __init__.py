@@ -1,6 +1,6 @@
 """
 Backup Universal - Sistema modular de backup
-Versão 1.1 - Modularizada com config.json
+Versão 1.2 - Modularizada com config.json
 
 Sistema completo de backup com:
 - Compressão em múltiplos formatos (tar.gz, zip)
@@ -10,16 +10,27 @@ Sistema completo de backup com:
 - Limpeza automática
 """
 
-__version__ = "1.2.0"
-__author__ = "Pedro Montezuma"
-__license__ = "MIT"
+import importlib
+import warnings
 
-from backup.config import Config
-from backup.core import BackupManager, ExclusionFilter, IntegrityChecker
-from backup.storage import BackupIndex, CleanupManager
-from backup.restore import RestoreManager
+from backup._version import __version__, __author__, __license__
 
-__all__ = [
+# Mapeia cada símbolo público para o módulo que o define.
+# Os submódulos só são importados no primeiro acesso (PEP 562),
+# evitando carregar tarfile/zipfile/hashlib sem necessidade.
+# Reexportar pela raiz está obsoleto: importe direto do submódulo
+# (ex: `from backup.restore import RestoreManager`).
+_LAZY_IMPORTS = {
+    'Config': 'backup.config',
+    'BackupManager': 'backup.core',
+    'ExclusionFilter': 'backup.core',
+    'IntegrityChecker': 'backup.core',
+    'BackupIndex': 'backup.storage',
+    'CleanupManager': 'backup.storage',
+    'RestoreManager': 'backup.restore',
+}
+
+__all__ = (
     'Config',
     'BackupManager',
     'ExclusionFilter',
@@ -27,4 +38,25 @@ __all__ = [
     'BackupIndex',
     'CleanupManager',
     'RestoreManager'
-]
+)
+
+
+def __getattr__(name):
+    """Importa sob demanda os símbolos públicos do pacote"""
+    if name in _LAZY_IMPORTS:
+        module_name = _LAZY_IMPORTS[name]
+        warnings.warn(
+            f"'from backup import {name}' está obsoleto; "
+            f"use 'from {module_name} import {name}'",
+            DeprecationWarning,
+            stacklevel=2
+        )
+        module = importlib.import_module(module_name)
+        value = getattr(module, name)
+        globals()[name] = value  # Cache: próximos acessos não passam por aqui
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_IMPORTS))
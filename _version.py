@@ -0,0 +1,9 @@
+"""
+Metadados de versão do Backup Universal
+Módulo sem imports: pode ser lido pelo setup.py e por ferramentas externas
+sem carregar o restante do pacote.
+"""
+
+__version__ = "1.2.0"
+__author__ = "Pedro Montezuma"
+__license__ = "MIT"
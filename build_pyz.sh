@@ -0,0 +1,46 @@
+#!/bin/bash
+#
+# Backup Universal - Build .pyz
+# Empacota o sistema em um único arquivo zip contendo apenas bytecode (.pyc).
+# O zipimport lê todos os módulos de um só arquivo, evitando as sondagens de
+# .py/.pyc/__pycache__ feitas a cada import (útil em NFS e containers).
+#
+# Uso:
+#   ./build_pyz.sh [saida.pyz]
+#   python3 saida.pyz --config /caminho/config.json --listar-backups
+#
+
+set -euo pipefail
+
+# Diretório do script (raiz do pacote `backup`)
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+OUTPUT="$(realpath -m "${1:-backup.pyz}")"
+
+STAGING="$(mktemp -d)"
+trap 'rm -rf "$STAGING"' EXIT
+
+# Copia apenas o código do pacote (sem testes, docs e exemplos)
+mkdir -p "$STAGING/backup"
+cp "$SCRIPT_DIR"/*.py "$STAGING/backup/"
+for pkg in core storage restore utils; do
+    cp -r "$SCRIPT_DIR/$pkg" "$STAGING/backup/"
+done
+rm -f "$STAGING/backup/setup.py"
+find "$STAGING" -name "__pycache__" -type d -prune -exec rm -rf {} +
+
+# Compila para .pyc ao lado do fonte (-b) e remove os .py
+python3 -m compileall -q -b "$STAGING/backup"
+find "$STAGING/backup" -name "*.py" -delete
+
+# Ponto de entrada do zip: equivale a `python3 -m backup`
+cat > "$STAGING/__main__.py" <<'PY'
+from backup.cli import main
+
+main()
+PY
+
+rm -f "$OUTPUT"
+(cd "$STAGING" && python3 -m zipfile -c "$OUTPUT" __main__.py backup)
+
+echo "✅ Pacote gerado: $OUTPUT"
+echo "💡 O config.json padrão não é lido de dentro do .pyz; use --config"
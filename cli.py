@@ -7,16 +7,43 @@ Interface principal do sistema de backup
 import argparse
 import sys
 from pathlib import Path
+from typing import List, Optional
 
-from backup.config import Config
-from backup.core.backup_manager import BackupManager
-from backup.storage.cleanup import CleanupManager
-from backup.restore.restore_manager import RestoreManager
+# Os gerenciadores (e com eles tarfile, zipfile, hashlib...) são importados
+# só no ramo que os usa: --help e erros de argumento não pagam esse custo
+
+
+class ArgumentParser(argparse.ArgumentParser):
+    """
+    Parser que aceita argumentos vindos de arquivo (@arquivo)
+    
+    Cada linha do arquivo é dividida como no shell: vários argumentos por
+    linha, aspas para valores com espaço e '#' para comentários.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('fromfile_prefix_chars', '@')
+        super().__init__(*args, **kwargs)
+    
+    def convert_arg_line_to_args(self, arg_line: str) -> List[str]:
+        import shlex  # Só carregado quando há arquivo de argumentos
+        return shlex.split(arg_line, comments=True)
+
+
+class _ActionParserError(Exception):
+    """Erro do parser mínimo: quem decide e informa é o parser completo"""
+
+
+class _ActionParser(ArgumentParser):
+    """Parser mínimo das ações sem backup; não imprime erros nem encerra"""
+    
+    def error(self, message: str):
+        raise _ActionParserError(message)
 
 
 def create_parser() -> argparse.ArgumentParser:
     """Cria e configura o parser de argumentos"""
-    parser = argparse.ArgumentParser(
+    parser = ArgumentParser(
         description="Script de backup universal de diretórios",
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
@@ -30,6 +57,8 @@ EXEMPLOS DE USO:
   python3 -m backup --listar-backups                   # Lista backups existentes
   python3 -m backup --limpar-antigos                   # Remove backups antigos
   python3 -m backup --restaurar                        # Interface de restauração
+  python3 -m backup --atualizar-hashes                 # Migra backups antigos de MD5 para SHA-256
+  python3 -m backup @diario.args                       # Argumentos lidos de arquivo
         """
     )
     
@@ -62,8 +91,9 @@ EXEMPLOS DE USO:
     
     parser.add_argument(
         '--formato',
-        choices=['tar', 'zip'],
-        help='Formato de compressão: "tar" para .tar.gz (Linux/macOS), "zip" para .zip (Windows)'
+        choices=['tar', 'tar.zst', 'zip'],
+        help='Formato de compressão: "tar" para .tar.gz (Linux/macOS), "tar.zst" para .tar.zst '
+             '(mais rápido, requer zstandard), "zip" para .zip (Windows)'
     )
     
     parser.add_argument(
@@ -84,6 +114,12 @@ EXEMPLOS DE USO:
         help='Interface interativa para restaurar backups'
     )
     
+    parser.add_argument(
+        '--atualizar-hashes',
+        action='store_true',
+        help='Registra SHA-256 nos backups antigos que só têm MD5 (conferindo o MD5 antes)'
+    )
+    
     parser.add_argument(
         '--config',
         help='Caminho para arquivo config.json alternativo'
@@ -92,11 +128,68 @@ EXEMPLOS DE USO:
     return parser
 
 
+# Ações que não criam backup: além da própria flag, só consomem --config e
+# --excluir, então dispensam montar o parser completo
+ACTION_FLAGS = {
+    '--listar-backups': 'listar_backups',
+    '--limpar-antigos': 'limpar_antigos',
+    '--restaurar': 'restaurar',
+    '--atualizar-hashes': 'atualizar_hashes',
+}
+
+
+def _sniff_action(argv: List[str]) -> Optional[str]:
+    """Identifica uma ação sem backup em argv (None se for backup ou ajuda)"""
+    if '-h' in argv or '--help' in argv:
+        return None  # A ajuda sempre mostra todas as opções
+    for flag in ACTION_FLAGS:
+        if flag in argv:
+            return flag
+    return None
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """
+    Interpreta os argumentos, com um parser mínimo para ações sem backup
+    
+    Qualquer argumento que o parser mínimo não reconheça (opções de backup,
+    abreviações, erros de digitação), ou qualquer erro dele (valor faltando,
+    por exemplo), faz cair no parser completo, que aceita ou rejeita
+    exatamente como antes, com a mesma mensagem e o mesmo uso.
+    
+    Args:
+        argv: Argumentos (padrão: sys.argv[1:])
+        
+    Returns:
+        Namespace com os argumentos usados por main()
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    
+    flag = _sniff_action(argv)
+    if flag is not None:
+        parser = _ActionParser(add_help=False, allow_abbrev=False)
+        parser.add_argument(flag, action='store_true')
+        parser.add_argument('--config')
+        parser.add_argument('--excluir')
+        parser.set_defaults(**{dest: False for dest in ACTION_FLAGS.values()})
+        try:
+            args, extras = parser.parse_known_args(argv)
+        except _ActionParserError:
+            pass
+        else:
+            if not extras:
+                return args
+    
+    return create_parser().parse_args(argv)
+
+
 def main():
     """Função principal do CLI"""
     try:
-        parser = create_parser()
-        args = parser.parse_args()
+        args = parse_args()
+        
+        from backup.config import Config
         
         # Carrega configuração
         try:
@@ -111,31 +204,52 @@ def main():
             print(f"❌ Erro ao carregar configuração: {e}")
             sys.exit(1)
         
-        # Inicializa gerenciadores
-        backup_manager = BackupManager(config)
-        cleanup_manager = CleanupManager(backup_manager.index, config.backup_destination)
-        restore_manager = RestoreManager(backup_manager.index, config.backup_destination)
-        
-        # Adiciona padrões de exclusão customizados
+        # Adiciona padrões de exclusão customizados (salvos no config.json,
+        # numa única gravação)
         if args.excluir:
-            backup_manager.add_custom_exclusions(args.excluir)
+            config.add_custom_patterns(
+                p.strip() for p in args.excluir.split(',') if p.strip()
+            )
             print(f"🚫 Padrões de exclusão adicionais: {args.excluir}")
         
         # Executa ação baseada nos argumentos
         if args.listar_backups:
-            restore_manager.list_available_backups()
+            from backup.storage.index import BackupIndex
+            from backup.restore.restore_manager import RestoreManager
+            
+            index = BackupIndex(config.index_file)
+            RestoreManager(index, config.backup_destination).list_available_backups()
             
         elif args.limpar_antigos:
-            cleanup_manager.cleanup_old_backups(
+            from backup.storage.index import BackupIndex
+            from backup.storage.cleanup import CleanupManager
+            
+            index = BackupIndex(config.index_file)
+            CleanupManager(index, config.backup_destination).cleanup_old_backups(
                 days_to_keep=config.days_to_keep,
                 max_per_directory=config.max_backups_per_directory
             )
             
         elif args.restaurar:
-            restore_manager.interactive_restore()
+            from backup.storage.index import BackupIndex
+            from backup.restore.restore_manager import RestoreManager
+            
+            index = BackupIndex(config.index_file)
+            RestoreManager(index, config.backup_destination).interactive_restore()
+            
+        elif args.atualizar_hashes:
+            from backup.storage.index import BackupIndex
+            from backup.restore.restore_manager import RestoreManager
+            
+            index = BackupIndex(config.index_file)
+            if not RestoreManager(index, config.backup_destination).upgrade_hashes():
+                print("✅ Nenhum backup precisa de atualização de hash")
             
         else:
-            # Executa backup
+            from backup.core.backup_manager import BackupManager
+            
+            # Executa backup (o filtro já inclui os padrões de --excluir)
+            backup_manager = BackupManager(config)
             compression_level = 9 if args.compressao_maxima else None
             
             sucesso = backup_manager.create_backup(
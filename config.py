@@ -3,13 +3,46 @@ Módulo de Configuração
 Gerencia o carregamento e validação de configurações do sistema de backup.
 """
 
+import copy
 import json
+import os
+import tempfile
+from functools import cached_property
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # Opcional: pip install backup-universal[json]
+    orjson = None
+
+
+# Configurações já lidas: {caminho: ((st_mtime_ns, st_size), dados, bytes)}.
+# Um novo Config() do mesmo arquivo, sem alteração em disco, reaproveita o dict
+# sem reler nem reparsear o JSON.
+_CACHE: Dict[str, Tuple[Tuple[int, int], Dict[str, Any], bytes]] = {}
+
+
+def _loads(raw: bytes) -> Any:
+    """Desserializa o config.json (orjson se disponível)"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _dumps(data: Dict[str, Any]) -> bytes:
+    """Serializa o config.json (indentado, legível para edição manual)"""
+    return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
 
 
 class Config:
-    """Gerenciador de configurações do sistema de backup"""
+    """
+    Gerenciador de configurações do sistema de backup
+    
+    As propriedades são memorizadas por instância (cached_property): o
+    caminho do destino, por exemplo, é expandido e criado uma só vez. O
+    cache é descartado a cada load() e save().
+    """
     
     DEFAULT_CONFIG_PATH = Path(__file__).parent / "config.json"
     
@@ -22,36 +55,104 @@ class Config:
         """
         self.config_path = config_path or self.DEFAULT_CONFIG_PATH
         self._config: Dict[str, Any] = {}
+        # True enquanto _config é o dict compartilhado via _CACHE
+        self._shared = False
+        # Conteúdo atual do arquivo em disco (lido ou gravado por último)
+        self._on_disk: Optional[bytes] = None
         self.load()
         
     def load(self) -> None:
-        """Carrega configurações do arquivo JSON"""
-        if not self.config_path.exists():
+        """
+        Carrega configurações do arquivo JSON
+        
+        O arquivo só é relido se mudou em disco (mtime ou tamanho) desde a
+        última leitura; caso contrário o dict em cache é compartilhado e só
+        copiado na primeira modificação.
+        """
+        try:
+            st = self.config_path.stat()
+        except FileNotFoundError:
             raise FileNotFoundError(
                 f"Arquivo de configuração não encontrado: {self.config_path}\n"
                 f"Execute o script de instalação ou crie o config.json manualmente."
             )
         
-        try:
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                self._config = json.load(f)
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Erro ao parsear config.json: {e}")
+        chave = str(self.config_path)
+        assinatura = (st.st_mtime_ns, st.st_size)
+        cached = _CACHE.get(chave)
+        if cached is not None and cached[0] == assinatura:
+            _, self._config, self._on_disk = cached
+        else:
+            raw = self.config_path.read_bytes()
+            try:
+                self._config = _loads(raw)
+            except json.JSONDecodeError as e:  # orjson.JSONDecodeError herda dela
+                raise ValueError(f"Erro ao parsear config.json: {e}")
+            self._on_disk = raw
+            _CACHE[chave] = (assinatura, self._config, raw)
+        self._shared = True
+        self._invalidate()
+    
+    def _invalidate(self) -> None:
+        """Descarta os valores memorizados pelas propriedades"""
+        for name, attr in vars(type(self)).items():
+            if isinstance(attr, cached_property):
+                self.__dict__.pop(name, None)
+    
+    def _own(self) -> None:
+        """Copia o dict compartilhado antes de modificá-lo (copy-on-write)"""
+        if self._shared:
+            self._config = copy.deepcopy(self._config)
+            self._shared = False
     
     def save(self) -> None:
-        """Salva configurações no arquivo JSON"""
-        with open(self.config_path, 'w', encoding='utf-8') as f:
-            json.dump(self._config, f, indent=2, ensure_ascii=False)
+        """
+        Salva configurações no arquivo JSON
+        
+        Nada é gravado se o conteúdo não mudou. A gravação é atômica: o JSON
+        vai para um temporário no mesmo diretório, que substitui o arquivo
+        com os.replace(), então uma queda no meio nunca deixa o config.json
+        pela metade.
+        """
+        data = _dumps(self._config)
+        if data == self._on_disk:
+            return
+        
+        fd, tmp_name = tempfile.mkstemp(
+            dir=self.config_path.parent, prefix=self.config_path.name + '.', suffix='.tmp'
+        )
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            try:
+                # mkstemp cria com 0600; mantém as permissões do original
+                os.chmod(tmp_name, self.config_path.stat().st_mode & 0o7777)
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_name, self.config_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            raise
+        
+        # O arquivo gravado passa a ser a versão em cache
+        st = self.config_path.stat()
+        self._on_disk = data
+        _CACHE[str(self.config_path)] = ((st.st_mtime_ns, st.st_size), self._config, data)
+        self._shared = True
+        self._invalidate()
     
     # === Paths ===
     
-    @property
+    @cached_property
     def default_backup_source(self) -> Path:
         """Diretório padrão de origem para backup"""
         path = self._config.get('paths', {}).get('default_backup_source', '/home/montezuma')
         return Path(path).expanduser()
     
-    @property
+    @cached_property
     def backup_destination(self) -> Path:
         """Diretório onde os backups serão armazenados"""
         path = self._config.get('paths', {}).get('backup_destination', '~/.bin/data/backups/archives')
@@ -59,89 +160,125 @@ class Config:
         dest.mkdir(parents=True, exist_ok=True)
         return dest
     
-    @property
+    @cached_property
     def temp_dir(self) -> Path:
         """Diretório temporário para operações"""
         path = self._config.get('paths', {}).get('temp_dir', '/tmp/backup-universal')
         return Path(path)
     
-    @property
+    @cached_property
     def index_file(self) -> Path:
         """Arquivo de índice de backups"""
-        return self.backup_destination / "indice_backups.json"
+        return self.backup_destination / "indice_backups.jsonl"
     
     # === Retention Policy ===
     
-    @property
+    @cached_property
     def max_backups_per_directory(self) -> int:
         """Número máximo de backups por diretório"""
         return self._config.get('retention_policy', {}).get('max_backups_per_directory', 5)
     
-    @property
+    @cached_property
     def days_to_keep(self) -> int:
         """Dias para manter backups"""
         return self._config.get('retention_policy', {}).get('days_to_keep', 30)
     
-    @property
+    @cached_property
     def max_total_size_gb(self) -> int:
         """Tamanho máximo total de backups em GB"""
         return self._config.get('retention_policy', {}).get('max_total_size_gb', 50)
     
     # === Compression ===
     
-    @property
+    @cached_property
     def default_format(self) -> str:
-        """Formato padrão de compressão (tar ou zip)"""
+        """Formato padrão de compressão (tar, tar.zst ou zip)"""
         return self._config.get('compression', {}).get('default_format', 'tar')
     
-    @property
+    @cached_property
     def default_compression_level(self) -> int:
         """Nível de compressão padrão (0-9)"""
         return self._config.get('compression', {}).get('default_level', 6)
     
+    # === Integrity ===
+    
+    @cached_property
+    def hash_algorithm(self) -> str:
+        """Algoritmo de hash dos backups novos (md5, sha256 ou blake3)"""
+        return self._config.get('integrity', {}).get('hash_algorithm', 'sha256')
+    
     # === Exclusion Patterns ===
     
-    @property
+    @cached_property
     def default_exclusion_patterns(self) -> List[str]:
-        """Padrões de exclusão padrão"""
-        return self._config.get('exclusion_patterns', {}).get('default', [])
+        """Padrões de exclusão padrão (cópia: a lista em cache é compartilhada)"""
+        return list(self._config.get('exclusion_patterns', {}).get('default', []))
     
-    @property
+    @cached_property
     def custom_exclusion_patterns(self) -> List[str]:
-        """Padrões de exclusão customizados"""
-        return self._config.get('exclusion_patterns', {}).get('custom', [])
+        """Padrões de exclusão customizados (cópia: a lista em cache é compartilhada)"""
+        return list(self._config.get('exclusion_patterns', {}).get('custom', []))
     
     @property
     def all_exclusion_patterns(self) -> List[str]:
-        """Todos os padrões de exclusão (default + custom)"""
+        """
+        Todos os padrões de exclusão (default + custom)
+        
+        Não memorizado: devolve sempre uma lista nova, que o chamador
+        (ExclusionFilter) pode modificar sem afetar a configuração.
+        """
         return self.default_exclusion_patterns + self.custom_exclusion_patterns
     
     def add_custom_pattern(self, pattern: str) -> None:
         """Adiciona um padrão customizado de exclusão"""
         if pattern not in self.custom_exclusion_patterns:
+            self._own()
             self._config.setdefault('exclusion_patterns', {}).setdefault('custom', []).append(pattern)
             self.save()
     
+    def add_custom_patterns(self, patterns: Iterable[str]) -> List[str]:
+        """
+        Adiciona vários padrões customizados com uma única gravação
+        
+        Args:
+            patterns: Padrões a adicionar (repetidos e já existentes são ignorados)
+            
+        Returns:
+            Lista dos padrões efetivamente adicionados
+        """
+        existentes = set(self.custom_exclusion_patterns)
+        novos = []
+        for pattern in patterns:
+            if pattern not in existentes:
+                existentes.add(pattern)
+                novos.append(pattern)
+        
+        if novos:
+            self._own()
+            self._config.setdefault('exclusion_patterns', {}).setdefault('custom', []).extend(novos)
+            self.save()
+        return novos
+    
     def remove_custom_pattern(self, pattern: str) -> None:
         """Remove um padrão customizado de exclusão"""
-        custom = self._config.get('exclusion_patterns', {}).get('custom', [])
-        if pattern in custom:
-            custom.remove(pattern)
+        if pattern in self.custom_exclusion_patterns:
+            self._own()
+            self._config['exclusion_patterns']['custom'].remove(pattern)
             self.save()
     
     # === Notifications ===
     
-    @property
+    @cached_property
     def notifications_enabled(self) -> bool:
         """Se notificações estão habilitadas"""
         return self._config.get('notifications', {}).get('enabled', False)
     
-    @property
+    @cached_property
     def notification_email(self) -> str:
         """Email para notificações"""
         return self._config.get('notifications', {}).get('email', '')
     
-    @property
+    @cached_property
     def notification_webhook(self) -> str:
         """Webhook para notificações"""
         return self._config.get('notifications', {}).get('webhook_url', '')
@@ -149,12 +286,21 @@ class Config:
     # === Utilities ===
     
     def get(self, key: str, default: Any = None) -> Any:
-        """Obtém um valor da configuração"""
-        return self._config.get(key, default)
+        """
+        Obtém um valor da configuração
+        
+        Dicts e listas são devolvidos como cópia: o dict carregado é
+        compartilhado (via _CACHE) com as outras instâncias do mesmo arquivo.
+        """
+        value = self._config.get(key, default)
+        if isinstance(value, (dict, list)):
+            return copy.deepcopy(value)
+        return value
     
     def set(self, key: str, value: Any) -> None:
-        """Define um valor na configuração"""
-        self._config[key] = value
+        """Define um valor na configuração (guardado como cópia)"""
+        self._own()
+        self._config[key] = copy.deepcopy(value)
         self.save()
     
     def __repr__(self) -> str:
@@ -2,18 +2,45 @@
 Core - Módulos principais do sistema de backup
 """
 
-from backup.core.exclusion import ExclusionFilter
-from backup.core.integrity import IntegrityChecker
-from backup.core.compression import Compressor, TarCompressor, ZipCompressor, get_compressor
-from backup.core.backup_manager import BackupManager, BackupStats
+import importlib
 
-__all__ = [
+# Mapeia cada símbolo público para o submódulo que o define. Os submódulos
+# só são importados no primeiro acesso (PEP 562): importar um deles, como
+# backup.core.exclusion, não carrega mais compressão e gerenciador juntos.
+_LAZY_IMPORTS = {
+    'ExclusionFilter': 'backup.core.exclusion',
+    'IntegrityChecker': 'backup.core.integrity',
+    'Compressor': 'backup.core.compression',
+    'TarCompressor': 'backup.core.compression',
+    'TarZstdCompressor': 'backup.core.compression',
+    'ZipCompressor': 'backup.core.compression',
+    'get_compressor': 'backup.core.compression',
+    'BackupManager': 'backup.core.backup_manager',
+    'BackupStats': 'backup.core.backup_manager',
+}
+
+__all__ = (
     'ExclusionFilter',
     'IntegrityChecker',
     'Compressor',
     'TarCompressor',
+    'TarZstdCompressor',
     'ZipCompressor',
     'get_compressor',
     'BackupManager',
     'BackupStats'
-]
+)
+
+
+def __getattr__(name):
+    """Importa sob demanda os símbolos públicos do pacote"""
+    if name in _LAZY_IMPORTS:
+        module = importlib.import_module(_LAZY_IMPORTS[name])
+        value = getattr(module, name)
+        globals()[name] = value  # Cache: próximos acessos não passam por aqui
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_IMPORTS))
@@ -3,6 +3,9 @@ Módulo Backup Manager
 Orquestrador principal do processo de backup
 """
 
+import stat
+import threading
+from concurrent.futures import Future
 from pathlib import Path
 from datetime import datetime
 from typing import Optional, Callable
@@ -12,7 +15,7 @@ from backup.core.exclusion import ExclusionFilter
 from backup.core.integrity import IntegrityChecker
 from backup.storage.index import BackupIndex
 from backup.utils.formatters import format_bytes, format_compression_rate, format_number
-from backup.utils.file_utils import calculate_directory_size, get_directory_info
+from backup.utils.file_utils import scan_directory, get_directory_info
 from backup.utils.user_input import safe_input
 from backup.config import Config
 
@@ -27,7 +30,8 @@ class BackupStats:
         self.original_size = 0
         self.backup_size = 0
         self.compression_rate = 0.0
-        self.hash_md5 = ""
+        self.hash_algo = IntegrityChecker.DEFAULT_ALGORITHM
+        self.hash_digest = ""
         
     def reset(self):
         """Reseta as estatísticas"""
@@ -37,6 +41,11 @@ class BackupStats:
 class BackupManager:
     """Gerenciador principal de backups"""
     
+    # Origem grande e quase toda em formatos já comprimidos (mídia, ISOs...):
+    # grava sem recompressão, já que o compressor seria o gargalo sem ganho
+    AUTO_STORE_MIN_SIZE = 1024 ** 3  # 1GB
+    AUTO_STORE_RATIO = 0.7           # Fração mínima de bytes incomprimíveis
+    
     def __init__(self, config: Config):
         """
         Inicializa o gerenciador de backup
@@ -63,7 +72,7 @@ class BackupManager:
         Args:
             source_path: Caminho de origem (usa padrão se None)
             backup_name: Nome personalizado do backup (opcional)
-            format_type: Formato ('tar' ou 'zip', usa padrão se None)
+            format_type: Formato ('tar', 'tar.zst' ou 'zip', usa padrão se None)
             compression_level: Nível de compressão 0-9 (usa padrão se None)
             silent: Se True, não pede confirmação
             
@@ -82,12 +91,14 @@ class BackupManager:
         if compression_level is None:
             compression_level = self.config.default_compression_level
         
-        # Validações
-        if not source_path.exists():
+        # Validações (um único stat para existência e tipo)
+        try:
+            source_mode = source_path.stat().st_mode
+        except OSError:
             print(f"❌ Erro: Diretório '{source_path}' não encontrado!")
             return False
             
-        if not source_path.is_dir():
+        if not stat.S_ISDIR(source_mode):
             print(f"❌ Erro: '{source_path}' não é um diretório!")
             return False
         
@@ -100,25 +111,25 @@ class BackupManager:
         print(f"📁 Diretório: {source_path}")
         print(f"🏷️  Tipo: {dir_info['tipo']}")
         
-        # Calcula tamanho
-        print("📊 Calculando tamanho do backup...")
-        self.stats.original_size, estimated_files = calculate_directory_size(
-            source_path,
-            self.exclusion_filter
-        )
-        
-        print(f"📈 Arquivos a processar: {format_number(estimated_files)}")
-        print(f"📏 Tamanho estimado: {format_bytes(self.stats.original_size)}")
+        if silent and not format_type:
+            print("❌ O formato de backup deve ser especificado em modo silencioso.")
+            return False
         
-        # Confirmação interativa
-        if not silent:
+        # Varre a origem uma única vez: a mesma lista alimenta o compressor
+        print("📊 Calculando tamanho do backup...")
+        if silent:
+            scan = scan_directory(source_path, self.exclusion_filter)
+        else:
+            # A varredura corre enquanto o usuário responde à confirmação
+            pending_scan = self._scan_in_background(source_path)
             if not self._confirm_backup(dir_name, format_type):
                 print("❌ Backup cancelado pelo usuário.")
                 return False
-        else:
-            if not format_type:
-                print("❌ O formato de backup deve ser especificado em modo silencioso.")
-                return False
+            scan = pending_scan.result()
+        estimated_files = scan.total_files
+        
+        print(f"📈 Arquivos a processar: {format_number(estimated_files)}")
+        print(f"📏 Tamanho estimado: {format_bytes(scan.total_size)}")
         
         # Define nome do arquivo de backup
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -131,25 +142,38 @@ class BackupManager:
         
         backup_path = self.config.backup_destination / filename
         
+        # Desativa a compressão quando não haveria ganho (exceto se máxima pedida)
+        auto_store = self._should_skip_compression(scan, compression_level)
+        if auto_store:
+            compression_level = 0
+        
         # Cria backup
         print(f"\n⏳ Criando backup: {filename}")
         if compression_level >= 9:
             print("🗜️  Usando compressão máxima...")
+        elif auto_store:
+            print(f"📼 {scan.incompressible_ratio:.0%} do conteúdo já é comprimido: "
+                  "gravando sem recompressão...")
         
         # Reset estatísticas
         self.stats.reset()
+        self.stats.original_size = scan.total_size
+        self.stats.hash_algo = self.config.hash_algorithm.lower()
         
         try:
             # Progresso
             progress_tracker = ProgressTracker(estimated_files)
             
-            # Comprime
+            # Comprime, calculando o hash enquanto o arquivo é gravado
+            hasher = IntegrityChecker.new_hasher(self.stats.hash_algo)
             total_files, excluded_files, excluded_dirs = compressor.compress(
                 source_path,
                 backup_path,
                 self.exclusion_filter,
                 progress_callback=progress_tracker.update,
-                compression_level=compression_level
+                compression_level=compression_level,
+                scan=scan,
+                hasher=hasher
             )
             
             self.stats.total_files = total_files
@@ -162,7 +186,7 @@ class BackupManager:
                 self.stats.original_size,
                 self.stats.backup_size
             )
-            self.stats.hash_md5 = IntegrityChecker.calculate_md5(backup_path) or ""
+            self.stats.hash_digest = hasher.hexdigest()
             
             # Registra no índice
             backup_info = {
@@ -177,8 +201,10 @@ class BackupManager:
                 "arquivos_excluidos": self.stats.excluded_files,
                 "diretorios_excluidos": self.stats.excluded_dirs,
                 "tipo_diretorio": dir_info["tipo"],
-                "hash_md5": self.stats.hash_md5,
+                "hash_algo": self.stats.hash_algo,
+                "hash_digest": self.stats.hash_digest,
                 "compressao_maxima": (compression_level >= 9),
+                "compressao_auto_desativada": auto_store,
                 "formato": format_type
             }
             
@@ -199,6 +225,47 @@ class BackupManager:
                     pass
             return False
     
+    def _should_skip_compression(self, scan, compression_level: int) -> bool:
+        """
+        Decide se o backup deve ser gravado sem compressão
+        
+        Args:
+            scan: Varredura da origem
+            compression_level: Nível pedido (compressão máxima nunca é desativada)
+            
+        Returns:
+            True se a origem é grande e quase toda incomprimível
+        """
+        return (
+            compression_level < 9
+            and scan.total_size >= self.AUTO_STORE_MIN_SIZE
+            and scan.incompressible_ratio >= self.AUTO_STORE_RATIO
+        )
+    
+    def _scan_in_background(self, source_path: Path) -> Future:
+        """
+        Inicia a varredura da origem numa thread
+        
+        Thread daemon em vez de executor: se o usuário cancelar, a saída do
+        programa não espera a varredura de uma árvore grande terminar.
+        
+        Args:
+            source_path: Diretório de origem
+            
+        Returns:
+            Future com o DirectoryScan
+        """
+        future: Future = Future()
+        
+        def run():
+            try:
+                future.set_result(scan_directory(source_path, self.exclusion_filter))
+            except BaseException as e:
+                future.set_exception(e)
+        
+        threading.Thread(target=run, name="backup-scan", daemon=True).start()
+        return future
+    
     def _confirm_backup(self, dir_name: str, format_type: str) -> bool:
         """
         Solicita confirmação do usuário
@@ -220,8 +287,9 @@ class BackupManager:
         print("   [1] .tar.gz (Linux/macOS)")
         print("   [2] .zip (Windows)")
         print("      OBS: Para poder descompactar em um Windows")
+        print("   [3] .tar.zst (mais rápido, requer zstandard)")
         
-        formato_opcao = safe_input("   Digite 1 para .tar.gz ou 2 para .zip: ", "❌ Backup cancelado pelo usuário.")
+        formato_opcao = safe_input("   Digite 1 para .tar.gz, 2 para .zip ou 3 para .tar.zst: ", "❌ Backup cancelado pelo usuário.")
         
         if formato_opcao is None:
             return False
@@ -232,15 +300,18 @@ class BackupManager:
             format_type = 'tar'
         elif formato_opcao == '2':
             format_type = 'zip'
+        elif formato_opcao == '3':
+            format_type = 'tar.zst'
         else:
             print("❌ Opção inválida.")
             return False
         
-        # Atualiza formato escolhido
-        self.config.set('compression', {
-            'default_format': format_type,
-            'default_level': self.config.default_compression_level
-        })
+        # Atualiza formato escolhido (só regrava o config.json se mudou)
+        if format_type != self.config.default_format:
+            self.config.set('compression', {
+                'default_format': format_type,
+                'default_level': self.config.default_compression_level
+            })
         
         confirmacao = safe_input("   Digite 's' para continuar ou qualquer tecla para cancelar: ", "❌ Backup cancelado pelo usuário.")
         
@@ -259,7 +330,7 @@ class BackupManager:
         print(f"📏 Tamanho original: {format_bytes(self.stats.original_size)}")
         print(f"🗜️  Tamanho backup: {format_bytes(self.stats.backup_size)}")
         print(f"📉 Compressão: {self.stats.compression_rate:.1f}%")
-        print(f"🔒 Hash MD5: {self.stats.hash_md5[:16]}...")
+        print(f"🔒 Hash {self.stats.hash_algo.upper()}: {self.stats.hash_digest[:16]}...")
         print(f"💾 Localização: {backup_path}")
     
     def add_custom_exclusion(self, pattern: str) -> None:
@@ -271,13 +342,15 @@ class BackupManager:
         """
         Adiciona múltiplos padrões de exclusão
         
+        O config.json é gravado uma só vez para todos os padrões.
+        
         Args:
             patterns_string: String com padrões separados por vírgula
         """
         if patterns_string:
             patterns = [p.strip() for p in patterns_string.split(',') if p.strip()]
-            for pattern in patterns:
-                self.add_custom_exclusion(pattern)
+            self.config.add_custom_patterns(patterns)
+            self.exclusion_filter.add_patterns(patterns)
 
 
 class ProgressTracker:
@@ -288,16 +361,19 @@ class ProgressTracker:
         self.current = 0
         self.last_reported = 0
         self.report_interval = max(100, total_estimated // 50)  # Relata a cada 2%
+        self._next_report = self.report_interval
     
     def update(self, current: int) -> None:
-        """Atualiza progresso"""
+        """Atualiza progresso (só formata e imprime ao atingir o intervalo)"""
         self.current = current
+        if current < self._next_report:
+            return
         
-        if self.current - self.last_reported >= self.report_interval:
-            if self.total_estimated > 0:
-                progress = (self.current / self.total_estimated) * 100
-                print(f"   📦 Progresso: {format_number(self.current)}/{format_number(self.total_estimated)} arquivos ({progress:.1f}%)")
-            else:
-                print(f"   📦 Processados: {format_number(self.current)} arquivos")
-            
-            self.last_reported = self.current
+        if self.total_estimated > 0:
+            progress = (current / self.total_estimated) * 100
+            print(f"   📦 Progresso: {format_number(current)}/{format_number(self.total_estimated)} arquivos ({progress:.1f}%)")
+        else:
+            print(f"   📦 Processados: {format_number(current)} arquivos")
+        
+        self.last_reported = current
+        self._next_report = current + self.report_interval
@@ -3,17 +3,134 @@ Módulo de Compressão
 Classes para compressão de backups em diferentes formatos
 """
 
+import gzip
+import io
 import os
+import re
+import shutil
+import stat
+import subprocess
 import tarfile
+import tempfile
+import threading
+import time
 import zipfile
+import zlib
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Callable, Tuple
+from typing import Optional, Callable, Dict, Tuple, Iterator, BinaryIO, Iterable, List
+
+from backup.core.integrity import HashingWriter
+from backup.utils.file_utils import DirectoryScan, INCOMPRESSIBLE_EXTENSIONS, scan_directory
+
+try:
+    import grp
+    import pwd
+except ImportError:  # Windows
+    grp = pwd = None
+
+# Avisos do GNU tar (com --ignore-failed-read) de arquivo que ficou fora do
+# archive: um por arquivo. "file changed as we read it" não entra: o arquivo
+# foi gravado.
+_TAR_READ_FAILURE = re.compile(
+    r': (?:Warning: )?(?:Cannot open|Cannot stat|File removed before we read it)\b'
+)
+
+# Nível de compressão por entrada no ZipInfo: atributo público a partir do
+# Python 3.13 (compress_level), privado antes (_compresslevel)
+_ZIPINFO_LEVEL_ATTR = (
+    'compress_level' if hasattr(zipfile.ZipInfo, 'compress_level') else '_compresslevel'
+)
+
+
+@lru_cache(maxsize=None)
+def _user_name(uid: int) -> str:
+    """Nome do usuário de um uid (consultado uma vez por uid)"""
+    try:
+        return pwd.getpwuid(uid).pw_name if pwd else ""
+    except KeyError:
+        return ""
+
+
+@lru_cache(maxsize=None)
+def _group_name(gid: int) -> str:
+    """Nome do grupo de um gid (consultado uma vez por gid)"""
+    try:
+        return grp.getgrgid(gid).gr_name if grp else ""
+    except KeyError:
+        return ""
+
+
+@lru_cache(maxsize=None)
+def _is_gnu_tar(tar_bin: str) -> bool:
+    """Se o tar do sistema é o GNU tar (consultado uma vez por executável)"""
+    try:
+        result = subprocess.run([tar_bin, '--version'], stdin=subprocess.DEVNULL,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except OSError:
+        return False
+    return b"GNU tar" in result.stdout
+
+
+def _read_file(file_path: str) -> bytes:
+    """Lê o conteúdo inteiro de um arquivo (executado nas threads de leitura)"""
+    with open(file_path, 'rb') as f:
+        return f.read()
+
+
+class _PaddedReader:
+    """
+    Leitor que entrega exatamente size bytes de um arquivo aberto
+    
+    Se o arquivo encolher depois de o cabeçalho tar ter sido montado, o que
+    falta é completado com zeros (como faz o GNU tar): o archive continua
+    legível, em vez de ficar com um membro menor que o prometido.
+    """
+    
+    def __init__(self, fileobj: BinaryIO, size: int):
+        self._fileobj = fileobj
+        self._remaining = size
+        self.padded = 0  # Bytes completados com zeros
+    
+    def read(self, n: int = -1) -> bytes:
+        if n is None or n < 0 or n > self._remaining:
+            n = self._remaining
+        data = self._fileobj.read(n)
+        if len(data) < n:
+            falta = n - len(data)
+            self.padded += falta
+            data += b"\0" * falta
+        self._remaining -= n
+        return data
 
 
 class Compressor(ABC):
     """Classe base abstrata para compressores"""
     
+    # Leitura antecipada: threads leem os próximos arquivos enquanto a thread
+    # principal comprime, escondendo a latência de disco (HDD/NFS)
+    PREFETCH_WORKERS = 4
+    PREFETCH_MAX_INFLIGHT = 8                 # Arquivos lidos à frente
+    PREFETCH_MAX_BYTES = 64 * 1024 * 1024     # Limite de memória em buffer
+    PREFETCH_MAX_FILE_SIZE = 16 * 1024 * 1024  # Maiores são lidos em série
+    
+    # Bloco de cópia de conteúdo entre arquivo e archive (nos dois sentidos);
+    # o padrão de 16KB do tarfile gera um par read/write a cada 16KB
+    COPY_BUFSIZE = 2 * 1024 * 1024
+    
+    # Buffer do arquivo de saída: gzip, zstd e zip gravam em pedaços pequenos
+    # (cabeçalhos, blocos do compressor), que o padrão de 8KB viraria em
+    # milhares de write() no disco
+    OUTPUT_BUFSIZE = 1024 * 1024
+    
+    # O callback de progresso é chamado a cada PROGRESS_EVERY arquivos (potência
+    # de 2, testada por máscara) e uma última vez ao final, não a cada arquivo
+    PROGRESS_EVERY = 1024
+    
     @abstractmethod
     def compress(
         self,
@@ -21,7 +138,9 @@ class Compressor(ABC):
         output_path: Path,
         exclusion_filter,
         progress_callback: Optional[Callable] = None,
-        compression_level: int = 6
+        compression_level: int = 6,
+        scan: Optional[DirectoryScan] = None,
+        hasher=None
     ) -> Tuple[int, int, int]:
         """
         Comprime um diretório
@@ -32,6 +151,8 @@ class Compressor(ABC):
             exclusion_filter: Filtro de exclusão
             progress_callback: Função de callback para progresso
             compression_level: Nível de compressão (0-9)
+            scan: Varredura já feita da origem (evita percorrer a árvore de novo)
+            hasher: Objeto hash alimentado com os bytes gravados (opcional)
             
         Returns:
             Tupla (total_arquivos, arquivos_excluidos, diretorios_excluidos)
@@ -54,127 +175,724 @@ class Compressor(ABC):
     def extension(self) -> str:
         """Extensão do arquivo gerado"""
         pass
+    
+    @classmethod
+    @contextmanager
+    def _open_output(cls, output_path: Path, hasher=None) -> Iterator[BinaryIO]:
+        """
+        Abre o arquivo de saída, calculando o hash durante a escrita se pedido
+        
+        Args:
+            output_path: Caminho do arquivo de saída
+            hasher: Objeto hash (opcional)
+        """
+        with open(output_path, 'wb', buffering=cls.OUTPUT_BUFSIZE) as raw:
+            yield raw if hasher is None else HashingWriter(raw, hasher)
+    
+    @staticmethod
+    def _run_external(cmd: List[str]) -> None:
+        """
+        Executa uma ferramenta externa, levantando erro com a saída de erro
+        
+        Args:
+            cmd: Comando e argumentos
+            
+        Raises:
+            RuntimeError: Se o processo terminar com código diferente de zero
+        """
+        result = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            erro = result.stderr.decode(errors='replace').strip()
+            raise RuntimeError(f"{os.path.basename(cmd[0])} terminou com código "
+                               f"{result.returncode}: {erro}")
+    
+    @staticmethod
+    def _safe_extractall(tar: tarfile.TarFile, destination_path: Path) -> None:
+        """
+        Extrai o tar recusando membros com caminho absoluto ou fora do destino
+        
+        Usa o filtro 'tar' quando o tarfile o oferece (3.12+ e backports de
+        segurança); links simbólicos do backup são preservados.
+        """
+        if hasattr(tarfile, 'tar_filter'):
+            tar.extractall(path=destination_path, filter='tar')
+        else:
+            tar.extractall(path=destination_path)
+    
+    def _prefetch(
+        self,
+        files: Iterable[Tuple[str, str, os.stat_result]]
+    ) -> Iterator[Tuple[str, str, os.stat_result, Optional[Future]]]:
+        """
+        Percorre os arquivos da varredura lendo os próximos em paralelo
+        
+        A ordem é preservada. Arquivos regulares pequenos vêm com um Future
+        cujo resultado é o conteúdo (ou a exceção da leitura); os demais vêm
+        com None e devem ser lidos pelo chamador.
+        
+        Args:
+            files: Itens (caminho, arcname, stat) da varredura
+            
+        Yields:
+            Tupla (caminho, arcname, stat, future_ou_None)
+        """
+        pendentes = deque()
+        em_buffer = 0
+        
+        with ThreadPoolExecutor(max_workers=self.PREFETCH_WORKERS) as pool:
+            for file_path, arcname, info in files:
+                antecipa = (stat.S_ISREG(info.st_mode)
+                            and info.st_size <= self.PREFETCH_MAX_FILE_SIZE)
+                tamanho = info.st_size if antecipa else 0
+                
+                # Entrega os mais antigos até caber o próximo na janela
+                while pendentes and (
+                    len(pendentes) >= self.PREFETCH_MAX_INFLIGHT
+                    or em_buffer + tamanho > self.PREFETCH_MAX_BYTES
+                ):
+                    item, ocupado = pendentes.popleft()
+                    em_buffer -= ocupado
+                    yield item
+                
+                future = pool.submit(_read_file, file_path) if antecipa else None
+                pendentes.append(((file_path, arcname, info, future), tamanho))
+                em_buffer += tamanho
+            
+            while pendentes:
+                item, _ = pendentes.popleft()
+                yield item
+
+
+def _gzip_member(data: bytes, level: int) -> bytes:
+    """Comprime um bloco como membro gzip completo (cabeçalho + CRC)"""
+    comp = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return comp.compress(data) + comp.flush()
+
+
+class ParallelGzipWriter:
+    """
+    Stream gzip comprimido em paralelo, sem depender do pigz
+    
+    Os bytes recebidos são cortados em blocos e cada bloco vira um membro
+    gzip independente, comprimido numa thread (o zlib libera o GIL). Os
+    membros são gravados em ordem; gzip concatenado é um gzip válido, lido
+    pelo módulo gzip, pelo tar do sistema e pelo tarfile em modo com seek
+    ('r:gz'). O modo stream do tarfile ('r|gz') para no primeiro membro, por
+    isso a restauração sem o tar do sistema descomprime via gzip.open.
+    """
+    
+    BLOCK_SIZE = 4 * 1024 * 1024  # Um membro gzip por bloco de 4MB
+    
+    def __init__(self, fileobj: BinaryIO, compression_level: int = 6,
+                 workers: Optional[int] = None):
+        """
+        Args:
+            fileobj: Destino dos membros comprimidos
+            compression_level: Nível de compressão (0-9)
+            workers: Threads de compressão (padrão: número de CPUs)
+        """
+        self.fileobj = fileobj
+        self.compression_level = compression_level
+        self.workers = workers or os.cpu_count() or 1
+        self._buffer = bytearray()
+        self._pending = deque()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        self._wrote_member = False
+        self.closed = False
+    
+    def write(self, data: bytes) -> int:
+        """Acumula dados e despacha blocos completos para compressão"""
+        self._buffer += data
+        while len(self._buffer) >= self.BLOCK_SIZE:
+            self._submit(bytes(self._buffer[:self.BLOCK_SIZE]))
+            del self._buffer[:self.BLOCK_SIZE]
+        return len(data)
+    
+    def _submit(self, block: bytes) -> None:
+        """Envia um bloco e grava os membros prontos, limitando a memória"""
+        self._pending.append(self._pool.submit(_gzip_member, block, self.compression_level))
+        while len(self._pending) > self.workers * 2:
+            self._write_next()
+    
+    def _write_next(self) -> None:
+        """Grava o membro mais antigo (mantém a ordem dos blocos)"""
+        self.fileobj.write(self._pending.popleft().result())
+        self._wrote_member = True
+    
+    def flush(self) -> None:
+        """Os dados só são gravados em blocos completos ou no close()"""
+    
+    def close(self) -> None:
+        """Comprime o resto do buffer e grava todos os membros pendentes"""
+        if self.closed:
+            return
+        try:
+            if self._buffer or not (self._pending or self._wrote_member):
+                self._submit(bytes(self._buffer))  # Vazio ainda gera gzip válido
+                self._buffer.clear()
+            while self._pending:
+                self._write_next()
+        finally:
+            self.closed = True
+            self._pool.shutdown()
+    
+    def abort(self) -> None:
+        """Descarta o que falta após um erro, sem gravar mais nada"""
+        self.closed = True
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._pool.shutdown()
 
 
 class TarCompressor(Compressor):
     """Compressor para formato .tar.gz"""
     
+    STREAM_BUFSIZE = 2 * 1024 * 1024  # 2MB: bloco de escrita do stream tar
+    USE_PIGZ = True  # Usa pigz (gzip paralelo) quando instalado
+    PARALLEL_GZIP_MIN_SIZE = 8 * 1024 * 1024  # Sem pigz: abaixo disso, GzipFile
+    USE_EXTERNAL_TAR = True  # tar do sistema: na restauração e, com pigz, na criação
+    
     @property
     def extension(self) -> str:
         return ".tar.gz"
     
+    @contextmanager
+    def _stream_writer(
+        self,
+        output_path: Path,
+        compression_level: int,
+        hasher=None,
+        estimated_size: int = 0
+    ) -> Iterator[BinaryIO]:
+        """
+        Abre o destino como stream gzip
+        
+        Se o pigz estiver disponível, o tar é enviado pelo stdin do processo e
+        a compressão usa todos os núcleos; caso contrário, origens grandes
+        usam o ParallelGzipWriter (threads com zlib) e pequenas o GzipFile
+        da biblioteca padrão.
+        
+        Args:
+            output_path: Caminho do arquivo de saída
+            compression_level: Nível de compressão (0-9)
+            hasher: Objeto hash alimentado com os bytes gravados (opcional)
+            estimated_size: Tamanho estimado da origem em bytes
+        """
+        pigz = shutil.which('pigz') if self.USE_PIGZ else None
+        
+        with self._open_output(output_path, hasher) as out:
+            if pigz:
+                # Sem hash, o pigz grava direto no arquivo; com hash, a saída
+                # passa por uma thread que copia para o HashingWriter
+                direct = hasher is None
+                proc = subprocess.Popen(
+                    [pigz, f'-{compression_level}', '-c'],
+                    stdin=subprocess.PIPE,
+                    stdout=out if direct else subprocess.PIPE
+                )
+                pump_errors = []
+                pump = None
+                if not direct:
+                    pump = threading.Thread(
+                        target=self._pump,
+                        args=(proc.stdout, out, pump_errors),
+                        daemon=True
+                    )
+                    pump.start()
+                try:
+                    yield proc.stdin
+                finally:
+                    proc.stdin.close()
+                    if pump is not None:
+                        pump.join()
+                        proc.stdout.close()
+                    returncode = proc.wait()
+                if pump_errors:
+                    raise pump_errors[0]
+                if returncode != 0:
+                    raise RuntimeError(f"pigz terminou com código {returncode}")
+            elif estimated_size >= self.PARALLEL_GZIP_MIN_SIZE and (os.cpu_count() or 1) > 1:
+                gz = ParallelGzipWriter(out, compression_level)
+                try:
+                    yield gz
+                except BaseException:
+                    gz.abort()
+                    raise
+                gz.close()
+            else:
+                with gzip.GzipFile(
+                    fileobj=out,
+                    mode='wb',
+                    compresslevel=compression_level
+                ) as gz:
+                    yield gz
+    
+    def _pump(self, source: BinaryIO, destination: BinaryIO, errors: list) -> None:
+        """Copia a saída do pigz para o destino, registrando falhas"""
+        try:
+            shutil.copyfileobj(source, destination, self.STREAM_BUFSIZE)
+        except Exception as e:
+            errors.append(e)
+            # Continua drenando para o pigz não travar com o pipe cheio
+            while source.read(self.STREAM_BUFSIZE):
+                pass
+    
+    @staticmethod
+    def _build_tarinfo(arcname: str, info: os.stat_result) -> tarfile.TarInfo:
+        """
+        Monta o cabeçalho tar de um arquivo regular a partir do stat da varredura
+        
+        Evita o gettarinfo() do tar.add(), que repete o stat e consulta
+        pwd/grp a cada arquivo; aqui os nomes vêm de um cache por uid/gid.
+        
+        Args:
+            arcname: Nome do arquivo dentro do tar
+            info: Resultado de stat do arquivo
+            
+        Returns:
+            TarInfo pronto para tar.addfile()
+        """
+        tarinfo = tarfile.TarInfo(arcname)
+        tarinfo.mode = stat.S_IMODE(info.st_mode)
+        tarinfo.uid = info.st_uid
+        tarinfo.gid = info.st_gid
+        tarinfo.size = info.st_size
+        tarinfo.mtime = info.st_mtime
+        tarinfo.uname = _user_name(info.st_uid)
+        tarinfo.gname = _group_name(info.st_gid)
+        return tarinfo
+    
+    def _add_entry(self, tar: tarfile.TarFile, file_path: str, arcname: str,
+                   info: os.stat_result, data: Optional[bytes] = None,
+                   links: Optional[Dict[Tuple[int, int], str]] = None) -> None:
+        """
+        Adiciona um item da varredura ao tar (data: conteúdo já lido)
+        
+        links guarda {(st_dev, st_ino): arcname} dos arquivos com mais de um
+        link já gravados: as ocorrências seguintes do mesmo inode viram
+        membros LNKTYPE apontando para a primeira, como no tar.add() e no
+        GNU tar, em vez de cópias completas.
+        """
+        inode = None
+        if links is not None and stat.S_ISREG(info.st_mode) and info.st_nlink > 1:
+            inode = (info.st_dev, info.st_ino)
+            alvo = links.get(inode)
+            if alvo is not None:
+                tarinfo = self._build_tarinfo(arcname, info)
+                tarinfo.type = tarfile.LNKTYPE
+                tarinfo.linkname = alvo
+                tarinfo.size = 0
+                tar.addfile(tarinfo)
+                return
+        
+        if data is not None:
+            tarinfo = self._build_tarinfo(arcname, info)
+            tarinfo.size = len(data)  # O arquivo pode ter mudado desde a varredura
+            tar.addfile(tarinfo, io.BytesIO(data))
+        elif stat.S_ISREG(info.st_mode):
+            with open(file_path, 'rb') as f:
+                # Stat do arquivo já aberto, não o da varredura: entre os dois
+                # o arquivo pode ter mudado (a confirmação do usuário fica no meio)
+                tarinfo = self._build_tarinfo(arcname, os.fstat(f.fileno()))
+                reader = _PaddedReader(f, tarinfo.size)
+                tar.addfile(tarinfo, reader)
+            if reader.padded:
+                print(f"   ⚠️  {arcname}: arquivo encolheu durante a leitura; "
+                      f"{reader.padded} bytes completados com zeros")
+        else:
+            # Links simbólicos e especiais: o tarfile sabe montar o cabeçalho
+            tar.add(file_path, arcname=arcname, recursive=False)
+        
+        if inode is not None:
+            links[inode] = arcname  # Só depois de gravado com sucesso
+    
     def compress(
         self,
         source_path: Path,
         output_path: Path,
         exclusion_filter,
         progress_callback: Optional[Callable] = None,
-        compression_level: int = 6
+        compression_level: int = 6,
+        scan: Optional[DirectoryScan] = None,
+        hasher=None
     ) -> Tuple[int, int, int]:
         """Comprime usando tar.gz"""
+        if scan is None:
+            scan = scan_directory(source_path, exclusion_filter)
+        
         total_files = 0
-        excluded_files = 0
-        excluded_dirs = 0
+        excluded_files = scan.excluded_files
+        excluded_dirs = scan.excluded_dirs
+        progress_mask = self.PROGRESS_EVERY - 1
         
-        with tarfile.open(
-            output_path,
-            'w:gz',
-            compresslevel=compression_level
-        ) as tar:
-            for root, dirs, files in os.walk(source_path):
-                # Remove diretórios excluídos
-                dirs_before = len(dirs)
-                dirs[:] = [d for d in dirs if not exclusion_filter.should_exclude(d)]
-                excluded_dirs += (dirs_before - len(dirs))
-                
-                # Adiciona arquivos
-                for file in files:
-                    if exclusion_filter.should_exclude(file):
-                        excluded_files += 1
-                        continue
-                    
-                    try:
-                        file_path = Path(root) / file
-                        # Mantém estrutura relativa
-                        arcname = file_path.relative_to(source_path.parent)
-                        tar.add(str(file_path), arcname=str(arcname))
-                        total_files += 1
-                        
-                        # Callback de progresso
-                        if progress_callback:
-                            progress_callback(total_files)
+        tar_bin = self._external_tar()
+        
+        with self._stream_writer(
+            output_path, compression_level, hasher, scan.total_size
+        ) as stream:
+            if tar_bin:
+                total_files, falhas = self._compress_external(tar_bin, source_path, scan, stream)
+                excluded_files += falhas
+            else:
+                # Modo stream ('w|'): o tar é escrito sequencialmente em blocos
+                # grandes sobre o compressor, sem a contabilidade de acesso
+                # aleatório do 'w:gz'
+                with tarfile.open(
+                    fileobj=stream,
+                    mode='w|',
+                    bufsize=self.STREAM_BUFSIZE,
+                    copybufsize=self.COPY_BUFSIZE
+                ) as tar:
+                    links = {}  # Hard links: {(st_dev, st_ino): primeiro arcname}
+                    # Adiciona arquivos (arcname mantém estrutura relativa)
+                    for file_path, arcname, info, future in self._prefetch(scan.files):
+                        try:
+                            data = future.result() if future is not None else None
+                            self._add_entry(tar, file_path, arcname, info, data, links)
+                            total_files += 1
                             
-                    except Exception as e:
-                        print(f"   ⚠️  Erro ao adicionar {file}: {e}")
-                        excluded_files += 1
-                        continue
+                            # Callback de progresso (espaçado, fora do caminho quente)
+                            if progress_callback and not total_files & progress_mask:
+                                progress_callback(total_files)
+                                
+                        except Exception as e:
+                            print(f"   ⚠️  Erro ao adicionar {os.path.basename(file_path)}: {e}")
+                            excluded_files += 1
+                            continue
+        
+        if progress_callback and total_files & progress_mask:
+            progress_callback(total_files)
         
         return total_files, excluded_files, excluded_dirs
     
+    def _external_tar(self) -> Optional[str]:
+        """
+        Caminho do tar do sistema para criar o archive, se valer a pena
+        
+        Só com pigz: o tar (em C) monta o stream a partir da lista de
+        arquivos e o pigz comprime em todos os núcleos, sem o laço por
+        arquivo em Python. Exige GNU tar (--verbatim-files-from,
+        --ignore-failed-read).
+        
+        Returns:
+            Caminho do executável, ou None para usar o tarfile
+        """
+        if not (self.USE_EXTERNAL_TAR and self.USE_PIGZ and shutil.which('pigz')):
+            return None
+        tar_bin = shutil.which('tar')
+        return tar_bin if tar_bin and _is_gnu_tar(tar_bin) else None
+    
+    def _compress_external(self, tar_bin: str, source_path: Path,
+                           scan: DirectoryScan, stream: BinaryIO) -> Tuple[int, int]:
+        """
+        Gera o tar com o tar do sistema a partir da lista da varredura
+        
+        Os arcnames vão pelo stdin separados por NUL (sem recursão: a
+        exclusão já foi aplicada na varredura) e a saída do tar é copiada
+        para o stream do compressor, que também calcula o hash.
+        
+        Args:
+            tar_bin: Caminho do tar (GNU)
+            source_path: Diretório de origem
+            scan: Varredura com os arquivos a incluir
+            stream: Stream de destino (entrada do compressor)
+            
+        Returns:
+            Tupla (arquivos incluídos, arquivos que o tar não conseguiu ler).
+            Os não lidos (apagados ou sem permissão depois da varredura) são
+            contados a partir dos avisos do tar, como excluídos, igual ao
+            caminho do tarfile.
+            
+        Raises:
+            RuntimeError: Se o tar falhar
+        """
+        parent = os.path.dirname(os.path.abspath(os.fspath(source_path)))
+        cmd = [tar_bin, '-C', parent, '-cf', '-', '--format=pax', '--no-recursion',
+               '--ignore-failed-read', '--null', '--verbatim-files-from', '-T', '-']
+        
+        with tempfile.TemporaryFile() as stderr:
+            proc = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                    stdout=subprocess.PIPE, stderr=stderr)
+            # A lista é escrita numa thread: com a principal lendo o stdout,
+            # nenhum dos dois pipes enche e trava o tar
+            feed_errors = []
+            feeder = threading.Thread(
+                target=self._feed_names,
+                args=(proc.stdin, scan.files, feed_errors),
+                daemon=True
+            )
+            feeder.start()
+            try:
+                shutil.copyfileobj(proc.stdout, stream, self.STREAM_BUFSIZE)
+            except BaseException:
+                proc.kill()
+                raise
+            finally:
+                proc.stdout.close()
+                feeder.join()
+                returncode = proc.wait()
+            
+            stderr.seek(0)
+            mensagens = stderr.read().decode(errors='replace').strip()
+        
+        # Código 1: arquivos mudaram durante a leitura (aviso, como no tarfile)
+        if returncode > 1 or feed_errors:
+            raise RuntimeError(f"tar terminou com código {returncode}: {mensagens}")
+        falhas = 0
+        for linha in mensagens.splitlines():
+            print(f"   ⚠️  {linha}")
+            if _TAR_READ_FAILURE.search(linha):
+                falhas += 1
+        
+        return len(scan.files) - falhas, falhas
+    
+    @staticmethod
+    def _feed_names(pipe: BinaryIO, files: Iterable[Tuple[str, str, os.stat_result]],
+                    errors: list) -> None:
+        """Escreve os arcnames separados por NUL no stdin do tar"""
+        try:
+            with pipe:
+                for _, arcname, _ in files:
+                    pipe.write(os.fsencode(arcname) + b"\0")
+        except Exception as e:  # BrokenPipeError se o tar terminar antes
+            errors.append(e)
+    
     def decompress(self, archive_path: Path, destination_path: Path) -> None:
-        """Descomprime arquivo tar.gz"""
-        with tarfile.open(archive_path, 'r:gz') as tar:
-            tar.extractall(path=destination_path)
+        """
+        Descomprime arquivo tar.gz
+        
+        Com o tar do sistema (e o pigz, se houver) a extração roda em C; o
+        GNU tar e o bsdtar já removem '/' inicial e recusam membros com '..'.
+        Sem eles, usa o tarfile com filtro de segurança, em modo stream
+        ('r|', como no .tar.zst): cada membro é gravado no destino assim
+        que descomprimido, numa só passada sequencial, sem seek no gzip.
+        O gzip vem do módulo gzip, que lê os vários membros concatenados
+        do ParallelGzipWriter; o 'r|gz' do tarfile para no primeiro.
+        """
+        tar_bin = shutil.which('tar') if self.USE_EXTERNAL_TAR else None
+        if tar_bin:
+            Path(destination_path).mkdir(parents=True, exist_ok=True)
+            pigz = shutil.which('pigz') if self.USE_PIGZ else None
+            self._run_external([
+                tar_bin,
+                f'--use-compress-program={pigz}' if pigz else '-z',
+                '-x', '-f', str(archive_path),
+                '-C', str(destination_path)
+            ])
+            return
+        
+        with gzip.open(archive_path, 'rb') as gz:
+            with tarfile.open(
+                fileobj=gz,
+                mode='r|',
+                bufsize=self.STREAM_BUFSIZE,
+                copybufsize=self.COPY_BUFSIZE
+            ) as tar:
+                self._safe_extractall(tar, destination_path)
+
+
+class TarZstdCompressor(TarCompressor):
+    """
+    Compressor para formato .tar.zst
+    
+    Zstandard comprime várias vezes mais rápido que gzip com taxa similar.
+    Requer o pacote opcional `zstandard` (pip install backup-universal[zstd]).
+    """
+    
+    DEFAULT_LEVEL = 3   # Nível padrão do zstd: melhor relação velocidade/taxa
+    MAXIMUM_LEVEL = 19  # Usado quando a compressão máxima (9) é pedida
+    FASTEST_LEVEL = 1   # Usado com nível 0 (zstd não tem modo sem compressão)
+    
+    @property
+    def extension(self) -> str:
+        return ".tar.zst"
+    
+    @staticmethod
+    def _import_zstd():
+        """Importa zstandard sob demanda, com mensagem clara se ausente"""
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError(
+                "Formato tar.zst requer o pacote 'zstandard' "
+                "(pip install zstandard)"
+            )
+        return zstandard
+    
+    @contextmanager
+    def _stream_writer(
+        self,
+        output_path: Path,
+        compression_level: int,
+        hasher=None,
+        estimated_size: int = 0
+    ) -> Iterator[BinaryIO]:
+        """Abre o destino como stream zstd multi-thread"""
+        zstd = self._import_zstd()
+        if compression_level >= 9:
+            level = self.MAXIMUM_LEVEL
+        elif compression_level == 0:
+            level = self.FASTEST_LEVEL
+        else:
+            level = self.DEFAULT_LEVEL
+        cctx = zstd.ZstdCompressor(level=level, threads=-1)
+        
+        with self._open_output(output_path, hasher) as out, cctx.stream_writer(out) as zst:
+            yield zst
+    
+    def decompress(self, archive_path: Path, destination_path: Path) -> None:
+        """Descomprime arquivo tar.zst"""
+        zstd = self._import_zstd()
+        dctx = zstd.ZstdDecompressor()
+        
+        with open(archive_path, 'rb') as raw, dctx.stream_reader(raw) as zst:
+            with tarfile.open(
+                fileobj=zst,
+                mode='r|',
+                bufsize=self.STREAM_BUFSIZE,
+                copybufsize=self.COPY_BUFSIZE
+            ) as tar:
+                self._safe_extractall(tar, destination_path)
 
 
 class ZipCompressor(Compressor):
     """Compressor para formato .zip"""
     
+    USE_UNZIP = True  # Restaura com o unzip do sistema quando instalado
+    
     @property
     def extension(self) -> str:
         return ".zip"
     
+    # Formatos já comprimidos: deflate gasta CPU sem reduzir o tamanho,
+    # então essas entradas são gravadas sem compressão (ZIP_STORED)
+    INCOMPRESSIBLE_EXTENSIONS = INCOMPRESSIBLE_EXTENSIONS
+    
+    # Entradas a partir deste tamanho já saem com cabeçalho ZIP64: se o
+    # arquivo crescer depois da varredura e passar de 2GB, o open(zinfo, 'w')
+    # falharia no meio da cópia (o extra ZIP64 custa só 20 bytes)
+    ZIP64_FORCE_SIZE = 1024 ** 3
+    
+    def _build_zipinfo(self, arcname: str, info: os.stat_result,
+                       compression_level: int) -> zipfile.ZipInfo:
+        """
+        Monta o cabeçalho zip de um arquivo a partir do stat da varredura
+        
+        Equivale ao que ZipFile.write() monta, sem repetir o stat; arquivos
+        de formatos já comprimidos, ou todos com nível 0, são gravados com
+        ZIP_STORED.
+        
+        Args:
+            arcname: Nome do arquivo dentro do zip
+            info: Resultado de stat do arquivo
+            compression_level: Nível de compressão (0-9)
+            
+        Returns:
+            ZipInfo pronto para writestr()/open()
+        """
+        zinfo = zipfile.ZipInfo(arcname, time.localtime(info.st_mtime)[:6])
+        zinfo.external_attr = (info.st_mode & 0xFFFF) << 16
+        zinfo.file_size = info.st_size  # Decide ZIP64 antes de gravar
+        if (compression_level == 0
+                or os.path.splitext(arcname)[1].lower() in self.INCOMPRESSIBLE_EXTENSIONS):
+            zinfo.compress_type = zipfile.ZIP_STORED
+            return zinfo
+        zinfo.compress_type = zipfile.ZIP_DEFLATED
+        # Nível por entrada: open(zinfo, 'w') não aceita compresslevel
+        setattr(zinfo, _ZIPINFO_LEVEL_ATTR, compression_level)
+        return zinfo
+    
+    def _add_entry(self, zipf: zipfile.ZipFile, file_path: str, arcname: str,
+                   info: os.stat_result, data: Optional[bytes],
+                   compression_level: int) -> None:
+        """Adiciona um item da varredura ao zip (data: conteúdo já lido)"""
+        if data is not None:
+            zipf.writestr(self._build_zipinfo(arcname, info, compression_level), data)
+        elif stat.S_ISREG(info.st_mode):
+            zinfo = self._build_zipinfo(arcname, info, compression_level)
+            force_zip64 = info.st_size >= self.ZIP64_FORCE_SIZE
+            with open(file_path, 'rb', buffering=0) as src, \
+                    zipf.open(zinfo, 'w', force_zip64=force_zip64) as dest:
+                self._copy_into(src, dest)
+        else:
+            # Links simbólicos: o zip guarda o conteúdo do alvo
+            zipf.write(file_path, arcname=arcname)
+    
+    def _copy_into(self, src: BinaryIO, dest: BinaryIO) -> None:
+        """
+        Copia um arquivo para a entrada do zip por um buffer reutilizado
+        
+        Com readinto() direto do arquivo (sem buffer intermediário) num único
+        bytearray, os dados não são copiados para um bytes novo a cada bloco
+        como no copyfileobj(); o zip calcula o CRC e grava a partir da mesma
+        memória, o que pesa sobretudo nas entradas ZIP_STORED.
+        """
+        buf = bytearray(self.COPY_BUFSIZE)
+        view = memoryview(buf)
+        while True:
+            n = src.readinto(buf)
+            if not n:
+                break
+            dest.write(view[:n])
+    
     def compress(
         self,
         source_path: Path,
         output_path: Path,
         exclusion_filter,
         progress_callback: Optional[Callable] = None,
-        compression_level: int = 6
+        compression_level: int = 6,
+        scan: Optional[DirectoryScan] = None,
+        hasher=None
     ) -> Tuple[int, int, int]:
         """Comprime usando zip"""
+        if scan is None:
+            scan = scan_directory(source_path, exclusion_filter)
+        
         total_files = 0
-        excluded_files = 0
-        excluded_dirs = 0
+        excluded_files = scan.excluded_files
+        excluded_dirs = scan.excluded_dirs
+        progress_mask = self.PROGRESS_EVERY - 1
         
-        with zipfile.ZipFile(
-            output_path,
+        # Com hash, o ZipFile recebe um stream sem seek() e grava cada entrada
+        # com data descriptor, sem voltar para reescrever cabeçalhos
+        with self._open_output(output_path, hasher) as out, zipfile.ZipFile(
+            out,
             'w',
             compression=zipfile.ZIP_DEFLATED,
             compresslevel=compression_level
         ) as zipf:
-            for root, dirs, files in os.walk(source_path):
-                # Remove diretórios excluídos
-                dirs_before = len(dirs)
-                dirs[:] = [d for d in dirs if not exclusion_filter.should_exclude(d)]
-                excluded_dirs += (dirs_before - len(dirs))
-                
-                # Adiciona arquivos
-                for file in files:
-                    if exclusion_filter.should_exclude(file):
-                        excluded_files += 1
-                        continue
+            # Adiciona arquivos (arcname mantém estrutura relativa)
+            for file_path, arcname, info, future in self._prefetch(scan.files):
+                try:
+                    data = future.result() if future is not None else None
+                    self._add_entry(zipf, file_path, arcname, info, data, compression_level)
+                    total_files += 1
                     
-                    try:
-                        file_path = Path(root) / file
-                        # Mantém estrutura relativa
-                        arcname = file_path.relative_to(source_path.parent)
-                        zipf.write(str(file_path), arcname=str(arcname))
-                        total_files += 1
+                    # Callback de progresso (espaçado, fora do caminho quente)
+                    if progress_callback and not total_files & progress_mask:
+                        progress_callback(total_files)
                         
-                        # Callback de progresso
-                        if progress_callback:
-                            progress_callback(total_files)
-                            
-                    except Exception as e:
-                        print(f"   ⚠️  Erro ao adicionar {file}: {e}")
-                        excluded_files += 1
-                        continue
+                except Exception as e:
+                    print(f"   ⚠️  Erro ao adicionar {os.path.basename(file_path)}: {e}")
+                    excluded_files += 1
+                    continue
+        
+        if progress_callback and total_files & progress_mask:
+            progress_callback(total_files)
         
         return total_files, excluded_files, excluded_dirs
     
     def decompress(self, archive_path: Path, destination_path: Path) -> None:
-        """Descomprime arquivo zip"""
+        """Descomprime arquivo zip (unzip do sistema quando disponível)"""
+        unzip = shutil.which('unzip') if self.USE_UNZIP else None
+        if unzip:
+            # -o: sobrescreve sem perguntar, como o extractall()
+            self._run_external([unzip, '-q', '-o', str(archive_path), '-d', str(destination_path)])
+            return
+        
         with zipfile.ZipFile(archive_path, 'r') as zipf:
             zipf.extractall(path=destination_path)
 
@@ -184,7 +902,8 @@ def get_compressor(format_type: str) -> Compressor:
     Factory function para obter compressor adequado
     
     Args:
-        format_type: Tipo de formato ('tar' ou 'zip')
+        format_type: Tipo de formato ('tar', 'tar.zst' ou 'zip'; 'zstd' é
+                     sinônimo de 'tar.zst')
         
     Returns:
         Instância de Compressor apropriada
@@ -194,6 +913,8 @@ def get_compressor(format_type: str) -> Compressor:
     """
     if format_type.lower() == 'tar':
         return TarCompressor()
+    elif format_type.lower() in ('tar.zst', 'zstd'):
+        return TarZstdCompressor()
     elif format_type.lower() == 'zip':
         return ZipCompressor()
     else:
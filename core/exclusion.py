@@ -4,12 +4,87 @@ Gerencia padrões de exclusão de arquivos e diretórios
 """
 
 import fnmatch
-from pathlib import Path
-from typing import List, Set
+import os
+import re
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path, PurePath
+from typing import FrozenSet, Iterable, List, Optional, Pattern, Tuple, Union
+
+
+GLOB_CHARS = "*?["  # Caracteres que tornam um padrão glob
+
+# Como fnmatch.fnmatch() (via os.path.normcase): sem distinção entre
+# maiúsculas e minúsculas onde o sistema não distingue (Windows)
+IGNORE_CASE = os.path.normcase("A") == "a"
+
+PathLike = Union[str, "os.PathLike[str]"]
+CompiledPatterns = Tuple[
+    FrozenSet[str], Tuple[str, ...], Optional[Pattern[str]],
+    FrozenSet[str], Optional[Pattern[str]],
+]
+
+
+def _combine(patterns: List[str], ignore_case: bool = False) -> Optional[Pattern[str]]:
+    """Junta padrões glob em uma única regex (None se não houver)"""
+    if not patterns:
+        return None
+    flags = re.IGNORECASE if ignore_case else 0
+    return re.compile("|".join(f"(?:{fnmatch.translate(p)})" for p in patterns), flags)
+
+
+@lru_cache(maxsize=32)
+def _compile_pattern_set(patterns: Tuple[str, ...], ignore_case: bool = False) -> CompiledPatterns:
+    """
+    Compila um conjunto de padrões em (literais, sufixos, regex de nomes,
+    caminhos literais, regex de caminhos)
+    
+    Memorizado pela tupla de padrões: filtros criados com a mesma lista (um
+    por backup, por restauração, por teste...) reaproveitam o que já foi
+    traduzido e compilado em vez de repetir fnmatch.translate() a cada vez.
+    Com ignore_case, os literais são guardados em minúsculas e as regex
+    compiladas com re.IGNORECASE, em vez de normalizar cada padrão por
+    chamada como o fnmatch.fnmatch().
+    
+    Padrões '*<literal>' (*.log, *.pyc, ...), a maioria dos globs, viram uma
+    tupla de sufixos testada com um único str.endswith(), bem mais barato
+    que a regex; só os demais globs ficam na regex de nomes. Do mesmo modo,
+    padrões de caminho sem curinga (docs/build) vão para um frozenset.
+    """
+    fold = str.lower if ignore_case else str
+    names = [p for p in patterns if "/" not in p]
+    paths = [p.strip("/") for p in patterns if "/" in p]
+    globs = [p for p in names if any(c in p for c in GLOB_CHARS)]
+    literals = frozenset(fold(p) for p in names if p not in globs)
+    suffixes = [
+        p for p in globs
+        if p.startswith("*") and not any(c in p[1:] for c in GLOB_CHARS)
+    ]
+    globs = [p for p in globs if p not in suffixes]
+    path_globs = [p for p in paths if any(c in p for c in GLOB_CHARS)]
+    path_literals = frozenset(fold(p) for p in paths if p not in path_globs)
+    return (
+        literals,
+        tuple(fold(p[1:]) for p in suffixes),
+        _combine(globs, ignore_case),
+        path_literals,
+        _combine(path_globs, ignore_case),
+    )
 
 
 class ExclusionFilter:
-    """Filtro de exclusão baseado em padrões glob"""
+    """
+    Filtro de exclusão baseado em padrões glob
+    
+    Padrões sem '/' casam com o nome do arquivo ou diretório em qualquer
+    nível (ex: node_modules). Padrões com '/' casam com o caminho relativo à
+    origem do backup (ex: frontend/node_modules, */build); '*' também
+    atravessa '/'.
+    """
+    
+    CACHE_MAX_SIZE = 8192  # Máximo de nomes no cache LRU (só usado se houver regex)
+    GLOB_CHARS = GLOB_CHARS
+    IGNORE_CASE = IGNORE_CASE  # True no Windows, como o fnmatch.fnmatch()
     
     def __init__(self, patterns: List[str] = None):
         """
@@ -19,50 +94,185 @@ class ExclusionFilter:
             patterns: Lista de padrões glob para exclusão
         """
         self.patterns: List[str] = patterns or []
-        self._cache: Set[str] = set()  # Cache de itens já verificados
+        # Cache LRU {nome: deve_excluir}, chaveado pelo nome base
+        self._cache: "OrderedDict[str, bool]" = OrderedDict()
+        self._literals: FrozenSet[str] = frozenset()
+        self._suffixes: Tuple[str, ...] = ()
+        self._regex: Optional[Pattern[str]] = None
+        self._path_literals: FrozenSet[str] = frozenset()
+        self._path_regex: Optional[Pattern[str]] = None
+        self._has_path_patterns = False
+        self._compile_patterns()
+    
+    def _compile_patterns(self) -> None:
+        """
+        Separa padrões literais e sufixos e compila os globs em uma única regex
+        
+        Padrões sem curinga (node_modules, .git, ...) viram um frozenset
+        consultado por hash; '*<sufixo>' vira uma tupla para str.endswith();
+        os demais viram uma só regex, varrida em C no lugar de um fnmatch()
+        por padrão. Padrões de caminho (com '/') ficam numa regex própria.
+        """
+        (
+            self._literals, self._suffixes, self._regex,
+            self._path_literals, self._path_regex,
+        ) = _compile_pattern_set(tuple(self.patterns), self.IGNORE_CASE)
+        self._has_path_patterns = bool(self._path_literals) or self._path_regex is not None
+    
+    def _patterns_changed(self) -> None:
+        """Invalida cache e recompila após modificar padrões"""
+        self._cache.clear()
+        self._compile_patterns()
         
     def add_pattern(self, pattern: str) -> None:
         """Adiciona um padrão de exclusão"""
         if pattern and pattern not in self.patterns:
             self.patterns.append(pattern)
-            self._cache.clear()  # Limpa cache ao modificar padrões
+            self._patterns_changed()
             
     def add_patterns(self, patterns: List[str]) -> None:
-        """Adiciona múltiplos padrões de exclusão"""
+        """Adiciona múltiplos padrões de exclusão (recompila uma só vez)"""
+        added = False
         for pattern in patterns:
-            self.add_pattern(pattern)
+            if pattern and pattern not in self.patterns:
+                self.patterns.append(pattern)
+                added = True
+        if added:
+            self._patterns_changed()
             
     def remove_pattern(self, pattern: str) -> None:
         """Remove um padrão de exclusão"""
         if pattern in self.patterns:
             self.patterns.remove(pattern)
-            self._cache.clear()
+            self._patterns_changed()
             
     def should_exclude(self, path: str) -> bool:
         """
         Verifica se um caminho deve ser excluído
         
         Args:
-            path: Caminho do arquivo ou diretório (pode ser apenas o nome)
+            path: Caminho do arquivo ou diretório (pode ser apenas o nome);
+                  padrões com '/' são testados contra o caminho inteiro,
+                  que deve ser relativo à origem do backup
+            
+        Returns:
+            True se deve ser excluído, False caso contrário
+        """
+        if not self._has_path_patterns and isinstance(path, PurePath):
+            # Path já vem dividido: .name dispensa montar a string do caminho
+            nome = path.name
+        else:
+            caminho = self._normalize(path)
+            
+            if self._has_path_patterns and self._path_excluded(caminho):
+                return True
+            
+            # Obtém apenas o nome do arquivo/diretório (sem construir um
+            # Path, chamado uma vez por entrada da árvore)
+            nome = caminho.rpartition("/")[2]
+        
+        return self._match_name(nome)
+    
+    def should_exclude_entry(self, name: str, rel_path: str) -> bool:
+        """
+        Variante de should_exclude() para quem percorre a árvore
+        
+        Recebe o nome e o caminho relativo já prontos, pulando a conversão
+        e a divisão do caminho feitas a cada chamada de should_exclude().
+        
+        Args:
+            name: Nome do arquivo ou diretório
+            rel_path: Caminho relativo à origem, com '/' e sem barras nas pontas
             
         Returns:
             True se deve ser excluído, False caso contrário
         """
-        # Usa cache para melhor performance
-        cache_key = str(path)
-        if cache_key in self._cache:
+        if self._has_path_patterns and self._path_excluded(rel_path):
             return True
+        return self._match_name(name)
+    
+    def _path_excluded(self, caminho: str) -> bool:
+        """Testa um caminho relativo normalizado contra os padrões com '/'"""
+        chave = caminho.lower() if self.IGNORE_CASE else caminho
+        return chave in self._path_literals or (
+            self._path_regex is not None and self._path_regex.match(caminho) is not None
+        )
+    
+    def _match_name(self, nome: str) -> bool:
+        """Testa um nome base contra literais, sufixos e a regex de globs"""
+        # Literais por hash, sufixos num só endswith(); demais globs na regex
+        chave = nome.lower() if self.IGNORE_CASE else nome
+        if self._regex is None:
+            # Sem regex, o teste custa menos que consultar e manter o cache
+            return chave in self._literals or chave.endswith(self._suffixes)
+        
+        # Com regex, usa cache (nomes se repetem muito numa árvore)
+        cached = self._cache.get(nome)
+        if cached is not None:
+            self._cache.move_to_end(nome)
+            return cached
+        
+        resultado = (
+            chave in self._literals
+            or chave.endswith(self._suffixes)
+            or self._regex.match(nome) is not None
+        )
+        
+        self._cache[nome] = resultado
+        if len(self._cache) > self.CACHE_MAX_SIZE:
+            self._cache.popitem(last=False)  # Descarta o menos usado
+        
+        return resultado
+    
+    @staticmethod
+    def _normalize(path) -> str:
+        """Converte o caminho para str com '/' e sem barras nas pontas"""
+        caminho = os.fspath(path)
+        if os.sep != "/":
+            caminho = caminho.replace(os.sep, "/")
+        return caminho.strip("/")
+    
+    def partition(self, paths: Iterable[PathLike]) -> Tuple[list, int]:
+        """
+        Separa, numa só passada, os caminhos mantidos dos excluídos
+        
+        Args:
+            paths: Caminhos ou nomes (str ou Path)
             
-        # Obtém apenas o nome do arquivo/diretório
-        nome = Path(path).name
+        Returns:
+            Tupla (caminhos mantidos na ordem original, quantidade excluída)
+        """
+        kept = []
+        keep = kept.append
+        excluded = 0
         
-        # Verifica cada padrão
-        for pattern in self.patterns:
-            if fnmatch.fnmatch(nome, pattern):
-                self._cache.add(cache_key)
-                return True
-                
-        return False
+        if self._regex is not None or self._has_path_patterns:
+            should_exclude = self.should_exclude  # Evita a busca do método por item
+            for path in paths:
+                if should_exclude(path):
+                    excluded += 1
+                else:
+                    keep(path)
+            return kept, excluded
+        
+        # Só literais e sufixos: o teste de should_exclude() feito em linha,
+        # com tudo em variáveis locais e sem uma chamada de método por item
+        literals = self._literals
+        suffixes = self._suffixes
+        ignore_case = self.IGNORE_CASE
+        normalize = self._normalize
+        for path in paths:
+            if isinstance(path, PurePath):
+                nome = path.name
+            else:
+                nome = normalize(path).rpartition("/")[2]
+            if ignore_case:
+                nome = nome.lower()
+            if nome in literals or nome.endswith(suffixes):
+                excluded += 1
+            else:
+                keep(path)
+        return kept, excluded
     
     def filter_paths(self, paths: List[Path]) -> List[Path]:
         """
@@ -74,7 +284,7 @@ class ExclusionFilter:
         Returns:
             Lista filtrada
         """
-        return [p for p in paths if not self.should_exclude(str(p))]
+        return self.partition(paths)[0]
     
     def get_patterns(self) -> List[str]:
         """Retorna lista de padrões ativos"""
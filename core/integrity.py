@@ -4,36 +4,148 @@ Cálculo de hashes e verificação de integridade de arquivos
 """
 
 import hashlib
+import hmac
+import mmap
+import os
+import sys
 from pathlib import Path
-from typing import Optional
+from typing import Optional, BinaryIO
+
+try:
+    import blake3
+except ImportError:  # Opcional: pip install backup-universal[blake3]
+    blake3 = None
+
+# Python 3.11+: laço read()+update() inteiro em C, liberando o GIL
+_file_digest = getattr(hashlib, 'file_digest', None)
+
+
+class HashingWriter:
+    """
+    Wrapper de escrita que calcula o hash de tudo que passa por ele
+    
+    Permite obter o hash do backup enquanto ele é gravado, sem reler o
+    arquivo depois. Não expõe seek()/tell(): quem escreve (tarfile,
+    zipfile, gzip) trata o destino como stream sequencial, garantindo que
+    cada byte passe pelo hash exatamente uma vez.
+    """
+    
+    def __init__(self, fileobj: BinaryIO, hasher):
+        """
+        Args:
+            fileobj: Arquivo de destino aberto em modo binário
+            hasher: Objeto hash (hashlib.sha256(), ...)
+        """
+        self._fileobj = fileobj
+        self.hasher = hasher
+    
+    def write(self, data) -> int:
+        self.hasher.update(data)
+        return self._fileobj.write(data)
+    
+    def flush(self) -> None:
+        self._fileobj.flush()
+    
+    def close(self) -> None:
+        self._fileobj.close()
+    
+    @property
+    def closed(self) -> bool:
+        return self._fileobj.closed
 
 
 class IntegrityChecker:
     """Verificador de integridade de arquivos usando hashes"""
     
-    CHUNK_SIZE = 4096  # 4KB chunks para leitura eficiente
+    CHUNK_SIZE = 4 * 1024 * 1024  # 4MB chunks: menos syscalls e chamadas update()
+    MMAP_MIN_SIZE = 16 * 1024 * 1024  # Abaixo disso, montar o mmap custa mais que ler
+    
+    # Algoritmo usado nos backups novos. O SHA256 do OpenSSL usa instruções
+    # dedicadas (SHA-NI / ARMv8 SHA2) quando a CPU oferece. O BLAKE3 (SIMD e
+    # multithread, várias vezes mais rápido) pode ser escolhido no config.json
+    # se o pacote blake3 estiver instalado.
+    DEFAULT_ALGORITHM = 'sha256'
     
     @staticmethod
-    def calculate_md5(file_path: Path) -> Optional[str]:
+    def _calculate(file_path: Path, hasher) -> Optional[str]:
         """
-        Calcula hash MD5 de um arquivo
+        Alimenta um objeto hashlib com o conteúdo de um arquivo
         
         Args:
             file_path: Caminho do arquivo
+            hasher: Objeto hash (hashlib.md5(), hashlib.sha256(), ...)
             
         Returns:
-            String hexadecimal do hash MD5, ou None em caso de erro
+            String hexadecimal do hash, ou None em caso de erro
         """
-        hash_md5 = hashlib.md5()
-        
         try:
-            with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(IntegrityChecker.CHUNK_SIZE), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
+            # Sem buffer do io: mmap, file_digest e readinto já leem em
+            # blocos grandes, e o BufferedReader só acrescentaria uma cópia
+            with open(file_path, "rb", buffering=0) as f:
+                if IntegrityChecker._update_mmap(f, hasher):
+                    pass
+                elif _file_digest is not None:
+                    # Sem mmap (arquivo pequeno ou não mapeável): file_digest()
+                    # alimenta o próprio hasher, sem laço em Python
+                    _file_digest(f, lambda: hasher)
+                else:
+                    # readinto() num único buffer: sem alocar bytes por chunk
+                    buf = bytearray(IntegrityChecker.CHUNK_SIZE)
+                    view = memoryview(buf)
+                    while True:
+                        n = f.readinto(buf)
+                        if not n:
+                            break
+                        hasher.update(view[:n])
+            return hasher.hexdigest()
         except Exception:
             return None
     
+    @staticmethod
+    def _update_mmap(f, hasher) -> bool:
+        """
+        Alimenta o hash com o arquivo inteiro mapeado em memória
+        
+        Uma única chamada update() sobre o mapa: o hashlib libera o GIL e
+        percorre o buffer em C, sem o laço de read() em Python.
+        
+        Args:
+            f: Arquivo aberto em modo binário
+            hasher: Objeto hash
+            
+        Returns:
+            True se o hash foi calculado, False se for preciso ler em chunks
+        """
+        try:
+            size = os.fstat(f.fileno()).st_size
+            # Arquivos pequenos (e vazios, que não podem ser mapeados) vão
+            # pela leitura em blocos; em 32 bits, evita esgotar o espaço de
+            # endereçamento
+            if size < max(1, IntegrityChecker.MMAP_MIN_SIZE) or size > sys.maxsize // 2:
+                return False
+            
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                advice = getattr(mmap, 'MADV_SEQUENTIAL', None)
+                if advice is not None:
+                    mm.madvise(advice)  # Readahead mais agressivo do kernel
+                hasher.update(mm)
+            return True
+        except (OSError, ValueError):
+            return False
+    
+    @staticmethod
+    def calculate_md5(file_path: Path) -> Optional[str]:
+        """
+        Calcula hash MD5 de um arquivo
+        
+        Args:
+            file_path: Caminho do arquivo
+            
+        Returns:
+            String hexadecimal do hash MD5, ou None em caso de erro
+        """
+        return IntegrityChecker._calculate(file_path, hashlib.md5())
+    
     @staticmethod
     def calculate_sha256(file_path: Path) -> Optional[str]:
         """
@@ -45,56 +157,98 @@ class IntegrityChecker:
         Returns:
             String hexadecimal do hash SHA256, ou None em caso de erro
         """
-        hash_sha256 = hashlib.sha256()
+        return IntegrityChecker._calculate(file_path, hashlib.sha256())
+    
+    @staticmethod
+    def calculate_blake3(file_path: Path) -> Optional[str]:
+        """
+        Calcula hash BLAKE3 de um arquivo
         
+        Com update_mmap() (blake3 >= 0.3.4), o próprio pacote mapeia o
+        arquivo e o divide entre threads; senão, mesmo caminho dos demais.
+        
+        Args:
+            file_path: Caminho do arquivo
+            
+        Returns:
+            String hexadecimal do hash BLAKE3, ou None em caso de erro
+            
+        Raises:
+            ValueError: Se o pacote blake3 não estiver instalado
+        """
+        hasher = IntegrityChecker.new_hasher('blake3')
+        update_mmap = getattr(hasher, 'update_mmap', None)
+        if update_mmap is None:
+            return IntegrityChecker._calculate(file_path, hasher)
         try:
-            with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(IntegrityChecker.CHUNK_SIZE), b""):
-                    hash_sha256.update(chunk)
-            return hash_sha256.hexdigest()
+            update_mmap(os.fspath(file_path))
+            return hasher.hexdigest()
         except Exception:
             return None
     
     @staticmethod
-    def verify_file(file_path: Path, expected_hash: str, algorithm: str = 'md5') -> bool:
+    def verify_file(file_path: Path, expected_hash: str, algorithm: str = DEFAULT_ALGORITHM) -> bool:
         """
         Verifica se o hash de um arquivo corresponde ao esperado
         
         Args:
             file_path: Caminho do arquivo
             expected_hash: Hash esperado
-            algorithm: Algoritmo ('md5' ou 'sha256')
+            algorithm: Algoritmo ('md5', 'sha256' ou 'blake3')
             
         Returns:
             True se o hash corresponde, False caso contrário
         """
-        if algorithm.lower() == 'md5':
-            actual_hash = IntegrityChecker.calculate_md5(file_path)
-        elif algorithm.lower() == 'sha256':
-            actual_hash = IntegrityChecker.calculate_sha256(file_path)
-        else:
-            raise ValueError(f"Algoritmo não suportado: {algorithm}")
+        actual_hash = IntegrityChecker.calculate_hash(file_path, algorithm)
         
-        if actual_hash is None:
+        if actual_hash is None or not expected_hash.isascii():
             return False
+        
+        # hexdigest() já sai em minúsculas; compare_digest compara em C e em
+        # tempo constante
+        return hmac.compare_digest(actual_hash, expected_hash.lower())
+    
+    @staticmethod
+    def new_hasher(algorithm: str = DEFAULT_ALGORITHM):
+        """
+        Cria objeto hash para o algoritmo especificado
+        
+        Args:
+            algorithm: Algoritmo ('md5', 'sha256' ou 'blake3')
             
-        return actual_hash.lower() == expected_hash.lower()
+        Returns:
+            Objeto hash pronto para update()
+            
+        Raises:
+            ValueError: Se algoritmo não for suportado (ou blake3 ausente)
+        """
+        algorithm = algorithm.lower()
+        if algorithm == 'md5':
+            return hashlib.md5()
+        elif algorithm == 'sha256':
+            return hashlib.sha256()
+        elif algorithm == 'blake3':
+            if blake3 is None:
+                raise ValueError("Algoritmo não suportado: blake3 (instale o pacote blake3)")
+            return blake3.blake3(max_threads=blake3.blake3.AUTO)
+        else:
+            raise ValueError(f"Algoritmo não suportado: {algorithm}")
     
     @staticmethod
-    def calculate_hash(file_path: Path, algorithm: str = 'md5') -> Optional[str]:
+    def calculate_hash(file_path: Path, algorithm: str = DEFAULT_ALGORITHM) -> Optional[str]:
         """
         Calcula hash de um arquivo usando o algoritmo especificado
         
         Args:
             file_path: Caminho do arquivo
-            algorithm: Algoritmo ('md5' ou 'sha256')
+            algorithm: Algoritmo ('md5', 'sha256' ou 'blake3')
             
         Returns:
             String hexadecimal do hash, ou None em caso de erro
+            
+        Raises:
+            ValueError: Se algoritmo não for suportado
         """
-        if algorithm.lower() == 'md5':
-            return IntegrityChecker.calculate_md5(file_path)
-        elif algorithm.lower() == 'sha256':
-            return IntegrityChecker.calculate_sha256(file_path)
-        else:
-            raise ValueError(f"Algoritmo não suportado: {algorithm}")
+        if algorithm.lower() == 'blake3':
+            return IntegrityChecker.calculate_blake3(file_path)
+        return IntegrityChecker._calculate(file_path, IntegrityChecker.new_hasher(algorithm))
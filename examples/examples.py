@@ -147,15 +147,11 @@ def exemplo_verificacao_integridade():
     
     print("Verificando integridade de todos os backups...")
     
-    integros = 0
-    corrompidos = 0
-    
-    for backup in backups[:5]:  # Verifica apenas os 5 primeiros para exemplo
-        arquivo = backup['arquivo']
-        if restore.verify_backup_integrity(arquivo):
-            integros += 1
-        else:
-            corrompidos += 1
+    # Verifica apenas os 5 primeiros para exemplo (em paralelo)
+    resultados = restore.verify_all([b['arquivo'] for b in backups[:5]])
+    
+    integros = sum(resultados.values())
+    corrompidos = len(resultados) - integros
     
     print(f"\nResultado:")
     print(f"  ✅ Íntegros: {integros}")
@@ -4,4 +4,4 @@ Restore - Sistema de restauração de backups
 
 from backup.restore.restore_manager import RestoreManager
 
-__all__ = ['RestoreManager']
+__all__ = ('RestoreManager',)
@@ -3,19 +3,24 @@ Módulo de Restauração
 Sistema interativo para restauração de backups
 """
 
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 from backup.storage.index import BackupIndex
 from backup.core.compression import get_compressor
-from backup.utils.formatters import format_bytes, format_date
+from backup.core.integrity import IntegrityChecker
+from backup.utils.formatters import format_bytes, format_date, parse_iso_date
 from backup.utils.user_input import safe_input
 
 
 class RestoreManager:
     """Gerenciador de restauração de backups"""
     
+    MAX_VERIFY_WORKERS = 8  # Limite de verificações simultâneas em verify_all()
+    
     def __init__(self, index: BackupIndex, backup_dir: Path):
         """
         Inicializa o gerenciador de restauração
@@ -32,25 +37,26 @@ class RestoreManager:
         print("\n📋 BACKUPS EXISTENTES")
         print("=" * 60)
         
-        all_backups = self.index.get_all()
+        total = len(self.index)
         
-        if not all_backups:
+        if not total:
             print("📂 Nenhum backup encontrado ainda.")
             print(f"💡 Execute um backup primeiro")
             return
         
-        # Agrupa por diretório
-        grouped = self.index.get_grouped_by_directory()
+        # Agrupa por diretório (na ordem do índice), distribuindo a visão já
+        # ordenada do índice: cada grupo sai do mais recente ao mais antigo
+        # sem ordenar grupo a grupo
+        grouped = {nome: [] for nome in self.index.get_grouped_by_directory()}
+        for backup in self.index.get_sorted_by_date(reverse=True):
+            grouped[backup.get('nome_diretorio', 'desconhecido')].append(backup)
         
         # Lista backups agrupados
         for dir_name, dir_backups in grouped.items():
             print(f"\n📁 {dir_name} ({len(dir_backups)} backups)")
             
-            # Ordena por data (mais recente primeiro)
-            dir_backups.sort(key=lambda x: x['data_criacao'], reverse=True)
-            
             for i, backup in enumerate(dir_backups):
-                data_criacao = datetime.fromisoformat(backup['data_criacao'])
+                data_criacao = parse_iso_date(backup['data_criacao'])
                 data_str = format_date(data_criacao)
                 
                 tamanho = format_bytes(backup['tamanho_backup'])
@@ -65,7 +71,7 @@ class RestoreManager:
                 print(f"      🎯 Tipo: {backup.get('tipo_diretorio', 'generico')}")
                 print(f"      📁 Origem: {backup.get('diretorio_origem', 'N/A')}")
         
-        print(f"\n📊 Total: {len(all_backups)} backups")
+        print(f"\n📊 Total: {total} backups")
     
     def interactive_restore(self) -> bool:
         """
@@ -77,9 +83,7 @@ class RestoreManager:
         print("\n🔄 RESTAURAÇÃO DE BACKUP")
         print("=" * 40)
         
-        all_backups = self.index.get_all()
-        
-        if not all_backups:
+        if not len(self.index):
             print("📂 Nenhum backup encontrado para restaurar.")
             return False
         
@@ -88,7 +92,7 @@ class RestoreManager:
         sorted_backups = self.index.get_sorted_by_date(reverse=True)
         
         for i, backup in enumerate(sorted_backups):
-            data = datetime.fromisoformat(backup['data_criacao'])
+            data = parse_iso_date(backup['data_criacao'])
             data_str = format_date(data, "%d/%m/%Y %H:%M")
             tamanho = format_bytes(backup['tamanho_backup'])
             
@@ -182,6 +186,8 @@ class RestoreManager:
             # Detecta formato pelo nome do arquivo
             if archive_path.suffix == '.gz' and archive_path.stem.endswith('.tar'):
                 formato = 'tar'
+            elif archive_path.suffix == '.zst' and archive_path.stem.endswith('.tar'):
+                formato = 'tar.zst'
             elif archive_path.suffix == '.zip':
                 formato = 'zip'
             else:
@@ -200,7 +206,7 @@ class RestoreManager:
             if backup_info:
                 print(f"\n📊 Informações do backup:")
                 print(f"   • Origem: {backup_info.get('diretorio_origem', 'N/A')}")
-                print(f"   • Data: {format_date(datetime.fromisoformat(backup_info['data_criacao']))}")
+                print(f"   • Data: {format_date(parse_iso_date(backup_info['data_criacao']))}")
                 print(f"   • Arquivos: {backup_info.get('total_arquivos', 'N/A'):,}")
                 print(f"   • Tipo: {backup_info.get('tipo_diretorio', 'generico')}")
             
@@ -222,11 +228,7 @@ class RestoreManager:
             True se bem-sucedido, False caso contrário
         """
         # Busca backup no índice
-        backup_info = None
-        for backup in self.index.get_all():
-            if backup['arquivo'] == backup_name:
-                backup_info = backup
-                break
+        backup_info = self.index.get_by_file(backup_name)
         
         if not backup_info:
             print(f"❌ Backup não encontrado no índice: {backup_name}")
@@ -250,38 +252,140 @@ class RestoreManager:
         Returns:
             True se íntegro, False caso contrário
         """
-        from backup.core.integrity import IntegrityChecker
-        
         # Busca backup no índice
-        backup_info = None
-        for backup in self.index.get_all():
-            if backup['arquivo'] == backup_name:
-                backup_info = backup
-                break
+        backup_info = self.index.get_by_file(backup_name)
+        
+        return self._verify(backup_name, backup_info)
+    
+    def verify_all(
+        self,
+        names: Optional[List[str]] = None,
+        max_workers: Optional[int] = None
+    ) -> Dict[str, bool]:
+        """
+        Verifica a integridade de vários backups em paralelo
+        
+        Cada backup é verificado numa thread: o hashlib libera o GIL durante
+        o cálculo, então leitura e hash de arquivos diferentes se sobrepõem.
+        
+        Args:
+            names: Nomes dos arquivos de backup (padrão: todos do índice)
+            max_workers: Threads simultâneas (padrão: núcleos, até MAX_VERIFY_WORKERS)
+            
+        Returns:
+            Dicionário {arquivo: íntegro}, na ordem de names
+        """
+        if names is None:
+            names = [b['arquivo'] for b in self.index.iter_all()]
+        if not names:
+            return {}
+        
+        if max_workers is None:
+            max_workers = min(self.MAX_VERIFY_WORKERS, os.cpu_count() or 1)
+        max_workers = max(1, min(max_workers, len(names)))
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            resultados = executor.map(
+                lambda name: self._verify(name, self.index.get_by_file(name)), names
+            )
+            return dict(zip(names, resultados))
+    
+    def upgrade_hashes(self, algorithm: str = 'sha256') -> int:
+        """
+        Registra um hash moderno nos backups antigos que só têm hash_md5
+        
+        Rotina de migração, executada uma vez: cada arquivo é conferido com
+        o MD5 registrado antes de receber hash_algo/hash_digest (um backup
+        corrompido não ganha um hash novo). O hash_md5 é mantido para
+        ferramentas antigas. O índice é gravado uma só vez no final.
         
+        Args:
+            algorithm: Algoritmo do novo hash ('sha256' ou 'blake3')
+            
+        Returns:
+            Número de backups atualizados
+        """
+        updates = {}
+        for backup in self.index.iter_all():
+            if backup.get('hash_digest') or not backup.get('hash_md5'):
+                continue
+            
+            nome = backup['arquivo']
+            archive_path = self.backup_dir / nome
+            if not archive_path.exists():
+                continue
+            
+            md5 = IntegrityChecker.calculate_hash(archive_path, 'md5')
+            if md5 is None or md5.lower() != backup['hash_md5'].lower():
+                print(f"⚠️  {nome}: MD5 não confere, hash não atualizado")
+                continue
+            
+            digest = IntegrityChecker.calculate_hash(archive_path, algorithm)
+            if digest:
+                updates[nome] = {'hash_algo': algorithm, 'hash_digest': digest}
+        
+        if not updates:
+            return 0
+        
+        atualizados = self.index.update_backups(updates)
+        print(f"🔒 {atualizados} backup(s) atualizados para {algorithm.upper()}")
+        return atualizados
+    
+    def _verify(self, backup_name: str, backup_info: Optional[Dict[str, Any]]) -> bool:
+        """Compara o hash de um backup com o registrado no índice"""
         if not backup_info:
             print(f"❌ Backup não encontrado no índice: {backup_name}")
             return False
         
-        expected_hash = backup_info.get('hash_md5')
+        # Backups novos registram hash_algo/hash_digest; antigos, só hash_md5
+        algorithm = backup_info.get('hash_algo', 'md5')
+        expected_hash = backup_info.get('hash_digest') or backup_info.get('hash_md5')
         if not expected_hash:
-            print(f"⚠️  Backup não possui hash MD5 registrado")
+            print(f"⚠️  Backup não possui hash registrado")
             return False
         
         archive_path = self.backup_dir / backup_name
         
-        if not archive_path.exists():
+        try:
+            tamanho = archive_path.stat().st_size
+        except FileNotFoundError:
             print(f"❌ Arquivo não encontrado: {archive_path}")
             return False
+        except OSError as e:
+            print(f"❌ Erro ao acessar {archive_path}: {e}")
+            return False
+        
+        # Tamanho diferente do registrado já prova a corrupção (um backup
+        # truncado, por exemplo) sem ler o arquivo inteiro para o hash
+        esperado = backup_info.get('tamanho_backup')
+        if esperado is not None and tamanho != esperado:
+            print(
+                f"❌ Backup corrompido! Tamanho divergente\n"
+                f"   Esperado: {esperado} bytes\n"
+                f"   Atual: {tamanho} bytes"
+            )
+            return False
         
         print(f"🔍 Verificando integridade de {backup_name}...")
-        actual_hash = IntegrityChecker.calculate_md5(archive_path)
+        try:
+            actual_hash = IntegrityChecker.calculate_hash(archive_path, algorithm)
+        except ValueError as e:
+            # Ex.: índice gravado com blake3 numa máquina que tem o pacote
+            print(f"❌ Não foi possível verificar {backup_name}: {e}")
+            return False
         
-        if actual_hash == expected_hash:
+        # Hashes gravados vêm de hexdigest() (minúsculas); lower() só por
+        # garantia em índices editados à mão
+        if actual_hash and expected_hash.isascii() and hmac.compare_digest(
+            actual_hash, expected_hash.lower()
+        ):
             print(f"✅ Backup íntegro! Hash: {actual_hash[:16]}...")
             return True
         else:
-            print(f"❌ Backup corrompido!")
-            print(f"   Esperado: {expected_hash[:16]}...")
-            print(f"   Atual: {actual_hash[:16] if actual_hash else 'N/A'}...")
+            # Um único print: verify_all() roda verificações em paralelo
+            print(
+                f"❌ Backup corrompido!\n"
+                f"   Esperado: {expected_hash[:16]}...\n"
+                f"   Atual: {actual_hash[:16] if actual_hash else 'N/A'}..."
+            )
             return False
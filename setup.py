@@ -1,18 +1,43 @@
+from pathlib import Path
+
 from setuptools import setup, find_packages
 
+# Lê a versão de _version.py sem importar o pacote
+VERSION_INFO = {}
+exec((Path(__file__).parent / "_version.py").read_text(encoding="utf-8"), VERSION_INFO)
+
+# A raiz do repositório É o pacote `backup`. Sem o mapeamento abaixo,
+# find_packages() instalaria `core`, `storage`, etc. como pacotes de topo,
+# criando uma segunda raiz que duplica módulos (e classes) já carregados
+# via `backup.*`.
+SUBPACKAGES = find_packages(exclude=["tests", "tests.*"])
+
 setup(
     name="backup-universal",
-    version="1.2.0",
+    version=VERSION_INFO["__version__"],
     description="Sistema inteligente de backup para Linux",
     author="Montezuma",
     author_email="",
     url="https://github.com/montezuma-p/backup-universal",
-    packages=find_packages(),
+    packages=["backup"] + [f"backup.{pkg}" for pkg in SUBPACKAGES],
+    package_dir={"backup": "."},
     python_requires=">=3.8",
     install_requires=[
         "rich>=10.0.0",
     ],
     extras_require={
+        "zstd": [
+            "zstandard>=0.15.0",
+        ],
+        "json": [
+            "orjson>=3.0.0",
+        ],
+        "blake3": [
+            "blake3>=0.3.0",
+        ],
+        "trash": [
+            "send2trash>=1.8.0",
+        ],
         "dev": [
             "pytest>=7.0.0",
             "pytest-cov>=4.0.0",
@@ -5,7 +5,7 @@ Storage - Gerenciamento de armazenamento e índice de backups
 from backup.storage.index import BackupIndex
 from backup.storage.cleanup import CleanupManager
 
-__all__ = [
+__all__ = (
     'BackupIndex',
     'CleanupManager'
-]
+)
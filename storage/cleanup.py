@@ -3,27 +3,220 @@ Módulo de Limpeza
 Gerenciamento de políticas de retenção e limpeza de backups antigos
 """
 
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Tuple
+from typing import Iterator, List, Dict, Any, Optional, Tuple, Union
 
 from backup.storage.index import BackupIndex
-from backup.utils.formatters import format_bytes, format_date
+from backup.utils.formatters import format_bytes, format_date, parse_iso_date
+
+
+# stat/unlink relativos a um diretório aberto (POSIX; no Windows, caminhos)
+_DIR_FD_SUPPORTED = os.stat in os.supports_dir_fd and os.unlink in os.supports_dir_fd
+
+# Separadores dos relatórios, montados uma vez
+SEPARADOR_LIMPEZA = "=" * 50
+SEPARADOR_RESUMO = "=" * 30
+SEPARADOR_ORFAOS = "=" * 40
+
+
+def _load_send2trash():
+    """Importa send2trash sob demanda, com mensagem clara se ausente"""
+    try:
+        from send2trash import send2trash
+    except ImportError:
+        raise RuntimeError(
+            "Enviar para a lixeira requer o pacote 'send2trash' "
+            "(pip install backup-universal[trash])"
+        )
+    return send2trash
+
+
+def _is_before(data_iso: str, limite_iso: str, limite: datetime) -> bool:
+    """
+    Indica se a data ISO é anterior ao limite
+    
+    Datas no formato gravado por datetime.isoformat() (sem fuso, com ou sem
+    microssegundos) são comparadas como texto, sem conversão; qualquer outro
+    formato é convertido antes de comparar.
+    """
+    if len(data_iso) in (19, 26) and data_iso[10] == 'T':
+        return data_iso < limite_iso
+    return parse_iso_date(data_iso) < limite
+
+
+def _try_unlink(file_path: Union[str, Path], dir_fd: Optional[int] = None) -> Optional[OSError]:
+    """Apaga um arquivo, retornando o erro em vez de propagá-lo"""
+    try:
+        os.unlink(file_path, dir_fd=dir_fd)
+    except OSError as e:
+        return e
+    return None
 
 
 class CleanupManager:
     """Gerenciador de limpeza de backups antigos"""
     
-    def __init__(self, index: BackupIndex, backup_dir: Path):
+    PARALLEL_UNLINK_MIN = 16  # Órfãos a partir dos quais a remoção usa threads
+    MAX_UNLINK_WORKERS = 32  # Limite de remoções simultâneas
+    BACKUP_SUFFIXES = ('.tar.gz', '.tar.zst', '.zip')  # Arquivos de backup
+    OLDEST_BATCH_MIN = 16  # Mais antigos buscados de início em cleanup_by_size()
+    
+    def __init__(
+        self,
+        index: BackupIndex,
+        backup_dir: Path,
+        verbose: bool = True,
+        use_trash: bool = False
+    ):
         """
         Inicializa o gerenciador de limpeza
         
         Args:
             index: Instância do BackupIndex
             backup_dir: Diretório onde os backups estão armazenados
+            verbose: Se False, não imprime nada (só retorna as estatísticas)
+            use_trash: Se True, envia os arquivos para a lixeira em vez de
+                       apagá-los (requer send2trash)
+            
+        Raises:
+            RuntimeError: Se use_trash=True e send2trash não está instalado
         """
         self.index = index
         self.backup_dir = Path(backup_dir)
+        self.verbose = verbose
+        self._send2trash = _load_send2trash() if use_trash else None
+    
+    def _log(self, *linhas: str) -> None:
+        """Imprime as linhas de uma só vez (nada, se verbose=False)"""
+        if self.verbose:
+            print("\n".join(linhas))
+    
+    @contextmanager
+    def _backup_dir_fd(self) -> Iterator[Optional[int]]:
+        """
+        Abre o diretório de backups uma vez para operações relativas a ele
+        
+        Com o descritor, stat e unlink recebem só o nome do arquivo e o
+        kernel não percorre o caminho do diretório a cada chamada.
+        
+        Yields:
+            Descritor do diretório, ou None (sem suporte a dir_fd ou
+            diretório inacessível: usa caminhos completos)
+        """
+        fd = None
+        if _DIR_FD_SUPPORTED:
+            try:
+                fd = os.open(self.backup_dir, os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0))
+            except OSError:
+                fd = None
+        try:
+            yield fd
+        finally:
+            if fd is not None:
+                os.close(fd)
+    
+    def _unlink_backup(self, arquivo: str, dir_fd: Optional[int] = None) -> Optional[int]:
+        """
+        Apaga um arquivo de backup e retorna o tamanho liberado
+        
+        Um stat e um unlink por arquivo: a ausência é detectada pelo próprio
+        stat, sem um exists() antes.
+        
+        Args:
+            arquivo: Nome do arquivo de backup
+            dir_fd: Descritor do diretório de backups (ver _backup_dir_fd())
+            
+        Returns:
+            Tamanho em bytes, ou None se o arquivo não existe
+            
+        Raises:
+            OSError: Se o arquivo existe mas não pôde ser apagado
+        """
+        caminho = arquivo if dir_fd is not None else os.path.join(self.backup_dir, arquivo)
+        try:
+            file_size = os.stat(caminho, dir_fd=dir_fd).st_size
+            os.unlink(caminho, dir_fd=dir_fd)
+        except FileNotFoundError:
+            return None
+        return file_size
+    
+    def _trash(self, caminhos: List[str]) -> List[Optional[OSError]]:
+        """
+        Envia arquivos para a lixeira numa única chamada ao send2trash
+        
+        Returns:
+            Erro de cada caminho (None se foi para a lixeira)
+        """
+        if not caminhos:
+            return []
+        try:
+            self._send2trash(caminhos)
+            return [None] * len(caminhos)
+        except OSError:
+            pass
+        
+        # O envio em lote para no primeiro erro: os que já sumiram foram para
+        # a lixeira, os demais são tentados um a um para saber quais falham
+        erros = []
+        for caminho in caminhos:
+            if not os.path.lexists(caminho):
+                erros.append(None)
+                continue
+            try:
+                self._send2trash(caminho)
+                erros.append(None)
+            except OSError as e:
+                erros.append(e)
+        return erros
+    
+    def _delete_backups(
+        self,
+        arquivos: List[str],
+        dir_fd: Optional[int] = None
+    ) -> List[Tuple[Optional[int], Optional[OSError]]]:
+        """
+        Apaga (ou envia para a lixeira) arquivos de backup
+        
+        Args:
+            arquivos: Nomes dos arquivos de backup
+            dir_fd: Descritor do diretório de backups (ver _backup_dir_fd())
+            
+        Returns:
+            (tamanho liberado ou None se o arquivo não existe, erro ou None)
+            para cada arquivo, na mesma ordem
+        """
+        if self._send2trash is None:
+            resultados = []
+            for arquivo in arquivos:
+                try:
+                    resultados.append((self._unlink_backup(arquivo, dir_fd), None))
+                except OSError as e:
+                    resultados.append((None, e))
+            return resultados
+        
+        # Lixeira: tamanhos primeiro, depois um único envio dos existentes
+        resultados = []
+        existentes = []
+        for arquivo in arquivos:
+            caminho = os.path.join(self.backup_dir, arquivo)
+            try:
+                resultados.append((os.stat(caminho).st_size, None))
+                existentes.append((len(resultados) - 1, caminho))
+            except FileNotFoundError:
+                resultados.append((None, None))
+            except OSError as e:
+                resultados.append((None, e))
+        
+        erros = self._trash([caminho for _, caminho in existentes])
+        for (posicao, _), erro in zip(existentes, erros):
+            if erro is not None:
+                resultados[posicao] = (None, erro)
+        return resultados
     
     def cleanup_old_backups(
         self,
@@ -40,86 +233,41 @@ class CleanupManager:
         Returns:
             Dicionário com estatísticas da limpeza
         """
-        print(f"\n🧹 LIMPANDO BACKUPS ANTIGOS")
-        print(f"📋 Critérios:")
-        print(f"   • Manter no máximo {max_per_directory} backups por diretório")
-        print(f"   • Manter backups dos últimos {days_to_keep} dias")
-        print("=" * 50)
+        self._log(
+            "\n🧹 LIMPANDO BACKUPS ANTIGOS",
+            "📋 Critérios:",
+            f"   • Manter no máximo {max_per_directory} backups por diretório",
+            f"   • Manter backups dos últimos {days_to_keep} dias",
+            SEPARADOR_LIMPEZA
+        )
         
-        all_backups = self.index.get_all()
+        total_backups = len(self.index)
         
-        if not all_backups:
-            print("📂 Nenhum backup para limpar.")
+        if not total_backups:
+            self._log("📂 Nenhum backup para limpar.")
             return {
                 'removed_count': 0,
                 'freed_space': 0,
                 'kept_count': 0
             }
         
-        # Data limite
-        date_limit = datetime.now() - timedelta(days=days_to_keep)
+        plan = self._plan_cleanup(days_to_keep, max_per_directory)
+        backups_to_remove, freed_space = self._execute_plan(plan)
         
-        # Agrupa por diretório
-        grouped = self.index.get_grouped_by_directory()
+        # Remove do índice (uma única gravação)
+        self.index.remove_backups(backups_to_remove)
         
-        backups_to_remove = []
-        freed_space = 0
-        
-        # Aplica critérios de limpeza
-        for dir_name, dir_backups in grouped.items():
-            # Ordena por data (mais recente primeiro)
-            dir_backups.sort(key=lambda x: x['data_criacao'], reverse=True)
-            
-            print(f"\n📁 Processando: {dir_name}")
-            
-            for i, backup in enumerate(dir_backups):
-                data_backup = datetime.fromisoformat(backup['data_criacao'])
-                arquivo_backup = self.backup_dir / backup['arquivo']
-                
-                should_remove = False
-                reason = ""
-                
-                # Critério 1: Excede limite de backups
-                if i >= max_per_directory:
-                    should_remove = True
-                    reason = f"excede limite ({max_per_directory} por diretório)"
-                
-                # Critério 2: Mais antigo que days_to_keep
-                elif data_backup < date_limit:
-                    should_remove = True
-                    reason = f"mais antigo que {days_to_keep} dias"
-                
-                if should_remove:
-                    if arquivo_backup.exists():
-                        try:
-                            file_size = arquivo_backup.stat().st_size
-                            arquivo_backup.unlink()
-                            freed_space += file_size
-                            
-                            date_str = format_date(data_backup, "%d/%m/%Y")
-                            size_str = format_bytes(file_size)
-                            print(f"   🗑️  Removido: {backup['arquivo']} ({date_str}, {size_str}) - {reason}")
-                            
-                        except Exception as e:
-                            print(f"   ⚠️  Erro ao remover {backup['arquivo']}: {e}")
-                            continue
-                    else:
-                        print(f"   ⚠️  Arquivo {backup['arquivo']} não encontrado (removido do índice)")
-                    
-                    backups_to_remove.append(backup['arquivo'])
-        
-        # Remove do índice
-        for arquivo in backups_to_remove:
-            self.index.remove_backup(arquivo)
-        
-        kept_count = len(all_backups) - len(backups_to_remove)
+        kept_count = total_backups - len(backups_to_remove)
         
         # Relatório final
-        print(f"\n✅ LIMPEZA CONCLUÍDA")
-        print("=" * 30)
-        print(f"🗑️  Backups removidos: {len(backups_to_remove)}")
-        print(f"💾 Espaço liberado: {format_bytes(freed_space)}")
-        print(f"📁 Backups mantidos: {kept_count}")
+        if self.verbose:
+            self._log(
+                "\n✅ LIMPEZA CONCLUÍDA",
+                SEPARADOR_RESUMO,
+                f"🗑️  Backups removidos: {len(backups_to_remove)}",
+                f"💾 Espaço liberado: {format_bytes(freed_space)}",
+                f"📁 Backups mantidos: {kept_count}"
+            )
         
         return {
             'removed_count': len(backups_to_remove),
@@ -127,6 +275,92 @@ class CleanupManager:
             'kept_count': kept_count
         }
     
+    def _plan_cleanup(
+        self,
+        days_to_keep: int,
+        max_per_directory: int
+    ) -> List[Tuple[str, List[Tuple[Dict[str, Any], str, str]]]]:
+        """
+        Decide, numa única passada pelo índice, o que cleanup_old_backups() remove
+        
+        Returns:
+            Lista [(nome_diretorio, [(backup, data_iso, motivo)])], com todos os
+            diretórios na ordem do índice (mesmo os sem remoções)
+        """
+        date_limit = datetime.now() - timedelta(days=days_to_keep)
+        date_limit_iso = date_limit.isoformat()
+        limite_excedido = f"excede limite ({max_per_directory} por diretório)"
+        antigo = f"mais antigo que {days_to_keep} dias"
+        
+        # Percorre a ordenação memorizada do índice (mais recente primeiro):
+        # a posição de cada backup no seu diretório é só um contador
+        kept: Dict[str, int] = {}
+        plan = {nome: [] for nome in self.index.get_grouped_by_directory()}
+        for backup in self.index.get_sorted_by_date(reverse=True):
+            dir_name = backup.get('nome_diretorio', 'desconhecido')
+            posicao = kept.get(dir_name, 0)
+            kept[dir_name] = posicao + 1
+            
+            data_backup = backup['data_criacao']
+            
+            # Critério 1: Excede limite de backups
+            if posicao >= max_per_directory:
+                plan[dir_name].append((backup, data_backup, limite_excedido))
+            # Critério 2: Mais antigo que days_to_keep
+            elif _is_before(data_backup, date_limit_iso, date_limit):
+                plan[dir_name].append((backup, data_backup, antigo))
+        
+        return list(plan.items())
+    
+    def _execute_plan(
+        self,
+        plan: List[Tuple[str, List[Tuple[Dict[str, Any], str, str]]]]
+    ) -> Tuple[List[str], int]:
+        """
+        Apaga os arquivos planejados por _plan_cleanup(), informando cada um
+        
+        O relatório é impresso de uma vez por diretório, não linha a linha;
+        com verbose=False as linhas nem chegam a ser formatadas.
+        
+        Returns:
+            Tupla (nomes a tirar do índice, bytes liberados). Backups cujo
+            arquivo não pôde ser apagado ficam fora da lista.
+        """
+        backups_to_remove = []
+        freed_space = 0
+        verbose = self.verbose
+        
+        # Todos os arquivos de uma vez (com a lixeira, um único envio)
+        with self._backup_dir_fd() as dir_fd:
+            resultados = iter(self._delete_backups([
+                backup['arquivo'] for _, removals in plan for backup, _, _ in removals
+            ], dir_fd))
+        
+        for dir_name, removals in plan:
+            relatorio = [f"\n📁 Processando: {dir_name}"]
+            
+            for backup, data_backup, reason in removals:
+                file_size, erro = next(resultados)
+                if erro is not None:
+                    relatorio.append(f"   ⚠️  Erro ao remover {backup['arquivo']}: {erro}")
+                    continue
+                
+                if file_size is not None:
+                    freed_space += file_size
+                    
+                    if verbose:
+                        date_str = format_date(parse_iso_date(data_backup), "%d/%m/%Y")
+                        size_str = format_bytes(file_size)
+                        relatorio.append(f"   🗑️  Removido: {backup['arquivo']} ({date_str}, {size_str}) - {reason}")
+                elif verbose:
+                    relatorio.append(f"   ⚠️  Arquivo {backup['arquivo']} não encontrado (removido do índice)")
+                
+                backups_to_remove.append(backup['arquivo'])
+            
+            self._log(*relatorio)
+        
+        return backups_to_remove, freed_space
+    
     def cleanup_by_size(self, max_total_size_gb: int) -> Dict[str, Any]:
         """
         Remove backups mais antigos até ficar abaixo do limite de tamanho
@@ -141,52 +375,54 @@ class CleanupManager:
         current_size = self.index.get_total_size()
         
         if current_size <= max_size_bytes:
-            print(f"✅ Tamanho total ({format_bytes(current_size)}) está dentro do limite.")
+            if self.verbose:
+                self._log(f"✅ Tamanho total ({format_bytes(current_size)}) está dentro do limite.")
             return {
                 'removed_count': 0,
                 'freed_space': 0,
                 'kept_count': len(self.index)
             }
         
-        print(f"\n🧹 LIMPANDO POR TAMANHO")
-        print(f"📊 Tamanho atual: {format_bytes(current_size)}")
-        print(f"📏 Limite: {format_bytes(max_size_bytes)}")
-        print(f"📉 Necessário liberar: {format_bytes(current_size - max_size_bytes)}")
-        print("=" * 50)
-        
-        # Ordena backups por data (mais antigo primeiro)
-        sorted_backups = self.index.get_sorted_by_date(reverse=False)
+        if self.verbose:
+            self._log(
+                "\n🧹 LIMPANDO POR TAMANHO",
+                f"📊 Tamanho atual: {format_bytes(current_size)}",
+                f"📏 Limite: {format_bytes(max_size_bytes)}",
+                f"📉 Necessário liberar: {format_bytes(current_size - max_size_bytes)}",
+                SEPARADOR_LIMPEZA
+            )
         
         backups_to_remove = []
         freed_space = 0
+        relatorio = []
         
         # Remove mais antigos até ficar abaixo do limite
-        for backup in sorted_backups:
-            if current_size - freed_space <= max_size_bytes:
-                break
-            
-            arquivo_backup = self.backup_dir / backup['arquivo']
-            
-            if arquivo_backup.exists():
-                try:
-                    file_size = arquivo_backup.stat().st_size
-                    arquivo_backup.unlink()
-                    freed_space += file_size
-                    
-                    data_backup = datetime.fromisoformat(backup['data_criacao'])
-                    print(f"   🗑️  Removido: {backup['arquivo']} ({format_date(data_backup, '%d/%m/%Y')})")
-                    
-                except Exception as e:
-                    print(f"   ⚠️  Erro ao remover {backup['arquivo']}: {e}")
+        with self._backup_dir_fd() as dir_fd:
+            for backup in self._oldest_first():
+                if current_size - freed_space <= max_size_bytes:
+                    break
+                
+                # Um a um: cada tamanho liberado decide se a limpeza continua
+                file_size, erro = self._delete_backups([backup['arquivo']], dir_fd)[0]
+                if erro is not None:
+                    relatorio.append(f"   ⚠️  Erro ao remover {backup['arquivo']}: {erro}")
                     continue
-            
-            backups_to_remove.append(backup['arquivo'])
+                
+                if file_size is not None:
+                    freed_space += file_size
+                
+                    if self.verbose:
+                        data_backup = parse_iso_date(backup['data_criacao'])
+                        relatorio.append(f"   🗑️  Removido: {backup['arquivo']} ({format_date(data_backup, '%d/%m/%Y')})")
+                
+                backups_to_remove.append(backup['arquivo'])
         
-        # Remove do índice
-        for arquivo in backups_to_remove:
-            self.index.remove_backup(arquivo)
+        # Remove do índice (uma única gravação)
+        self.index.remove_backups(backups_to_remove)
         
-        print(f"\n✅ Espaço liberado: {format_bytes(freed_space)}")
+        if self.verbose:
+            relatorio.append(f"\n✅ Espaço liberado: {format_bytes(freed_space)}")
+            self._log(*relatorio)
         
         return {
             'removed_count': len(backups_to_remove),
@@ -194,6 +430,17 @@ class CleanupManager:
             'kept_count': len(self.index)
         }
     
+    def _oldest_first(self) -> Iterator[Dict[str, Any]]:
+        """
+        Percorre os backups do mais antigo ao mais recente
+        
+        Começa pelos mais antigos sem ordenar o índice inteiro; a ordenação
+        completa só é feita se a limpeza precisar ir além deles.
+        """
+        k = max(self.OLDEST_BATCH_MIN, len(self.index) // 10)
+        yield from self.index.get_oldest(k)
+        yield from self.index.get_sorted_by_date(reverse=False)[k:]
+    
     def remove_orphaned_files(self) -> int:
         """
         Remove arquivos de backup que não estão no índice
@@ -201,41 +448,59 @@ class CleanupManager:
         Returns:
             Número de arquivos órfãos removidos
         """
-        print(f"\n🧹 PROCURANDO ARQUIVOS ÓRFÃOS")
-        print("=" * 40)
+        self._log("\n🧹 PROCURANDO ARQUIVOS ÓRFÃOS", SEPARADOR_ORFAOS)
         
         if not self.backup_dir.exists():
-            print("📂 Diretório de backups não encontrado.")
+            self._log("📂 Diretório de backups não encontrado.")
             return 0
         
-        # Lista todos os arquivos de backup no diretório
-        backup_files = set()
-        for ext in ['*.tar.gz', '*.zip']:
-            backup_files.update(self.backup_dir.glob(ext))
-        
-        # Arquivos no índice
-        indexed_files = set(
-            self.backup_dir / b['arquivo']
-            for b in self.index.get_all()
-        )
+        # Lista os arquivos de backup numa única leitura do diretório (o tipo
+        # vem da própria listagem, sem um stat por entrada)
+        with os.scandir(self.backup_dir) as entries:
+            backup_names = {
+                entry.name for entry in entries
+                if entry.name.endswith(self.BACKUP_SUFFIXES) and entry.is_file()
+            }
         
-        # Arquivos órfãos
-        orphaned = backup_files - indexed_files
+        # Arquivos no índice, comparados por nome: Path só para os órfãos
+        indexed_names = {b.get('arquivo') for b in self.index.iter_all()}
+        orphaned = [
+            self.backup_dir / name
+            for name in sorted(backup_names - indexed_names)
+        ]
         
         if not orphaned:
-            print("✅ Nenhum arquivo órfão encontrado.")
+            self._log("✅ Nenhum arquivo órfão encontrado.")
             return 0
         
-        print(f"⚠️  Encontrados {len(orphaned)} arquivos órfãos:")
+        self._log(f"⚠️  Encontrados {len(orphaned)} arquivos órfãos:")
+        
+        # Com muitos órfãos, os unlink (que liberam o GIL) rodam em threads;
+        # as mensagens são impressas depois, na ordem dos arquivos
+        if self._send2trash is not None:
+            erros = self._trash([str(file_path) for file_path in orphaned])
+        else:
+            with self._backup_dir_fd() as dir_fd:
+                # Com o diretório aberto, basta o nome de cada órfão
+                alvos = [p.name for p in orphaned] if dir_fd is not None else orphaned
+                unlink = partial(_try_unlink, dir_fd=dir_fd)
+                if len(orphaned) > self.PARALLEL_UNLINK_MIN:
+                    workers = min(self.MAX_UNLINK_WORKERS, len(orphaned))
+                    with ThreadPoolExecutor(max_workers=workers) as executor:
+                        erros = list(executor.map(unlink, alvos))
+                else:
+                    erros = [unlink(alvo) for alvo in alvos]
         
         removed = 0
-        for file_path in orphaned:
-            try:
-                file_path.unlink()
-                print(f"   🗑️  Removido: {file_path.name}")
+        relatorio = []
+        for file_path, erro in zip(orphaned, erros):
+            if erro is None:
+                if self.verbose:
+                    relatorio.append(f"   🗑️  Removido: {file_path.name}")
                 removed += 1
-            except Exception as e:
-                print(f"   ⚠️  Erro ao remover {file_path.name}: {e}")
+            else:
+                relatorio.append(f"   ⚠️  Erro ao remover {file_path.name}: {erro}")
         
-        print(f"\n✅ {removed} arquivos órfãos removidos.")
+        relatorio.append(f"\n✅ {removed} arquivos órfãos removidos.")
+        self._log(*relatorio)
         return removed
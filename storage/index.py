@@ -1,17 +1,79 @@
 """
 Módulo de Índice
 Gerenciamento do índice JSON de backups
+
+O índice é gravado em JSON Lines (.jsonl, um backup por linha) para que
+registrar um backup seja só acrescentar uma linha; remoções também são
+linhas acrescentadas (marcadores), e o arquivo é compactado quando as linhas
+mortas passam das vivas. Índices .json (lista única) continuam suportados.
 """
 
+import heapq
 import json
+import os
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import Iterable, Iterator, List, Dict, Any, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # Opcional: pip install backup-universal[json]
+    orjson = None
+
+
+# json.dumps com opções fora do padrão monta um encoder a cada chamada (uma
+# por linha no JSON Lines); estes são montados uma vez
+_JSON_ENCODER = json.JSONEncoder(indent=2, ensure_ascii=False)
+_JSON_LINE_ENCODER = json.JSONEncoder(ensure_ascii=False)
+
+
+# Índices já lidos: {caminho: ((st_mtime_ns, st_size), entradas, linhas mortas)}.
+# Um novo BackupIndex() do mesmo arquivo, sem alteração em disco, copia as
+# entradas em vez de reler e reparsear o arquivo.
+_CACHE: Dict[str, Tuple[Tuple[int, int], List[Dict[str, Any]], int]] = {}
+
+
+def _date_key(backup: Dict[str, Any]) -> str:
+    """Chave de ordenação por data (a string ISO ordena como a data)"""
+    return backup.get('data_criacao', '')
+
+
+def _copy_entries(backups: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copia as entradas (cada instância altera as suas sem afetar o cache)"""
+    return [dict(b) for b in backups]
+
+
+def _dumps(data: Any) -> bytes:
+    """Serializa o índice em JSON UTF-8 indentado (orjson se disponível)"""
+    if orjson is not None:
+        # Chaves não-string viram string, como no json da stdlib
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return _JSON_ENCODER.encode(data).encode('utf-8')
+
+
+def _dumps_line(entry: Dict[str, Any]) -> bytes:
+    """Serializa uma entrada como uma linha JSON Lines"""
+    if orjson is not None:
+        return orjson.dumps(entry, option=orjson.OPT_NON_STR_KEYS) + b"\n"
+    return _JSON_LINE_ENCODER.encode(entry).encode('utf-8') + b"\n"
+
+
+def _loads(raw: bytes) -> Any:
+    """Desserializa o índice (orjson se disponível)"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
 
 
 class BackupIndex:
     """Gerenciador do índice de backups"""
     
+    # Linha de remoção no JSON Lines: {"_removido": "<arquivo>"}
+    TOMBSTONE_KEY = "_removido"
+    # Compacta quando as linhas mortas (marcadores e entradas removidas)
+    # passam deste mínimo e do número de entradas vivas
+    COMPACT_MIN_DEAD_LINES = 32
+    
     def __init__(self, index_path: Path):
         """
         Inicializa o gerenciador de índice
@@ -21,28 +83,161 @@ class BackupIndex:
         """
         self.index_path = Path(index_path)
         self._backups: List[Dict[str, Any]] = []
+        self._dead_lines = 0
+        # Visões montadas sob demanda e descartadas a cada mudança:
+        # {arquivo: entrada}, {hash: entrada}, {diretório: entradas} e
+        # {reverse: lista ordenada por data}
+        self._by_file: Optional[Dict[str, Dict[str, Any]]] = None
+        self._by_hash: Optional[Dict[str, Dict[str, Any]]] = None
+        self._grouped: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        self._sorted: Dict[bool, List[Dict[str, Any]]] = {}
+        # Soma de tamanho_backup, somada uma vez e depois ajustada a cada
+        # adição/remoção (None: ainda não calculada)
+        self._total_size: Optional[int] = None
         self.load()
     
+    @property
+    def is_jsonl(self) -> bool:
+        """True se o índice é gravado em JSON Lines"""
+        return self.index_path.suffix == ".jsonl"
+    
+    @property
+    def legacy_path(self) -> Path:
+        """Índice .json antigo, migrado no primeiro carregamento do .jsonl"""
+        return self.index_path.with_suffix(".json")
+    
     def load(self) -> None:
         """Carrega índice do arquivo JSON"""
-        if not self.index_path.exists():
+        self._dead_lines = 0
+        self._invalidate_views()
+        self._total_size = None
+        try:
+            st = os.stat(self.index_path)
+        except OSError:
             self._backups = []
+            if self.is_jsonl and self.legacy_path.exists():
+                self._migrate_legacy()
+            return
+        
+        chave = str(self.index_path)
+        assinatura = (st.st_mtime_ns, st.st_size)
+        cached = _CACHE.get(chave)
+        if cached is not None and cached[0] == assinatura:
+            self._backups = _copy_entries(cached[1])
+            self._dead_lines = cached[2]
             return
         
         try:
-            with open(self.index_path, 'r', encoding='utf-8') as f:
-                self._backups = json.load(f)
-        except (json.JSONDecodeError, IOError):
+            raw = self.index_path.read_bytes()
+        except IOError:
             self._backups = []
+            return
+        
+        if self.is_jsonl:
+            self._backups, self._dead_lines = self._parse_lines(raw)
+        else:
+            try:
+                backups = _loads(raw)
+            except ValueError:  # JSONDecodeError de ambos é ValueError
+                backups = None
+            # Conteúdo que não é uma lista de entradas conta como corrompido
+            if not isinstance(backups, list) or not all(isinstance(b, dict) for b in backups):
+                backups = []
+            self._backups = backups
+        _CACHE[chave] = (assinatura, _copy_entries(self._backups), self._dead_lines)
+    
+    @classmethod
+    def _parse_lines(cls, raw: bytes) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Lê as entradas de um índice JSON Lines, aplicando as remoções
+        
+        Linhas inválidas (por exemplo, a última truncada por uma queda durante
+        a escrita) são ignoradas sem perder as demais.
+        
+        Returns:
+            Tupla (entradas vivas, número de linhas mortas)
+        """
+        backups = []
+        dead = 0
+        for line in raw.splitlines():
+            if not line.strip():
+                continue
+            try:
+                entry = _loads(line)
+            except ValueError:
+                continue
+            if not isinstance(entry, dict):
+                continue  # Linha válida em JSON mas que não é uma entrada
+            
+            removido = entry.get(cls.TOMBSTONE_KEY)
+            if removido is None:
+                backups.append(entry)
+                continue
+            # Marcador: descarta as entradas anteriores desse arquivo
+            vivos = [b for b in backups if b.get('arquivo') != removido]
+            dead += 1 + len(backups) - len(vivos)
+            backups = vivos
+        return backups, dead
+    
+    def _invalidate_views(self) -> None:
+        """Descarta as visões memorizadas (busca por arquivo, ordenações)"""
+        self._by_file = None
+        self._by_hash = None
+        self._grouped = None
+        self._sorted = {}
+    
+    def _migrate_legacy(self) -> None:
+        """Converte o índice .json antigo para o .jsonl (o antigo é mantido)"""
+        try:
+            backups = _loads(self.legacy_path.read_bytes())
+        except (ValueError, IOError):
+            return
+        
+        if isinstance(backups, list):
+            self._backups = backups
+            self.save()
     
     def save(self) -> None:
         """Salva índice no arquivo JSON"""
+        # As entradas em memória podem diferir do que a releitura daria (chaves
+        # não-string, por exemplo): o próximo load() relê o arquivo gravado
+        _CACHE.pop(str(self.index_path), None)
         try:
             # Garante que o diretório existe
             self.index_path.parent.mkdir(parents=True, exist_ok=True)
             
-            with open(self.index_path, 'w', encoding='utf-8') as f:
-                json.dump(self._backups, f, indent=2, ensure_ascii=False)
+            if self.is_jsonl:
+                data = b"".join(_dumps_line(b) for b in self._backups)
+            else:
+                data = _dumps(self._backups)
+            
+            # Grava ao lado e troca atomicamente: uma queda no meio da
+            # reescrita não deixa o índice pela metade
+            tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+                f.flush()
+                # Dados no disco antes da troca: sem isso, uma queda logo após
+                # o replace pode deixar o índice vazio
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.index_path)
+            self._dead_lines = 0
+        except Exception as e:
+            print(f"⚠️  Aviso: Erro ao salvar índice: {e}")
+    
+    def _append_lines(self, entries: List[Dict[str, Any]]) -> None:
+        """Acrescenta várias linhas ao índice JSON Lines numa única escrita"""
+        _CACHE.pop(str(self.index_path), None)  # O arquivo vai mudar
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.index_path, 'a+b') as f:
+                # Fecha uma última linha truncada para não corromper a nova
+                end = f.seek(0, 2)
+                if end:
+                    f.seek(end - 1)
+                    if f.read(1) != b"\n":
+                        f.write(b"\n")
+                f.write(b"".join(_dumps_line(entry) for entry in entries))
         except Exception as e:
             print(f"⚠️  Aviso: Erro ao salvar índice: {e}")
     
@@ -50,34 +245,182 @@ class BackupIndex:
         """
         Adiciona um backup ao índice
         
+        Em JSON Lines só a nova linha é gravada, sem reescrever o arquivo.
+        
         Args:
             backup_info: Dicionário com informações do backup
         """
-        self._backups.append(backup_info)
-        self.save()
+        self.add_backups([backup_info])
+    
+    def add_backups(self, backups: Iterable[Dict[str, Any]]) -> int:
+        """
+        Adiciona vários backups ao índice com uma única gravação
+        
+        Em JSON Lines as novas linhas são acrescentadas numa única escrita.
+        
+        Args:
+            backups: Dicionários com informações dos backups
+            
+        Returns:
+            Número de entradas adicionadas
+        """
+        novos = list(backups)
+        if not novos:
+            return 0
+        self._backups.extend(novos)
+        self._invalidate_views()
+        if self._total_size is not None:
+            for backup in novos:
+                self._total_size += backup.get('tamanho_backup', 0)
+        if self.is_jsonl:
+            self._append_lines(novos)
+        else:
+            self.save()
+        return len(novos)
     
     def remove_backup(self, arquivo: str) -> bool:
         """
         Remove um backup do índice pelo nome do arquivo
         
+        Em JSON Lines só um marcador de remoção é acrescentado; o arquivo é
+        reescrito (compactado) quando as linhas mortas passam das vivas.
+        
         Args:
             arquivo: Nome do arquivo de backup
             
         Returns:
             True se removido, False se não encontrado
         """
-        original_len = len(self._backups)
-        self._backups = [b for b in self._backups if b.get('arquivo') != arquivo]
+        # Nome ausente: a consulta ao dicionário evita refiltrar a lista
+        if self.get_by_file(arquivo) is None:
+            return False
+        return self.remove_backups([arquivo]) > 0
+    
+    def remove_backups(self, arquivos: Iterable[str]) -> int:
+        """
+        Remove vários backups do índice com uma única gravação
+        
+        A lista é filtrada uma só vez; em JSON Lines, os marcadores de remoção
+        são acrescentados numa única escrita (ou o arquivo é compactado).
         
-        if len(self._backups) < original_len:
+        Args:
+            arquivos: Nomes dos arquivos de backup
+            
+        Returns:
+            Número de entradas removidas
+        """
+        nomes = set(arquivos)
+        vivos = []
+        encontrados = []
+        tamanho_removido = 0
+        for backup in self._backups:
+            arquivo = backup.get('arquivo')
+            if arquivo in nomes:
+                encontrados.append(arquivo)
+                tamanho_removido += backup.get('tamanho_backup', 0)
+            else:
+                vivos.append(backup)
+        
+        if not encontrados:
+            return 0
+        self._backups = vivos
+        self._invalidate_views()
+        if self._total_size is not None:
+            self._total_size -= tamanho_removido
+        
+        if not self.is_jsonl:
             self.save()
-            return True
-        return False
+            return len(encontrados)
+        
+        # Um marcador por nome encontrado (na ordem do índice)
+        marcadores = list(dict.fromkeys(encontrados))
+        self._dead_lines += len(marcadores) + len(encontrados)
+        if not self.compact():
+            self._append_lines([{self.TOMBSTONE_KEY: nome} for nome in marcadores])
+        return len(encontrados)
+    
+    def compact(self, force: bool = False) -> bool:
+        """
+        Reescreve o índice JSON Lines sem as linhas mortas
+        
+        Só reescreve quando as linhas mortas passam de COMPACT_MIN_DEAD_LINES
+        e do número de entradas vivas (ou sempre, com force=True, se houver
+        alguma linha morta).
+        
+        Args:
+            force: Compacta mesmo abaixo do limite
+            
+        Returns:
+            True se o arquivo foi reescrito
+        """
+        if not self.is_jsonl or not self._dead_lines:
+            return False
+        limite = max(self.COMPACT_MIN_DEAD_LINES, len(self._backups))
+        if not force and self._dead_lines <= limite:
+            return False
+        self.save()
+        return True
+    
+    def update_backups(self, updates: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Atualiza campos de vários backups com uma única gravação
+        
+        Args:
+            updates: Dicionário {arquivo: {campo: valor}}
+            
+        Returns:
+            Número de entradas atualizadas
+        """
+        atualizados = 0
+        for backup in self._backups:
+            campos = updates.get(backup.get('arquivo'))
+            if campos:
+                backup.update(campos)
+                atualizados += 1
+        
+        if atualizados:
+            self._invalidate_views()
+            self._total_size = None  # tamanho_backup pode ter mudado
+            self.save()
+        return atualizados
     
     def get_all(self) -> List[Dict[str, Any]]:
         """Retorna todos os backups"""
         return self._backups.copy()
     
+    def iter_all(self) -> Iterator[Dict[str, Any]]:
+        """
+        Percorre todos os backups sem copiar a lista
+        
+        Só para leitura: o índice não deve ser alterado durante a iteração
+        (para isso, use get_all()).
+        """
+        return iter(self._backups)
+    
+    def get_by_file(self, arquivo: str) -> Optional[Dict[str, Any]]:
+        """
+        Retorna o backup com o nome de arquivo dado
+        
+        Consulta um dicionário montado uma vez (e refeito só depois de
+        alterações no índice), em vez de percorrer a lista a cada busca.
+        
+        Args:
+            arquivo: Nome do arquivo de backup
+            
+        Returns:
+            Informações do backup ou None
+        """
+        by_file = self._by_file
+        if by_file is None:
+            # Montado à parte e só então publicado: verify_all() consulta de
+            # várias threads
+            by_file = {}
+            for backup in self._backups:
+                # Com nomes repetidos, vale a primeira entrada (como na busca linear)
+                by_file.setdefault(backup.get('arquivo'), backup)
+            self._by_file = by_file
+        return by_file.get(arquivo)
+    
     def get_by_directory(self, directory_name: str) -> List[Dict[str, Any]]:
         """
         Retorna backups de um diretório específico
@@ -86,26 +429,39 @@ class BackupIndex:
             directory_name: Nome do diretório
             
         Returns:
-            Lista de backups
+            Lista de backups (cópia, pode ser modificada)
         """
-        return [
-            b for b in self._backups
-            if b.get('nome_diretorio') == directory_name
-        ]
+        if directory_name == 'desconhecido':
+            # No agrupamento, entradas sem diretório também caem aqui
+            return [
+                b for b in self._backups
+                if b.get('nome_diretorio') == directory_name
+            ]
+        return list(self._group().get(directory_name, ()))
     
     def get_grouped_by_directory(self) -> Dict[str, List[Dict[str, Any]]]:
         """
         Retorna backups agrupados por diretório
         
+        O agrupamento é memorizado até a próxima mudança no índice.
+        
         Returns:
-            Dicionário {nome_diretorio: [backups]}
+            Dicionário {nome_diretorio: [backups]} (listas copiadas, podem
+            ser modificadas)
         """
-        grouped = {}
-        for backup in self._backups:
-            dir_name = backup.get('nome_diretorio', 'desconhecido')
-            if dir_name not in grouped:
-                grouped[dir_name] = []
-            grouped[dir_name].append(backup)
+        return {dir_name: backups.copy() for dir_name, backups in self._group().items()}
+    
+    def _group(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Agrupamento por diretório memorizado (interno, não modificar)"""
+        grouped = self._grouped
+        if grouped is None:
+            grouped = {}
+            for backup in self._backups:
+                dir_name = backup.get('nome_diretorio', 'desconhecido')
+                if dir_name not in grouped:
+                    grouped[dir_name] = []
+                grouped[dir_name].append(backup)
+            self._grouped = grouped
         return grouped
     
     def get_sorted_by_date(self, reverse: bool = True) -> List[Dict[str, Any]]:
@@ -115,38 +471,70 @@ class BackupIndex:
         Args:
             reverse: Se True, mais recentes primeiro
             
+        A ordenação é memorizada até a próxima mudança no índice: listar e
+        restaurar repetidamente não reordena tudo a cada vez.
+        
+        Returns:
+            Lista ordenada de backups (cópia, pode ser modificada)
+        """
+        ordenados = self._sorted.get(reverse)
+        if ordenados is None:
+            ordenados = sorted(self._backups, key=_date_key, reverse=reverse)
+            self._sorted[reverse] = ordenados
+        return list(ordenados)
+    
+    def get_oldest(self, n: int) -> List[Dict[str, Any]]:
+        """
+        Retorna os n backups mais antigos, do mais antigo ao mais recente
+        
+        Sem ordenar o índice inteiro (usa a ordenação memorizada, se houver).
+        Mesmo resultado que get_sorted_by_date(reverse=False)[:n].
+        
+        Args:
+            n: Número de backups
+            
         Returns:
-            Lista ordenada de backups
+            Lista de backups
         """
-        return sorted(
-            self._backups,
-            key=lambda x: x.get('data_criacao', ''),
-            reverse=reverse
-        )
+        ordenados = self._sorted.get(False)
+        if ordenados is not None:
+            return ordenados[:n]
+        return heapq.nsmallest(n, self._backups, key=_date_key)
     
-    def find_by_hash(self, hash_md5: str) -> Optional[Dict[str, Any]]:
+    def find_by_hash(self, hash_value: str) -> Optional[Dict[str, Any]]:
         """
-        Encontra backup por hash MD5
+        Encontra backup por hash
         
         Args:
-            hash_md5: Hash MD5 do backup
+            hash_value: Hash do backup (hash_digest ou, em backups antigos, hash_md5)
             
         Returns:
             Informações do backup ou None
         """
-        for backup in self._backups:
-            if backup.get('hash_md5') == hash_md5:
-                return backup
-        return None
+        by_hash = self._by_hash
+        if by_hash is None:
+            by_hash = {}
+            for backup in self._backups:
+                # Como na busca linear, vale o primeiro backup com o hash
+                for campo in ('hash_digest', 'hash_md5'):
+                    valor = backup.get(campo)
+                    if valor is not None:
+                        by_hash.setdefault(valor, backup)
+            self._by_hash = by_hash
+        return by_hash.get(hash_value)
     
     def get_total_size(self) -> int:
         """
         Calcula tamanho total de todos os backups
         
+        A soma é feita uma vez e depois mantida a cada adição/remoção.
+        
         Returns:
             Tamanho total em bytes
         """
-        return sum(b.get('tamanho_backup', 0) for b in self._backups)
+        if self._total_size is None:
+            self._total_size = sum(b.get('tamanho_backup', 0) for b in self._backups)
+        return self._total_size
     
     def get_statistics(self) -> Dict[str, Any]:
         """
@@ -164,19 +552,28 @@ class BackupIndex:
                 'newest_backup': None
             }
         
-        sorted_backups = self.get_sorted_by_date(reverse=False)
+        # Mais antigo e mais recente: mínimo e máximo numa passada, sem ordenar
+        # (ou as pontas da ordenação memorizada, se já existir)
+        ordenados = self._sorted.get(False)
+        if ordenados is not None:
+            oldest, newest = ordenados[0], ordenados[-1]
+        else:
+            oldest = min(self._backups, key=_date_key)
+            newest = max(self._backups, key=_date_key)
         
         return {
             'total_backups': len(self._backups),
             'total_size': self.get_total_size(),
-            'unique_directories': len(self.get_grouped_by_directory()),
-            'oldest_backup': sorted_backups[0].get('data_criacao') if sorted_backups else None,
-            'newest_backup': sorted_backups[-1].get('data_criacao') if sorted_backups else None
+            'unique_directories': len(self._group()),
+            'oldest_backup': oldest.get('data_criacao'),
+            'newest_backup': newest.get('data_criacao')
         }
     
     def clear(self) -> None:
         """Remove todos os backups do índice"""
         self._backups = []
+        self._invalidate_views()
+        self._total_size = 0
         self.save()
     
     def __len__(self) -> int:
@@ -3,12 +3,13 @@
 Cobertura alvo: inicialização, adição de exclusões, erro quando origem ausente, fluxo feliz com compressor mockado.
 """
 from pathlib import Path
+import hashlib
 import os
 import tempfile
 import types
 import pytest
 
-from backup.core.backup_manager import BackupManager, BackupStats
+from backup.core.backup_manager import BackupManager, BackupStats, ProgressTracker
 
 
 class DummyConfig:
@@ -20,10 +21,17 @@ class DummyConfig:
         self.default_compression_level = 6
         self.backup_destination = tmp_path / "backups"
         self.custom_exclusion_patterns = []
+        self.hash_algorithm = "sha256"
 
     def add_custom_pattern(self, pattern):
         self.custom_exclusion_patterns.append(pattern)
 
+    def add_custom_patterns(self, patterns):
+        self.add_patterns_calls = getattr(self, 'add_patterns_calls', 0) + 1
+        for pattern in patterns:
+            if pattern not in self.custom_exclusion_patterns:
+                self.custom_exclusion_patterns.append(pattern)
+
     def set(self, section, data):
         # simplificado para testes
         if section == 'compression':
@@ -59,6 +67,17 @@ def test_add_custom_exclusions_updates_config_and_filter(tmp_path, monkeypatch):
     assert '*.tmp' in cfg.custom_exclusion_patterns
 
 
+def test_add_custom_exclusions_batches_config_write(tmp_path, monkeypatch):
+    cfg = DummyConfig(tmp_path)
+    monkeypatch.setattr('backup.core.backup_manager.BackupIndex', lambda p: object())
+
+    bm = BackupManager(cfg)
+    bm.add_custom_exclusions('*.iso, Downloads,,*.iso')
+    assert cfg.add_patterns_calls == 1
+    assert cfg.custom_exclusion_patterns == ['*.iso', 'Downloads']
+    assert bm.exclusion_filter.should_exclude('imagem.iso')
+
+
 def test_create_backup_fails_when_source_missing(tmp_path, monkeypatch):
     cfg = DummyConfig(tmp_path)
     # source não existe
@@ -72,6 +91,18 @@ def test_create_backup_fails_when_source_missing(tmp_path, monkeypatch):
     assert result is False
 
 
+def test_create_backup_fails_when_source_is_file(tmp_path, monkeypatch, capsys):
+    cfg = DummyConfig(tmp_path)
+    arquivo = tmp_path / 'arquivo.txt'
+    arquivo.write_text('x')
+
+    monkeypatch.setattr('backup.core.backup_manager.BackupIndex', lambda p: object())
+
+    bm = BackupManager(cfg)
+    assert bm.create_backup(source_path=arquivo, silent=True) is False
+    assert "não é um diretório" in capsys.readouterr().out
+
+
 def test_create_backup_happy_path(tmp_path, monkeypatch):
     # Monta estrutura de diretório
     src = tmp_path / 'source'
@@ -98,30 +129,33 @@ def test_create_backup_happy_path(tmp_path, monkeypatch):
 
     monkeypatch.setattr('backup.core.backup_manager.BackupIndex', FakeIndex)
 
-    # Mock get_directory_info e calculate_directory_size
+    # Mock get_directory_info e scan_directory
+    fake_scan = types.SimpleNamespace(
+        files=[(str(src / 'a.txt'), 'source/a.txt', 1234)],
+        total_files=1,
+        total_size=1234,
+        incompressible_ratio=0.0,
+        excluded_files=0,
+        excluded_dirs=0
+    )
     monkeypatch.setattr('backup.core.backup_manager.get_directory_info', lambda p: {'nome': 'source', 'tipo': 'generico'})
-    monkeypatch.setattr('backup.core.backup_manager.calculate_directory_size', lambda p, f: (1234, 1))
+    monkeypatch.setattr('backup.core.backup_manager.scan_directory', lambda p, f: fake_scan)
 
     # Mock compressor: cria o arquivo quando compress é chamado
     class FakeCompressor:
         extension = '.tar.gz'
-        def compress(self, source, dest, exclusion_filter, progress_callback=None, compression_level=None):
-            # cria arquivo de tamanho 512
+        def compress(self, source, dest, exclusion_filter, progress_callback=None, compression_level=None, scan=None, hasher=None):
+            # deve reutilizar a varredura feita pelo manager
+            assert scan is fake_scan
+            # cria arquivo de tamanho 512, alimentando o hash como os compressores reais
             dest.parent.mkdir(parents=True, exist_ok=True)
             with open(dest, 'wb') as fh:
                 fh.write(b"0" * 512)
+            hasher.update(b"0" * 512)
             return (1, 0, 0)
 
     monkeypatch.setattr('backup.core.backup_manager.get_compressor', lambda fmt: FakeCompressor())
 
-    # Mock IntegrityChecker
-    class FakeIntegrity:
-        @staticmethod
-        def calculate_md5(path):
-            return 'deadbeef'
-
-    monkeypatch.setattr('backup.core.backup_manager.IntegrityChecker', FakeIntegrity)
-
     bm = BackupManager(cfg)
     res = bm.create_backup(silent=True)
     assert res is True
@@ -130,3 +164,158 @@ def test_create_backup_happy_path(tmp_path, monkeypatch):
     info = bm.index.added[0]
     assert info['arquivo'].endswith('.tar.gz')
     assert info['tamanho_backup'] == 512
+    assert info['tamanho_original'] == 1234
+    assert info['hash_algo'] == 'sha256'
+    assert info['hash_digest'] == hashlib.sha256(b"0" * 512).hexdigest()
+    assert info['compressao_auto_desativada'] is False
+
+
+@pytest.mark.parametrize("ratio, level, expected_level", [
+    (0.9, 6, 0),   # Quase tudo já comprimido: grava sem recompressão
+    (0.5, 6, 6),   # Abaixo do limiar: mantém o nível
+    (0.9, 9, 9),   # Compressão máxima pedida explicitamente é respeitada
+])
+def test_create_backup_skips_compression_for_incompressible_source(
+        tmp_path, monkeypatch, ratio, level, expected_level):
+    src = tmp_path / 'source'
+    src.mkdir()
+    cfg = DummyConfig(tmp_path)
+    cfg.default_backup_source = src
+    cfg.backup_destination = tmp_path / 'backups'
+    cfg.backup_destination.mkdir()
+
+    class FakeIndex:
+        def __init__(self, path):
+            self.added = []
+        def add_backup(self, info):
+            self.added.append(info)
+
+    fake_scan = types.SimpleNamespace(
+        files=[], total_files=1, total_size=2 * 1024 ** 3,
+        incompressible_ratio=ratio, excluded_files=0, excluded_dirs=0
+    )
+    levels = []
+
+    class FakeCompressor:
+        extension = '.tar.gz'
+        def compress(self, source, dest, exclusion_filter, progress_callback=None,
+                     compression_level=None, scan=None, hasher=None):
+            levels.append(compression_level)
+            dest.write_bytes(b"0")
+            return (1, 0, 0)
+
+    monkeypatch.setattr('backup.core.backup_manager.BackupIndex', FakeIndex)
+    monkeypatch.setattr('backup.core.backup_manager.get_directory_info', lambda p: {'nome': 'source', 'tipo': 'generico'})
+    monkeypatch.setattr('backup.core.backup_manager.scan_directory', lambda p, f: fake_scan)
+    monkeypatch.setattr('backup.core.backup_manager.get_compressor', lambda fmt: FakeCompressor())
+
+    bm = BackupManager(cfg)
+    assert bm.create_backup(compression_level=level, silent=True) is True
+    assert levels == [expected_level]
+    assert bm.index.added[0]['compressao_auto_desativada'] is (expected_level == 0)
+
+
+def test_progress_tracker_reports_only_at_interval(capsys):
+    tracker = ProgressTracker(10000)  # intervalo de 200 arquivos (2%)
+    for atual in (50, 199, 200, 300, 399, 400):
+        tracker.update(atual)
+    linhas = capsys.readouterr().out.splitlines()
+    assert len(linhas) == 2
+    assert "200/" in linhas[0] and "400/" in linhas[1]
+    assert tracker.current == 400
+
+
+def test_create_backup_uses_configured_hash_algorithm(tmp_path, monkeypatch):
+    src = tmp_path / 'source'
+    src.mkdir()
+    (src / 'a.txt').write_text('hello')
+    cfg = DummyConfig(tmp_path)
+    cfg.default_backup_source = src
+    cfg.backup_destination.mkdir()
+    cfg.hash_algorithm = 'MD5'
+
+    class FakeIndex:
+        def __init__(self, path):
+            self.added = []
+        def add_backup(self, info):
+            self.added.append(info)
+
+    monkeypatch.setattr('backup.core.backup_manager.BackupIndex', FakeIndex)
+
+    bm = BackupManager(cfg)
+    assert bm.create_backup(silent=True) is True
+    info = bm.index.added[0]
+    backup_path = cfg.backup_destination / info['arquivo']
+    assert info['hash_algo'] == 'md5'
+    assert info['hash_digest'] == hashlib.md5(backup_path.read_bytes()).hexdigest()
+
+
+def test_create_backup_does_not_reread_archive(tmp_path, monkeypatch):
+    """O hash sai do HashingWriter durante a escrita, sem reler o arquivo"""
+    from backup.core.integrity import IntegrityChecker
+
+    src = tmp_path / 'source'
+    src.mkdir()
+    (src / 'a.txt').write_text('hello')
+    cfg = DummyConfig(tmp_path)
+    cfg.default_backup_source = src
+    cfg.backup_destination.mkdir()
+
+    class FakeIndex:
+        def __init__(self, path):
+            self.added = []
+        def add_backup(self, info):
+            self.added.append(info)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("arquivo de backup relido para calcular o hash")
+
+    monkeypatch.setattr('backup.core.backup_manager.BackupIndex', FakeIndex)
+    monkeypatch.setattr(IntegrityChecker, '_calculate', staticmethod(fail))
+
+    bm = BackupManager(cfg)
+    assert bm.create_backup(silent=True) is True
+    info = bm.index.added[0]
+    backup_path = cfg.backup_destination / info['arquivo']
+    assert info['hash_digest'] == hashlib.sha256(backup_path.read_bytes()).hexdigest()
+
+
+@pytest.mark.parametrize("respostas, esperado", [
+    (["1", "s"], True),    # Confirma com o formato atual
+    (["1", "n"], False),   # Cancela na confirmação
+])
+def test_interactive_backup_scans_while_waiting_for_input(tmp_path, monkeypatch, respostas, esperado):
+    src = tmp_path / 'source'
+    src.mkdir()
+    (src / 'a.txt').write_text('hello')
+    cfg = DummyConfig(tmp_path)
+    cfg.default_backup_source = src
+    cfg.backup_destination.mkdir()
+    sets = []
+    cfg.set = lambda section, data: sets.append(section)
+
+    class FakeIndex:
+        def __init__(self, path):
+            self.added = []
+        def add_backup(self, info):
+            self.added.append(info)
+
+    import threading
+    scan_threads = []
+    real_scan = __import__('backup.utils.file_utils', fromlist=['x']).scan_directory
+
+    def spy_scan(path, exclusion_filter):
+        scan_threads.append(threading.current_thread().name)
+        return real_scan(path, exclusion_filter)
+
+    entradas = iter(respostas)
+    monkeypatch.setattr('backup.core.backup_manager.BackupIndex', FakeIndex)
+    monkeypatch.setattr('backup.core.backup_manager.scan_directory', spy_scan)
+    monkeypatch.setattr('backup.core.backup_manager.safe_input', lambda *a: next(entradas))
+
+    bm = BackupManager(cfg)
+    assert bm.create_backup() is esperado
+    assert scan_threads == ['backup-scan'] or not esperado
+    # Formato escolhido igual ao atual: o config.json não é regravado
+    assert sets == []
+    assert len(bm.index.added) == (1 if esperado else 0)
@@ -5,15 +5,25 @@ Testa políticas de retenção e limpeza de backups antigos
 
 import pytest
 import json
+import os
 import sys
+import shutil
+import functools
 import importlib.util
 from pathlib import Path
 from datetime import datetime, timedelta
 
 
-# Função para importar módulos diretamente, pulando __init__.py
+@functools.lru_cache(maxsize=None)
 def load_module_direct(module_name, filepath):
-    """Carrega módulo diretamente do arquivo, pulando __init__.py"""
+    """
+    Carrega módulo diretamente do arquivo, pulando __init__.py
+    
+    Cada módulo é executado uma única vez por sessão: chamadas repetidas
+    (ou um módulo já presente em sys.modules) reaproveitam o carregado.
+    """
+    if module_name in sys.modules:
+        return sys.modules[module_name]
     spec = importlib.util.spec_from_file_location(module_name, filepath)
     if spec and spec.loader:
         module = importlib.util.module_from_spec(spec)
@@ -25,7 +35,7 @@ def load_module_direct(module_name, filepath):
     raise ImportError(f"Não foi possível carregar {module_name} de {filepath}")
 
 
-# Obter diretório raiz do projeto  
+# Obter diretório raiz do projeto
 project_root = Path(__file__).parent.parent.parent
 
 # Adicionar raiz ao sys.path
@@ -50,54 +60,18 @@ if 'storage' not in sys.modules:
     sys.modules['storage'] = storage_pkg
 
 # Importar formatters
-formatters = load_module_direct('utils.formatters', project_root / 'utils' / 'formatters.py')
+formatters = load_module_direct('utils.formatters', str(project_root / 'utils' / 'formatters.py'))
 sys.modules['utils'].formatters = formatters
 
 # Importar index
-index_mod = load_module_direct('storage.index', project_root / 'storage' / 'index.py')
-sys.modules['storage'].index = index_mod
-BackupIndex = index_mod.BackupIndex
-
-# Importar cleanup
-cleanup_mod = load_module_direct('storage.cleanup', project_root / 'storage' / 'cleanup.py')
-sys.modules['storage'].cleanup = cleanup_mod
-CleanupManager = cleanup_mod.CleanupManager
-
-import pytest
-import json
-import sys
-import importlib.util
-from pathlib import Path
-from datetime import datetime, timedelta
-
-
-def import_module_from_file(module_name: str, file_path: Path):
-    """Importa um módulo Python de um arquivo específico."""
-    spec = importlib.util.spec_from_file_location(module_name, file_path)
-    module = importlib.util.module_from_spec(spec)
-    sys.modules[module_name] = module
-    spec.loader.exec_module(module)
-    return module
-
-
-# Obter diretório raiz do projeto
-project_root = Path(__file__).parent.parent.parent
-
-# Importar dependências primeiro
-formatters_module = import_module_from_file('formatters', project_root / 'utils' / 'formatters.py')
-index_module = import_module_from_file('index', project_root / 'storage' / 'index.py')
-
-# Injetar as dependências no sys.modules para resolver imports relativos
-sys.modules['utils'] = type(sys)('utils')
-sys.modules['utils'].formatters = formatters_module
-sys.modules['storage'] = type(sys)('storage')
+index_module = load_module_direct('storage.index', str(project_root / 'storage' / 'index.py'))
 sys.modules['storage'].index = index_module
+BackupIndex = index_module.BackupIndex
 
-# Agora importar cleanup
-cleanup_module = import_module_from_file('cleanup', project_root / 'storage' / 'cleanup.py')
-
+# Importar cleanup
+cleanup_module = load_module_direct('storage.cleanup', str(project_root / 'storage' / 'cleanup.py'))
+sys.modules['storage'].cleanup = cleanup_module
 CleanupManager = cleanup_module.CleanupManager
-BackupIndex = index_module.BackupIndex
 
 
 @pytest.fixture
@@ -108,14 +82,15 @@ def backup_dir(tmp_path):
     return backup_dir
 
 
-@pytest.fixture
-def index_with_backups(backup_dir):
-    """Cria índice com backups de teste"""
+@pytest.fixture(scope="session")
+def _backup_template(tmp_path_factory):
+    """Monta uma única vez por sessão os arquivos e o índice de teste"""
+    backup_dir = tmp_path_factory.mktemp("backups_template")
     index_file = backup_dir / "index.json"
-    index = BackupIndex(index_file)
     
-    # Adiciona backups de diferentes datas
+    # Backups de diferentes datas, gravados no índice de uma só vez
     now = datetime.now()
+    backups = []
     
     # Projeto 1 - 5 backups (últimos 50 dias)
     for i in range(5):
@@ -126,9 +101,10 @@ def index_with_backups(backup_dir):
         
         # Cria arquivo físico
         file_path = backup_dir / filename
-        file_path.write_text("x" * (1024 * (i + 1)))  # Tamanhos diferentes
+        file_path.touch()
+        os.truncate(file_path, 1024 * (i + 1))  # Tamanhos diferentes (esparso)
         
-        index.add_backup({
+        backups.append({
             "arquivo": filename,
             "nome_diretorio": "projeto1",
             "data_criacao": date.isoformat(),
@@ -142,16 +118,26 @@ def index_with_backups(backup_dir):
         
         filename = f"backup_proj2_{i}.tar.gz"
         file_path = backup_dir / filename
-        file_path.write_text("y" * (2048 * (i + 1)))
+        file_path.touch()
+        os.truncate(file_path, 2048 * (i + 1))
         
-        index.add_backup({
+        backups.append({
             "arquivo": filename,
             "nome_diretorio": "projeto2",
             "data_criacao": date.isoformat(),
             "tamanho_backup": file_path.stat().st_size
         })
     
-    return index
+    BackupIndex(index_file).add_backups(backups)
+    
+    return backup_dir
+
+
+@pytest.fixture
+def index_with_backups(backup_dir, _backup_template):
+    """Cria índice com backups de teste (cópia do modelo da sessão)"""
+    shutil.copytree(_backup_template, backup_dir, dirs_exist_ok=True)
+    return BackupIndex(backup_dir / "index.json")
 
 
 class TestCleanupManagerInit:
@@ -260,6 +246,99 @@ class TestCleanupOldBackups:
         
         captured = capsys.readouterr()
         assert "não encontrado" in captured.out
+    
+    def test_cleanup_keeps_newest_regardless_of_index_order(self, backup_dir):
+        """Testa que os mais recentes são mantidos mesmo fora de ordem no índice"""
+        index = BackupIndex(backup_dir / "index.jsonl")
+        now = datetime.now()
+        for nome, dias in [("meio", 2), ("novo", 1), ("velho", 3)]:
+            (backup_dir / f"{nome}.tar.gz").write_text(nome)
+            index.add_backup({
+                "arquivo": f"{nome}.tar.gz",
+                "nome_diretorio": "proj",
+                "data_criacao": (now - timedelta(days=dias)).isoformat(),
+            })
+        
+        CleanupManager(index, backup_dir).cleanup_old_backups(days_to_keep=30, max_per_directory=2)
+        
+        assert sorted(b["arquivo"] for b in index.get_all()) == ["meio.tar.gz", "novo.tar.gz"]
+        assert not (backup_dir / "velho.tar.gz").exists()
+    
+    def test_plan_has_no_side_effects(self, backup_dir, index_with_backups):
+        """Testa que o planejamento só decide: nada é apagado nem tirado do índice"""
+        manager = CleanupManager(index_with_backups, backup_dir)
+        
+        plan = dict(manager._plan_cleanup(days_to_keep=25, max_per_directory=3))
+        
+        assert list(plan) == ["projeto1", "projeto2"]
+        motivos = {b["arquivo"]: motivo for b, _, motivo in plan["projeto1"]}
+        assert motivos == {
+            "backup_proj1_3.tar.gz": "excede limite (3 por diretório)",
+            "backup_proj1_4.tar.gz": "excede limite (3 por diretório)",
+        }
+        assert plan["projeto2"] == []
+        assert len(index_with_backups) == 8
+        assert all((backup_dir / b["arquivo"]).exists() for b in index_with_backups.get_all())
+    
+    def test_repeated_cleanup_reuses_parsed_dates(self, backup_dir, index_with_backups):
+        """Testa que uma segunda limpeza não converte as datas de novo"""
+        manager = CleanupManager(index_with_backups, backup_dir)
+        parse = cleanup_module.parse_iso_date
+        
+        manager.cleanup_old_backups(days_to_keep=365, max_per_directory=10)
+        misses = parse.cache_info().misses
+        manager.cleanup_old_backups(days_to_keep=365, max_per_directory=10)
+        
+        assert parse.cache_info().misses == misses
+    
+    def test_quiet_cleanup_does_not_parse_dates(self, backup_dir, index_with_backups, monkeypatch):
+        """Testa que, sem relatório, as datas ISO são comparadas como texto"""
+        def parse_proibido(_):
+            raise AssertionError("data convertida no caminho quente")
+        monkeypatch.setattr(cleanup_module, "parse_iso_date", parse_proibido)
+        
+        manager = CleanupManager(index_with_backups, backup_dir, verbose=False)
+        result = manager.cleanup_old_backups(days_to_keep=25, max_per_directory=10)
+        
+        assert result["removed_count"] > 0
+    
+    def test_non_canonical_dates_are_parsed(self, backup_dir, tmp_path):
+        """Testa que datas fora do formato de isoformat() são convertidas antes de comparar"""
+        index = BackupIndex(tmp_path / "index.jsonl")
+        limite = datetime.now() - timedelta(days=30)
+        for nome, data in [
+            ("antes", limite - timedelta(hours=1)),
+            ("depois", limite + timedelta(hours=1)),
+        ]:
+            (backup_dir / f"{nome}.tar.gz").write_bytes(b"x")
+            index.add_backup({
+                "arquivo": f"{nome}.tar.gz",
+                "nome_diretorio": "proj",
+                # Separador com espaço: como texto, ' ' < 'T' daria a ordem errada
+                "data_criacao": data.isoformat(sep=" ", timespec="seconds"),
+            })
+        
+        CleanupManager(index, backup_dir, verbose=False).cleanup_old_backups(
+            days_to_keep=30, max_per_directory=10
+        )
+        
+        assert [b["arquivo"] for b in index.get_all()] == ["depois.tar.gz"]
+    
+    def test_cleanup_unlink_error_keeps_index_entry(self, backup_dir, index_with_backups, capsys):
+        """Testa que backup que não pôde ser apagado continua no índice"""
+        # Um diretório no lugar do arquivo: stat funciona, unlink falha
+        bloqueado = backup_dir / "backup_proj1_4.tar.gz"
+        bloqueado.unlink()
+        bloqueado.mkdir()
+        
+        manager = CleanupManager(index_with_backups, backup_dir)
+        manager.cleanup_old_backups(days_to_keep=5, max_per_directory=1)
+        
+        captured = capsys.readouterr()
+        assert "Erro ao remover backup_proj1_4.tar.gz" in captured.out
+        restantes = [b['arquivo'] for b in index_with_backups.get_all()]
+        assert "backup_proj1_4.tar.gz" in restantes
+        assert "backup_proj1_3.tar.gz" not in restantes
 
 
 class TestCleanupBySize:
@@ -320,6 +399,35 @@ class TestCleanupBySize:
         
         # Deve estar no limite ou abaixo
         assert final_size <= limit_bytes * 1.1  # 10% de tolerância
+    
+    def test_cleanup_beyond_first_batch(self, backup_dir, index_with_backups, monkeypatch):
+        """Testa que a limpeza continua em ordem além dos primeiros mais antigos"""
+        monkeypatch.setattr(CleanupManager, "OLDEST_BATCH_MIN", 1)
+        manager = CleanupManager(index_with_backups, backup_dir)
+        esperado = [b["arquivo"] for b in index_with_backups.get_sorted_by_date(reverse=False)][:4]
+        
+        # Limite que só é atingido depois de remover os 4 mais antigos
+        tamanhos = [index_with_backups.get_by_file(a)["tamanho_backup"] for a in esperado]
+        limite = index_with_backups.get_total_size() - sum(tamanhos)
+        result = manager.cleanup_by_size(max_total_size_gb=limite / (1024 ** 3))
+        
+        assert result['removed_count'] == 4
+        assert all(index_with_backups.get_by_file(a) is None for a in esperado)
+    
+    def test_cleanup_missing_file_dropped_from_index(self, backup_dir, index_with_backups):
+        """Testa que backup sem arquivo físico sai do índice sem liberar espaço"""
+        # O mais antigo (backup_proj1_4) é o primeiro da fila de remoção
+        (backup_dir / "backup_proj1_4.tar.gz").unlink()
+        proximo_size = (backup_dir / "backup_proj1_3.tar.gz").stat().st_size
+        manager = CleanupManager(index_with_backups, backup_dir)
+        
+        initial_size = index_with_backups.get_total_size()
+        result = manager.cleanup_by_size(max_total_size_gb=(initial_size - 1) / (1024 ** 3))
+        
+        # O ausente não libera nada, então o seguinte também é removido
+        assert result['removed_count'] == 2
+        assert result['freed_space'] == proximo_size
+        assert index_with_backups.get_by_file("backup_proj1_4.tar.gz") is None
 
 
 class TestRemoveOrphanedFiles:
@@ -367,6 +475,59 @@ class TestRemoveOrphanedFiles:
         for orphan in orphans:
             assert not orphan.exists()
     
+    def test_remove_many_orphaned_files_in_parallel(self, backup_dir, index_with_backups, capsys):
+        """Testa remoção em threads acima de PARALLEL_UNLINK_MIN, com saída ordenada"""
+        total = CleanupManager.PARALLEL_UNLINK_MIN + 8
+        orphans = [backup_dir / f"orphan_{i:03d}.tar.gz" for i in range(total)]
+        for orphan in orphans:
+            orphan.write_text("orphan")
+        
+        manager = CleanupManager(index_with_backups, backup_dir)
+        count = manager.remove_orphaned_files()
+        
+        assert count == total
+        assert not any(orphan.exists() for orphan in orphans)
+        
+        linhas = [l for l in capsys.readouterr().out.splitlines() if "Removido:" in l]
+        assert linhas == [f"   🗑️  Removido: {orphan.name}" for orphan in orphans]
+    
+    def test_orphan_unlink_error_reported(self, backup_dir, index_with_backups, capsys, monkeypatch):
+        """Testa que falha ao remover um órfão é informada e não contada"""
+        bloqueado = backup_dir / "bloqueado.zip"
+        bloqueado.write_text("orphan")
+        orphan = backup_dir / "orphan.tar.gz"
+        orphan.write_text("orphan")
+        
+        unlink = cleanup_module.os.unlink
+        
+        def unlink_falho(path, *args, **kwargs):
+            if str(path).endswith("bloqueado.zip"):
+                raise PermissionError("sem permissão")
+            return unlink(path, *args, **kwargs)
+        monkeypatch.setattr(cleanup_module.os, "unlink", unlink_falho)
+        
+        manager = CleanupManager(index_with_backups, backup_dir)
+        count = manager.remove_orphaned_files()
+        
+        assert count == 1
+        assert not orphan.exists()
+        assert bloqueado.exists()
+        assert "Erro ao remover bloqueado.zip: sem permissão" in capsys.readouterr().out
+    
+    def test_ignores_directories_and_other_files(self, backup_dir, index_with_backups):
+        """Testa que só arquivos com extensão de backup são considerados"""
+        (backup_dir / "pasta.zip").mkdir()
+        (backup_dir / "notas.txt").write_text("não é backup")
+        zst = backup_dir / "orphan.tar.zst"
+        zst.write_text("orphan")
+        
+        manager = CleanupManager(index_with_backups, backup_dir)
+        
+        assert manager.remove_orphaned_files() == 1
+        assert not zst.exists()
+        assert (backup_dir / "pasta.zip").is_dir()
+        assert (backup_dir / "notas.txt").exists()
+    
     def test_keeps_indexed_files(self, backup_dir, index_with_backups):
         """Testa que mantém arquivos que estão no índice"""
         manager = CleanupManager(index_with_backups, backup_dir)
@@ -406,6 +567,154 @@ class TestRemoveOrphanedFiles:
         assert not orphan_zip.exists()
 
 
+class TestVerbose:
+    """Testes da saída (verbose) do CleanupManager"""
+    
+    def test_silent_cleanup_prints_nothing(self, backup_dir, index_with_backups, capsys):
+        """Testa que verbose=False não imprime nada, mas limpa igual"""
+        (backup_dir / "orphan.zip").write_text("orphan")
+        manager = CleanupManager(index_with_backups, backup_dir, verbose=False)
+        
+        result = manager.cleanup_old_backups(days_to_keep=5, max_per_directory=1)
+        manager.cleanup_by_size(max_total_size_gb=0.000001)
+        removed = manager.remove_orphaned_files()
+        
+        assert result['removed_count'] > 0
+        assert removed == 1
+        assert capsys.readouterr().out == ""
+    
+    def test_silent_cleanup_skips_formatting(self, backup_dir, index_with_backups, monkeypatch):
+        """Testa que verbose=False nem formata as linhas de relatório"""
+        def fail(*args, **kwargs):
+            raise AssertionError("formatação chamada sem verbose")
+        monkeypatch.setattr(cleanup_module, "format_bytes", fail)
+        monkeypatch.setattr(cleanup_module, "format_date", fail)
+        manager = CleanupManager(index_with_backups, backup_dir, verbose=False)
+        
+        assert manager.cleanup_old_backups(days_to_keep=5, max_per_directory=1)['removed_count'] > 0
+        assert manager.cleanup_by_size(max_total_size_gb=0.000001)['removed_count'] > 0
+    
+    def test_report_printed_once_per_directory(self, backup_dir, index_with_backups, monkeypatch):
+        """Testa que o relatório de cada diretório sai numa única escrita"""
+        chamadas = []
+        monkeypatch.setattr("builtins.print", lambda *a, **k: chamadas.append(a))
+        manager = CleanupManager(index_with_backups, backup_dir)
+        
+        manager.cleanup_old_backups(days_to_keep=5, max_per_directory=1)
+        
+        blocos = [a[0] for a in chamadas if "Processando:" in a[0]]
+        assert len(blocos) == 2
+        assert blocos[0].count("Removido:") == 4
+        assert blocos[1].count("Removido:") == 2
+
+
+class TestBackupDirFd:
+    """Testes das operações relativas ao diretório aberto (dir_fd)"""
+    
+    @pytest.mark.skipif(not cleanup_module._DIR_FD_SUPPORTED, reason="dir_fd não suportado")
+    def test_directory_opened_once_per_cleanup(self, backup_dir, index_with_backups, monkeypatch):
+        """Testa que o diretório é aberto uma vez e stat/unlink recebem só o nome"""
+        aberturas = []
+        os_open = cleanup_module.os.open
+        monkeypatch.setattr(cleanup_module.os, "open", lambda *a, **k: aberturas.append(a[0]) or os_open(*a, **k))
+        (backup_dir / "orphan.zip").write_text("orphan")
+        manager = CleanupManager(index_with_backups, backup_dir)
+        
+        result = manager.cleanup_old_backups(days_to_keep=5, max_per_directory=1)
+        manager.remove_orphaned_files()
+        
+        assert result['removed_count'] == 6
+        assert aberturas == [backup_dir, backup_dir]
+        assert not (backup_dir / "orphan.zip").exists()
+    
+    def test_fallback_without_dir_fd(self, backup_dir, index_with_backups, monkeypatch):
+        """Testa a limpeza com caminhos completos (plataformas sem dir_fd)"""
+        monkeypatch.setattr(cleanup_module, "_DIR_FD_SUPPORTED", False)
+        (backup_dir / "orphan.zip").write_text("orphan")
+        manager = CleanupManager(index_with_backups, backup_dir)
+        
+        result = manager.cleanup_old_backups(days_to_keep=5, max_per_directory=1)
+        
+        assert result['removed_count'] == 6
+        assert result['freed_space'] > 0
+        assert manager.cleanup_by_size(max_total_size_gb=0.000001)['removed_count'] == 2
+        assert manager.remove_orphaned_files() == 1
+
+
+class FakeTrash:
+    """send2trash falso: move para uma pasta e registra as chamadas"""
+    
+    def __init__(self, lixeira, falhar=()):
+        self.lixeira = lixeira
+        self.falhar = set(falhar)
+        self.chamadas = []
+    
+    def send2trash(self, paths):
+        self.chamadas.append(paths)
+        for path in paths if isinstance(paths, list) else [paths]:
+            nome = Path(path).name
+            if nome in self.falhar:
+                raise PermissionError(f"sem permissão: {nome}")
+            Path(path).rename(self.lixeira / nome)
+
+
+@pytest.fixture
+def fake_trash(tmp_path, monkeypatch):
+    """Instala um módulo send2trash falso"""
+    lixeira = tmp_path / "lixeira"
+    lixeira.mkdir()
+    trash = FakeTrash(lixeira)
+    modulo = type(sys)("send2trash")
+    modulo.send2trash = trash.send2trash
+    monkeypatch.setitem(sys.modules, "send2trash", modulo)
+    return trash
+
+
+class TestUseTrash:
+    """Testes do envio para a lixeira (use_trash=True)"""
+    
+    def test_requires_send2trash(self, backup_dir, index_with_backups, monkeypatch):
+        """Testa erro claro quando send2trash não está instalado"""
+        monkeypatch.setitem(sys.modules, "send2trash", None)
+        
+        with pytest.raises(RuntimeError, match="send2trash"):
+            CleanupManager(index_with_backups, backup_dir, use_trash=True)
+    
+    def test_cleanup_sends_all_in_one_call(self, backup_dir, index_with_backups, fake_trash):
+        """Testa que a limpeza por critérios faz um único envio à lixeira"""
+        manager = CleanupManager(index_with_backups, backup_dir, use_trash=True)
+        
+        result = manager.cleanup_old_backups(days_to_keep=5, max_per_directory=1)
+        
+        assert len(fake_trash.chamadas) == 1
+        enviados = sorted(Path(p).name for p in fake_trash.chamadas[0])
+        assert len(enviados) == result['removed_count'] == 6
+        assert sorted(p.name for p in fake_trash.lixeira.iterdir()) == enviados
+        assert result['freed_space'] == sum((fake_trash.lixeira / n).stat().st_size for n in enviados)
+    
+    def test_batch_failure_falls_back_per_file(self, backup_dir, index_with_backups, fake_trash, capsys):
+        """Testa que, se o lote falha, só o arquivo problemático fica"""
+        fake_trash.falhar.add("backup_proj1_2.tar.gz")
+        manager = CleanupManager(index_with_backups, backup_dir, use_trash=True)
+        
+        result = manager.cleanup_old_backups(days_to_keep=5, max_per_directory=1)
+        
+        assert result['removed_count'] == 5
+        assert (backup_dir / "backup_proj1_2.tar.gz").exists()
+        assert index_with_backups.get_by_file("backup_proj1_2.tar.gz") is not None
+        assert "Erro ao remover backup_proj1_2.tar.gz: sem permissão" in capsys.readouterr().out
+    
+    def test_orphans_sent_to_trash(self, backup_dir, index_with_backups, fake_trash):
+        """Testa que os órfãos também vão para a lixeira num único envio"""
+        for i in range(3):
+            (backup_dir / f"orphan_{i}.zip").write_text("orphan")
+        manager = CleanupManager(index_with_backups, backup_dir, use_trash=True)
+        
+        assert manager.remove_orphaned_files() == 3
+        assert len(fake_trash.chamadas) == 1
+        assert sorted(p.name for p in fake_trash.lixeira.iterdir()) == [f"orphan_{i}.zip" for i in range(3)]
+
+
 class TestIntegration:
     """Testes de integração entre diferentes métodos de limpeza"""
     
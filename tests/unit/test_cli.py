@@ -0,0 +1,142 @@
+"""Testes unitários para o CLI
+
+Cobertura alvo: --help não importa os módulos pesados de backup.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+from backup.cli import create_parser, parse_args
+
+
+def test_help_does_not_import_managers():
+    """--help termina antes de carregar gerenciadores, tarfile e zipfile"""
+    codigo = (
+        "import sys; sys.argv = ['backup', '--help']\n"
+        "from backup.cli import main\n"
+        "try:\n"
+        "    main()\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "carregados = [m for m in ('tarfile', 'zipfile', 'backup.core', 'backup.config')\n"
+        "              if m in sys.modules]\n"
+        "print('carregados=' + ','.join(carregados))\n"
+    )
+    # Mesmo sys.path do pytest, para o subprocesso encontrar o pacote 'backup'
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    resultado = subprocess.run([sys.executable, "-c", codigo], capture_output=True,
+                               text=True, env=env, check=True)
+
+    assert "Script de backup universal" in resultado.stdout
+    assert resultado.stdout.strip().splitlines()[-1] == "carregados="
+
+
+@pytest.mark.parametrize("argv", [
+    ['--listar-backups'],
+    ['--restaurar', '--config', 'outro.json'],
+    ['--limpar-antigos', '--excluir', '*.iso,tmp'],
+    ['--atualizar-hashes'],
+])
+def test_action_parser_matches_full_parser(argv):
+    """Ações sem backup usam o parser mínimo com os mesmos valores"""
+    args = parse_args(argv)
+    completo = vars(create_parser().parse_args(argv))
+
+    assert 'formato' not in vars(args)  # Parser mínimo
+    assert all(completo[chave] == valor for chave, valor in vars(args).items())
+
+
+@pytest.mark.parametrize("argv", [
+    ['--listar-backups', '--silencioso'],       # Opção de backup junto
+    ['--restaurar', '--listar-backups'],        # Duas ações
+    ['-d', '/tmp', '--formato', 'zip'],         # Backup
+])
+def test_other_arguments_fall_back_to_full_parser(argv):
+    """Argumentos que o parser mínimo não conhece caem no parser completo"""
+    assert vars(parse_args(argv)) == vars(create_parser().parse_args(argv))
+
+
+def test_unknown_argument_still_rejected(capsys):
+    with pytest.raises(SystemExit):
+        parse_args(['--listar-backups', '--inexistente'])
+    assert "--inexistente" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("argv", [
+    ['--listar-backups', '--config'],            # Valor faltando
+    ['--limpar-antigos', '--excluir'],
+    ['--restaurar', '@arquivo-inexistente.args'],
+])
+def test_action_parser_errors_match_full_parser(argv, capsys):
+    """Erros no parser mínimo saem com a mensagem e o uso do parser completo"""
+    with pytest.raises(SystemExit) as minimo:
+        parse_args(argv)
+    erro_minimo = capsys.readouterr().err
+
+    with pytest.raises(SystemExit) as completo:
+        create_parser().parse_args(argv)
+    erro_completo = capsys.readouterr().err
+
+    assert minimo.value.code == completo.value.code == 2
+    assert erro_minimo == erro_completo
+    assert "[--compressao-maxima]" in erro_minimo
+
+
+def test_arguments_from_file(tmp_path):
+    """@arquivo: argumentos divididos como no shell, com comentários"""
+    arquivo = tmp_path / "diario.args"
+    arquivo.write_text(
+        "# backup diário\n"
+        "--silencioso --formato tar.zst\n"
+        "-d '/dados/meus projetos'   # aspas para espaços\n"
+        "--excluir *.iso,tmp\n"
+    )
+
+    args = parse_args([f"@{arquivo}", "--nome", "diario"])
+
+    assert args.silencioso is True
+    assert args.formato == "tar.zst"
+    assert args.diretorio == "/dados/meus projetos"
+    assert args.excluir == "*.iso,tmp"
+    assert args.nome == "diario"
+
+
+def test_action_flag_inside_argument_file(tmp_path):
+    arquivo = tmp_path / "listar.args"
+    arquivo.write_text("--listar-backups\n--config outro.json\n")
+
+    args = parse_args([f"@{arquivo}"])
+
+    assert args.listar_backups is True
+    assert args.config == "outro.json"
+
+
+def test_upgrade_hashes_action(tmp_path, monkeypatch, capsys):
+    """--atualizar-hashes registra SHA-256 nos backups que só têm MD5"""
+    import hashlib
+    import json
+
+    from backup.cli import main
+    from backup.storage.index import BackupIndex
+
+    destino = tmp_path / "backups"
+    config_file = tmp_path / "config.json"
+    config_file.write_text(json.dumps({"paths": {"backup_destination": str(destino)}}))
+    destino.mkdir()
+    conteudo = b"backup antigo"
+    (destino / "antigo.tar.gz").write_bytes(conteudo)
+    BackupIndex(destino / "indice_backups.jsonl").add_backup(
+        {"arquivo": "antigo.tar.gz", "hash_md5": hashlib.md5(conteudo).hexdigest()}
+    )
+
+    monkeypatch.setattr(sys, "argv", ["backup", "--atualizar-hashes", "--config", str(config_file)])
+    main()
+
+    entrada = BackupIndex(destino / "indice_backups.jsonl").get_by_file("antigo.tar.gz")
+    assert entrada["hash_digest"] == hashlib.sha256(conteudo).hexdigest()
+    assert "1 backup(s) atualizados" in capsys.readouterr().out
+
+    main()  # Nada mais a migrar
+    assert "Nenhum backup precisa" in capsys.readouterr().out
@@ -4,6 +4,8 @@ Testa compressores tar.gz e zip
 """
 
 import pytest
+import hashlib
+import os
 import tarfile
 import zipfile
 import importlib.util
@@ -18,7 +20,9 @@ compression_mod = importlib.util.module_from_spec(spec)
 spec.loader.exec_module(compression_mod)
 
 TarCompressor = compression_mod.TarCompressor
+TarZstdCompressor = compression_mod.TarZstdCompressor
 ZipCompressor = compression_mod.ZipCompressor
+ParallelGzipWriter = compression_mod.ParallelGzipWriter
 get_compressor = compression_mod.get_compressor
 
 # Importa ExclusionFilter para testes
@@ -31,10 +35,13 @@ spec_excl.loader.exec_module(exclusion_mod)
 ExclusionFilter = exclusion_mod.ExclusionFilter
 
 
-@pytest.fixture
-def source_dir(tmp_path):
-    """Cria diretório de origem com arquivos para testar compressão"""
-    source = tmp_path / "source"
+# Padrões do filtro de exclusão simples
+SIMPLE_PATTERNS = ['*.pyc', '*.tmp', '__pycache__']
+
+
+def _build_source_dir(root):
+    """Monta em root/source a árvore de arquivos usada nos testes de compressão"""
+    source = root / "source"
     source.mkdir()
     
     # Arquivos normais
@@ -59,10 +66,40 @@ def source_dir(tmp_path):
     return source
 
 
+@pytest.fixture
+def source_dir(tmp_path):
+    """Cria diretório de origem com arquivos para testar compressão"""
+    return _build_source_dir(tmp_path)
+
+
 @pytest.fixture
 def simple_exclusion_filter():
     """Filtro de exclusão simples para testes"""
-    return ExclusionFilter(['*.pyc', '*.tmp', '__pycache__'])
+    return ExclusionFilter(SIMPLE_PATTERNS)
+
+
+@pytest.fixture(scope="module")
+def _archives_dir(tmp_path_factory):
+    """Diretório do módulo com a árvore de origem e os arquivos pré-montados"""
+    root = tmp_path_factory.mktemp("archives")
+    _build_source_dir(root)
+    return root
+
+
+@pytest.fixture(scope="module")
+def prebuilt_tar_archive(_archives_dir):
+    """Backup .tar.gz da árvore de origem, comprimido uma vez por módulo"""
+    archive = _archives_dir / "backup.tar.gz"
+    TarCompressor().compress(_archives_dir / "source", archive, ExclusionFilter(SIMPLE_PATTERNS))
+    return archive
+
+
+@pytest.fixture(scope="module")
+def prebuilt_zip_archive(_archives_dir):
+    """Backup .zip da árvore de origem, comprimido uma vez por módulo"""
+    archive = _archives_dir / "backup.zip"
+    ZipCompressor().compress(_archives_dir / "source", archive, ExclusionFilter(SIMPLE_PATTERNS))
+    return archive
 
 
 class TestTarCompressor:
@@ -113,6 +150,22 @@ class TestTarCompressor:
         # Callback deve ter sido chamado
         assert len(progress_calls) > 0
     
+    def test_progress_callback_throttled(self, tmp_path):
+        """Testa que o progresso é relatado a cada PROGRESS_EVERY e ao final"""
+        src = tmp_path / "muitos"
+        src.mkdir()
+        for i in range(7):
+            (src / f"f{i}.txt").write_text("x")
+        
+        compressor = TarCompressor()
+        compressor.PROGRESS_EVERY = 2
+        progress_calls = []
+        
+        compressor.compress(src, tmp_path / "b.tar.gz", ExclusionFilter(),
+                            progress_callback=progress_calls.append)
+        
+        assert progress_calls == [2, 4, 6, 7]
+    
     def test_compress_different_levels(self, source_dir, tmp_path, simple_exclusion_filter):
         """Testa diferentes níveis de compressão"""
         compressor = TarCompressor()
@@ -121,43 +174,393 @@ class TestTarCompressor:
         output_high = tmp_path / "backup_high.tar.gz"
         
         compressor.compress(source_dir, output_low, simple_exclusion_filter, compression_level=1)
-        compressor.compress(source_dir, output_high, simple_exclusion_filter, compression_level=9)
+        compressor.compress(source_dir, output_high, simple_exclusion_filter, compression_level=6)
         
-        # Nível 9 deve gerar arquivo menor ou igual
+        # Nível 6 deve gerar arquivo menor ou igual
         assert output_high.stat().st_size <= output_low.stat().st_size
     
-    def test_decompress(self, source_dir, tmp_path, simple_exclusion_filter):
+    def test_decompress(self, prebuilt_tar_archive, tmp_path):
         """Testa descompressão"""
         compressor = TarCompressor()
-        archive = tmp_path / "backup.tar.gz"
         extract_dir = tmp_path / "extracted"
         extract_dir.mkdir()
         
-        # Comprime
-        compressor.compress(source_dir, archive, simple_exclusion_filter)
-        
         # Descomprime
-        compressor.decompress(archive, extract_dir)
+        compressor.decompress(prebuilt_tar_archive, extract_dir)
         
         # Verifica que arquivos foram extraídos
-        extracted_source = extract_dir / source_dir.name
+        extracted_source = extract_dir / "source"
         assert extracted_source.exists()
         assert (extracted_source / "file1.txt").exists()
         assert (extracted_source / "README.md").exists()
     
-    def test_compress_preserves_structure(self, source_dir, tmp_path, simple_exclusion_filter):
-        """Testa que estrutura de diretórios é preservada"""
+    @pytest.mark.parametrize("external", [True, False])
+    def test_decompress_with_and_without_system_tar(self, external, source_dir, tmp_path,
+                                                    simple_exclusion_filter):
+        """Testa a extração pelo tar do sistema e pelo tarfile"""
+        import shutil
+        if external and shutil.which('tar') is None:
+            pytest.skip("tar não disponível")
         compressor = TarCompressor()
+        compressor.USE_EXTERNAL_TAR = external
         archive = tmp_path / "backup.tar.gz"
+        extract_dir = tmp_path / "extraido" / "novo"  # Ainda não existe
         
         compressor.compress(source_dir, archive, simple_exclusion_filter)
+        compressor.decompress(archive, extract_dir)
+        
+        restaurado = extract_dir / "source" / "subdir" / "nested.txt"
+        assert restaurado.read_text() == "arquivo aninhado"
+    
+    def test_copies_with_large_buffer(self, source_dir, tmp_path, simple_exclusion_filter,
+                                      monkeypatch):
+        """Testa que o conteúdo é copiado em blocos de COPY_BUFSIZE nos dois sentidos"""
+        buffers = []
+        original = tarfile.copyfileobj
+        
+        def spy(src, dst, length=None, exception=OSError, bufsize=None):
+            buffers.append(bufsize)
+            return original(src, dst, length, exception, bufsize)
         
+        monkeypatch.setattr(tarfile, "copyfileobj", spy)
+        compressor = TarCompressor()
+        compressor.USE_EXTERNAL_TAR = False
+        archive = tmp_path / "backup.tar.gz"
+        
+        compressor.compress(source_dir, archive, simple_exclusion_filter)
+        compressor.decompress(archive, tmp_path / "extraido")
+        
+        assert buffers
+        assert set(buffers) == {TarCompressor.COPY_BUFSIZE}
+    
+    def test_decompress_streams_without_seeking(self, source_dir, tmp_path,
+                                                simple_exclusion_filter, monkeypatch):
+        """Testa que o tarfile extrai em modo stream ('r|'), sem seek"""
+        modos = []
+        original = tarfile.open
+        
+        def spy(*args, **kwargs):
+            modos.append(kwargs.get('mode', args[1] if len(args) > 1 else 'r'))
+            return original(*args, **kwargs)
+        
+        compressor = TarCompressor()
+        compressor.USE_EXTERNAL_TAR = False
+        archive = tmp_path / "backup.tar.gz"
+        compressor.compress(source_dir, archive, simple_exclusion_filter)
+        
+        monkeypatch.setattr(tarfile, "open", spy)
+        compressor.decompress(archive, tmp_path / "extraido")
+        
+        assert modos == ['r|']
+        assert (tmp_path / "extraido" / "source" / "subdir" / "nested.txt").exists()
+    
+    def test_decompress_multi_member_gzip_without_system_tar(self, source_dir, tmp_path,
+                                                             simple_exclusion_filter, monkeypatch):
+        """Testa que o tarfile restaura o gzip de vários membros do ParallelGzipWriter"""
+        monkeypatch.setattr(TarCompressor, 'USE_PIGZ', False)
+        monkeypatch.setattr(TarCompressor, 'USE_EXTERNAL_TAR', False)
+        monkeypatch.setattr(TarCompressor, 'PARALLEL_GZIP_MIN_SIZE', 0)
+        monkeypatch.setattr(compression_mod.os, 'cpu_count', lambda: 4)
+        monkeypatch.setattr(compression_mod.ParallelGzipWriter, 'BLOCK_SIZE', 1024)
+        grande = source_dir / "grande.bin"
+        grande.write_bytes(os.urandom(64 * 1024))  # Atravessa vários membros
+        
+        compressor = TarCompressor()
+        archive = tmp_path / "backup.tar.gz"
+        compressor.compress(source_dir, archive, simple_exclusion_filter)
+        assert archive.read_bytes().count(b"\x1f\x8b\x08") > 1
+        
+        compressor.decompress(archive, tmp_path / "extraido")
+        
+        restaurado = tmp_path / "extraido" / "source"
+        assert (restaurado / "grande.bin").read_bytes() == grande.read_bytes()
+        assert (restaurado / "subdir" / "nested.txt").read_text() == "arquivo aninhado"
+    
+    @pytest.mark.parametrize("external", [True, False])
+    def test_decompress_refuses_path_traversal(self, external, tmp_path):
+        """Testa que membros com '..' não saem do destino"""
+        import io
+        import shutil
+        if external and shutil.which('tar') is None:
+            pytest.skip("tar não disponível")
+        if not external and not hasattr(tarfile, 'tar_filter'):
+            pytest.skip("tarfile sem filtros de extração")
+        archive = tmp_path / "malicioso.tar.gz"
+        with tarfile.open(archive, 'w:gz') as tar:
+            info = tarfile.TarInfo("../fora.txt")
+            info.size = 1
+            tar.addfile(info, io.BytesIO(b"x"))
+        
+        compressor = TarCompressor()
+        compressor.USE_EXTERNAL_TAR = external
+        destino = tmp_path / "destino"
+        
+        with pytest.raises(Exception):
+            compressor.decompress(archive, destino)
+        assert not (tmp_path / "fora.txt").exists()
+    
+    def test_compress_preserves_structure(self, prebuilt_tar_archive):
+        """Testa que estrutura de diretórios é preservada"""
         # Verifica conteúdo do arquivo
-        with tarfile.open(archive, 'r:gz') as tar:
+        with tarfile.open(prebuilt_tar_archive, 'r:gz') as tar:
             names = tar.getnames()
             # Deve conter subdir/nested.txt
             assert any('subdir' in name and 'nested.txt' in name for name in names)
 
+    
+    def test_compress_with_external_gzip(self, source_dir, tmp_path, simple_exclusion_filter, monkeypatch):
+        """Testa caminho via processo externo (gzip simulando o pigz)"""
+        import shutil
+        gzip_bin = shutil.which('gzip')
+        if gzip_bin is None:
+            pytest.skip("gzip não disponível")
+        monkeypatch.setattr(compression_mod.shutil, 'which', lambda name: gzip_bin)
+        
+        compressor = TarCompressor()
+        archive = tmp_path / "backup.tar.gz"
+        hasher = hashlib.sha256()
+        total_files, _, _ = compressor.compress(source_dir, archive, simple_exclusion_filter, hasher=hasher)
+        
+        with tarfile.open(archive, 'r:gz') as tar:
+            assert len(tar.getnames()) == total_files
+        assert hasher.hexdigest() == hashlib.sha256(archive.read_bytes()).hexdigest()
+    
+    @pytest.fixture
+    def gnu_tar(self):
+        """tar do sistema, se for o GNU tar"""
+        import shutil
+        tar_bin = shutil.which('tar')
+        if tar_bin is None or not compression_mod._is_gnu_tar(tar_bin):
+            pytest.skip("GNU tar não disponível")
+        return tar_bin
+    
+    def test_compress_with_system_tar(self, gnu_tar, source_dir, tmp_path,
+                                      simple_exclusion_filter, monkeypatch):
+        """Testa a criação pelo tar do sistema a partir da lista da varredura"""
+        import os
+        os.symlink("file1.txt", source_dir / "link.txt")
+        (source_dir / "-traco.txt").write_text("nome com traço")
+        compressor = TarCompressor()
+        monkeypatch.setattr(compressor, '_external_tar', lambda: gnu_tar)
+        monkeypatch.setattr(compressor, '_add_entry', None)  # tarfile não é usado
+        archive = tmp_path / "backup.tar.gz"
+        hasher = hashlib.sha256()
+        progress_calls = []
+        
+        total_files, excluded_files, excluded_dirs = compressor.compress(
+            source_dir, archive, simple_exclusion_filter,
+            progress_callback=progress_calls.append, hasher=hasher
+        )
+        
+        with tarfile.open(archive, 'r:gz') as tar:
+            nomes = set(tar.getnames())
+            assert tar.getmember("source/link.txt").issym()
+            assert tar.extractfile("source/subdir/nested.txt").read() == "arquivo aninhado".encode()
+        assert nomes == {"source/file1.txt", "source/file2.py", "source/README.md",
+                         "source/subdir/nested.txt", "source/link.txt", "source/-traco.txt"}
+        assert total_files == len(nomes)
+        assert (excluded_files, excluded_dirs) == (2, 1)
+        assert progress_calls == [total_files]
+        assert hasher.hexdigest() == hashlib.sha256(archive.read_bytes()).hexdigest()
+    
+    def test_system_tar_tolerates_vanished_files(self, gnu_tar, source_dir, tmp_path,
+                                                 simple_exclusion_filter, monkeypatch):
+        """Testa que arquivo apagado após a varredura não aborta o backup"""
+        scan = compression_mod.scan_directory(source_dir, simple_exclusion_filter)
+        (source_dir / "README.md").unlink()
+        compressor = TarCompressor()
+        monkeypatch.setattr(compressor, '_external_tar', lambda: gnu_tar)
+        archive = tmp_path / "backup.tar.gz"
+        
+        stats = compressor.compress(source_dir, archive, simple_exclusion_filter, scan=scan)
+        
+        with tarfile.open(archive, 'r:gz') as tar:
+            assert "source/README.md" not in tar.getnames()
+            assert "source/file1.txt" in tar.getnames()
+        
+        # Mesma contagem do caminho do tarfile: o apagado conta como excluído
+        monkeypatch.setattr(compressor, '_external_tar', lambda: None)
+        esperado = compressor.compress(source_dir, tmp_path / "ref.tar.gz",
+                                       simple_exclusion_filter, scan=scan)
+        assert stats == esperado
+        assert stats[1] == scan.excluded_files + 1
+    
+    @pytest.mark.parametrize("linha, falha", [
+        ("tar: source/a: Warning: Cannot stat: No such file or directory", True),
+        ("tar: source/a: Warning: Cannot open: Permission denied", True),
+        ("tar: source/a: Cannot open: Permission denied", True),
+        ("tar: source/a: File removed before we read it", True),
+        ("tar: source/a\\: b: Warning: Cannot stat: No such file or directory", True),
+        ("tar: source/a: file changed as we read it", False),
+    ])
+    def test_tar_read_failure_messages(self, linha, falha):
+        """Testa quais avisos do GNU tar indicam arquivo fora do archive"""
+        assert bool(compression_mod._TAR_READ_FAILURE.search(linha)) is falha
+    
+    def test_system_tar_only_with_pigz(self, monkeypatch):
+        """Testa que sem pigz a criação fica com o tarfile"""
+        import shutil
+        real_which = shutil.which
+        monkeypatch.setattr(compression_mod.shutil, 'which',
+                            lambda name: None if name == 'pigz' else real_which(name))
+        
+        assert TarCompressor()._external_tar() is None
+    
+    def test_compress_without_pigz(self, source_dir, tmp_path, simple_exclusion_filter, monkeypatch):
+        """Testa fallback para o gzip da biblioteca padrão"""
+        monkeypatch.setattr(TarCompressor, 'USE_PIGZ', False)
+        
+        compressor = TarCompressor()
+        archive = tmp_path / "backup.tar.gz"
+        total_files, _, _ = compressor.compress(source_dir, archive, simple_exclusion_filter)
+        
+        with tarfile.open(archive, 'r:gz') as tar:
+            assert len(tar.getnames()) == total_files
+    
+    def test_parallel_gzip_without_pigz(self, source_dir, tmp_path, simple_exclusion_filter,
+                                        monkeypatch):
+        """Testa o gzip paralelo em threads (vários membros concatenados)"""
+        import gzip
+        monkeypatch.setattr(TarCompressor, 'USE_PIGZ', False)
+        monkeypatch.setattr(TarCompressor, 'PARALLEL_GZIP_MIN_SIZE', 0)
+        monkeypatch.setattr(compression_mod.os, 'cpu_count', lambda: 4)
+        monkeypatch.setattr(compression_mod.ParallelGzipWriter, 'BLOCK_SIZE', 1024)
+        (source_dir / "grande.txt").write_text("linha de texto\n" * 2000)
+        
+        compressor = TarCompressor()
+        archive = tmp_path / "backup.tar.gz"
+        hasher = hashlib.sha256()
+        total_files, _, _ = compressor.compress(source_dir, archive, simple_exclusion_filter,
+                                                hasher=hasher)
+        
+        with tarfile.open(archive, 'r:gz') as tar:
+            assert len(tar.getnames()) == total_files
+            conteudo = tar.extractfile("source/grande.txt").read()
+        assert conteudo == (source_dir / "grande.txt").read_bytes()
+        assert archive.read_bytes().count(b"\x1f\x8b\x08") > 1  # Vários membros
+        assert hasher.hexdigest() == hashlib.sha256(archive.read_bytes()).hexdigest()
+        gzip.decompress(archive.read_bytes())  # Stream gzip válido
+        
+        # Ida e volta pela restauração do próprio projeto, sem o tar do sistema
+        monkeypatch.setattr(TarCompressor, 'USE_EXTERNAL_TAR', False)
+        destino = tmp_path / "restaurado"
+        compressor.decompress(archive, destino)
+        for arquivo in ("grande.txt", "file1.txt", "subdir/nested.txt"):
+            assert (destino / "source" / arquivo).read_bytes() == (source_dir / arquivo).read_bytes()
+    
+    def test_headers_match_gettarinfo(self, source_dir, tmp_path, simple_exclusion_filter):
+        """Testa que o cabeçalho montado equivale ao do tar.add()"""
+        compressor = TarCompressor()
+        archive = tmp_path / "backup.tar.gz"
+        compressor.compress(source_dir, archive, simple_exclusion_filter)
+    
+        arquivo = source_dir / "subdir" / "nested.txt"
+        referencia = tmp_path / "referencia.tar"
+        with tarfile.open(referencia, 'w') as tar:
+            tar.add(str(arquivo), arcname="source/subdir/nested.txt")
+        with tarfile.open(referencia, 'r') as tar:
+            esperado = tar.getmember("source/subdir/nested.txt")
+        
+        with tarfile.open(archive, 'r:gz') as tar:
+            member = tar.getmember("source/subdir/nested.txt")
+            assert tar.extractfile(member).read() == arquivo.read_bytes()
+    
+        for campo in ("type", "mode", "uid", "gid", "uname", "gname", "size"):
+            assert getattr(member, campo) == getattr(esperado, campo), campo
+        assert int(member.mtime) == int(esperado.mtime)
+    
+    def test_file_truncated_after_scan_restores(self, source_dir, tmp_path,
+                                                simple_exclusion_filter, monkeypatch):
+        """Testa que um arquivo grande que encolheu após a varredura não corrompe o tar"""
+        monkeypatch.setattr(TarCompressor, 'USE_EXTERNAL_TAR', False)
+        monkeypatch.setattr(TarCompressor, 'PREFETCH_MAX_FILE_SIZE', 0)  # Lido em série
+        grande = source_dir / "grande.bin"
+        grande.write_bytes(os.urandom(256 * 1024))
+        
+        scan = compression_mod.scan_directory(source_dir, simple_exclusion_filter)
+        os.truncate(grande, 100)
+        
+        compressor = TarCompressor()
+        archive = tmp_path / "backup.tar.gz"
+        compressor.compress(source_dir, archive, simple_exclusion_filter, scan=scan)
+        compressor.decompress(archive, tmp_path / "extraido")
+        
+        restaurado = tmp_path / "extraido" / "source"
+        assert (restaurado / "grande.bin").read_bytes() == grande.read_bytes()
+        assert (restaurado / "subdir" / "nested.txt").read_text() == "arquivo aninhado"
+    
+    def test_file_shrinking_while_read_is_padded(self, source_dir, tmp_path,
+                                                 simple_exclusion_filter, monkeypatch, capsys):
+        """Testa que o que falta de um arquivo que encolheu na leitura vira zeros"""
+        monkeypatch.setattr(TarCompressor, 'USE_EXTERNAL_TAR', False)
+        monkeypatch.setattr(TarCompressor, 'PREFETCH_MAX_FILE_SIZE', 0)
+        grande = source_dir / "grande.bin"
+        grande.write_bytes(b"a" * 1000)
+        
+        # O stat do arquivo aberto ainda vê o tamanho antigo; a leitura, o novo
+        fstat = os.fstat
+        def fstat_antigo(fd):
+            st = fstat(fd)
+            if st.st_size == 100:
+                return os.stat_result(tuple(st)[:6] + (1000,) + tuple(st)[7:10])
+            return st
+        monkeypatch.setattr(compression_mod.os, 'fstat', fstat_antigo)
+        scan = compression_mod.scan_directory(source_dir, simple_exclusion_filter)
+        os.truncate(grande, 100)
+        
+        compressor = TarCompressor()
+        archive = tmp_path / "backup.tar.gz"
+        total_files, _, _ = compressor.compress(source_dir, archive, simple_exclusion_filter,
+                                                scan=scan)
+        
+        assert "900 bytes completados com zeros" in capsys.readouterr().out
+        assert total_files == len(scan.files)
+        compressor.decompress(archive, tmp_path / "extraido")
+        restaurado = (tmp_path / "extraido" / "source" / "grande.bin").read_bytes()
+        assert restaurado == b"a" * 100 + b"\0" * 900
+    
+    @pytest.mark.parametrize("prefetch_max", [16 * 1024 * 1024, 0])
+    def test_hard_links_kept_as_links(self, prefetch_max, source_dir, tmp_path,
+                                      simple_exclusion_filter, monkeypatch):
+        """Testa que hard links viram membros LNKTYPE e são restaurados como links"""
+        monkeypatch.setattr(TarCompressor, 'USE_EXTERNAL_TAR', False)
+        monkeypatch.setattr(TarCompressor, 'PREFETCH_MAX_FILE_SIZE', prefetch_max)
+        os.link(source_dir / "file1.txt", source_dir / "subdir" / "link1.txt")
+        
+        compressor = TarCompressor()
+        archive = tmp_path / "backup.tar.gz"
+        total_files, _, _ = compressor.compress(source_dir, archive, simple_exclusion_filter)
+        
+        with tarfile.open(archive, 'r:gz') as tar:
+            membros = {m.name: m for m in tar.getmembers()}
+        # O primeiro na ordem do archive leva o conteúdo; o outro aponta para ele
+        primeiro, segundo = [
+            n for n in membros if n in ("source/file1.txt", "source/subdir/link1.txt")
+        ]
+        assert membros[primeiro].isreg()
+        assert membros[segundo].islnk()
+        assert membros[segundo].linkname == primeiro
+        assert membros[segundo].size == 0
+        assert total_files == len(membros)
+        
+        compressor.decompress(archive, tmp_path / "extraido")
+        restaurado = tmp_path / "extraido" / "source"
+        a, b = restaurado / "file1.txt", restaurado / "subdir" / "link1.txt"
+        assert b.read_text() == "conteúdo 1"
+        assert os.stat(a).st_ino == os.stat(b).st_ino
+    
+    def test_symlink_kept_as_link(self, source_dir, tmp_path, simple_exclusion_filter):
+        """Testa que links simbólicos continuam sendo gravados como links"""
+        (source_dir / "link.txt").symlink_to("file1.txt")
+    
+        compressor = TarCompressor()
+        archive = tmp_path / "backup.tar.gz"
+        compressor.compress(source_dir, archive, simple_exclusion_filter)
+    
+        with tarfile.open(archive, 'r:gz') as tar:
+            member = tar.getmember("source/link.txt")
+            assert member.issym()
+            assert member.linkname == "file1.txt"
 
 class TestZipCompressor:
     """Testes para ZipCompressor"""
@@ -206,36 +609,184 @@ class TestZipCompressor:
         
         assert len(progress_calls) > 0
     
-    def test_decompress(self, source_dir, tmp_path, simple_exclusion_filter):
+    def test_decompress(self, prebuilt_zip_archive, tmp_path):
         """Testa descompressão"""
         compressor = ZipCompressor()
-        archive = tmp_path / "backup.zip"
         extract_dir = tmp_path / "extracted"
         extract_dir.mkdir()
         
-        # Comprime
-        compressor.compress(source_dir, archive, simple_exclusion_filter)
-        
         # Descomprime
-        compressor.decompress(archive, extract_dir)
+        compressor.decompress(prebuilt_zip_archive, extract_dir)
         
         # Verifica que arquivos foram extraídos
-        extracted_source = extract_dir / source_dir.name
+        extracted_source = extract_dir / "source"
         assert extracted_source.exists()
         assert (extracted_source / "file1.txt").exists()
     
-    def test_compress_preserves_structure(self, source_dir, tmp_path, simple_exclusion_filter):
+    def test_compress_preserves_structure(self, prebuilt_zip_archive):
         """Testa que estrutura de diretórios é preservada"""
+        # Verifica conteúdo do arquivo
+        with zipfile.ZipFile(prebuilt_zip_archive, 'r') as zipf:
+            names = zipf.namelist()
+            # Deve conter subdir/nested.txt
+            assert any('subdir' in name and 'nested.txt' in name for name in names)
+    
+    @pytest.mark.parametrize("external", [True, False])
+    def test_decompress_with_and_without_unzip(self, external, source_dir, tmp_path,
+                                               simple_exclusion_filter):
+        """Testa a extração pelo unzip do sistema e pelo zipfile"""
+        import shutil
+        if external and shutil.which('unzip') is None:
+            pytest.skip("unzip não disponível")
+        compressor = ZipCompressor()
+        compressor.USE_UNZIP = external
+        archive = tmp_path / "backup.zip"
+        extract_dir = tmp_path / "extraido"
+        
+        compressor.compress(source_dir, archive, simple_exclusion_filter, hasher=hashlib.sha256())
+        compressor.decompress(archive, extract_dir)
+        
+        restaurado = extract_dir / "source" / "subdir" / "nested.txt"
+        assert restaurado.read_text() == "arquivo aninhado"
+    
+    @pytest.mark.parametrize("prefetch_limit", [16 * 1024 * 1024, -1])
+    def test_headers_match_zipfile_write(self, prefetch_limit, source_dir, tmp_path,
+                                         simple_exclusion_filter):
+        """Testa que o cabeçalho montado equivale ao do ZipFile.write()"""
+        compressor = ZipCompressor()
+        compressor.PREFETCH_MAX_FILE_SIZE = prefetch_limit
+        archive = tmp_path / "backup.zip"
+        compressor.compress(source_dir, archive, simple_exclusion_filter, compression_level=9)
+        
+        arquivo = source_dir / "subdir" / "nested.txt"
+        referencia = tmp_path / "referencia.zip"
+        with zipfile.ZipFile(referencia, 'w', zipfile.ZIP_DEFLATED, compresslevel=9) as zipf:
+            zipf.write(arquivo, arcname="source/subdir/nested.txt")
+        
+        with zipfile.ZipFile(archive) as zipf, zipfile.ZipFile(referencia) as ref:
+            member = zipf.getinfo("source/subdir/nested.txt")
+            esperado = ref.getinfo("source/subdir/nested.txt")
+            assert zipf.read(member) == arquivo.read_bytes()
+        
+        for campo in ("date_time", "external_attr", "compress_type", "file_size", "compress_size"):
+            assert getattr(member, campo) == getattr(esperado, campo), campo
+
+    
+    @pytest.mark.parametrize("prefetch_limit", [16 * 1024 * 1024, -1])
+    def test_compressed_formats_are_stored(self, prefetch_limit, source_dir, tmp_path,
+                                           simple_exclusion_filter):
+        """Testa que formatos já comprimidos entram sem deflate"""
+        (source_dir / "foto.JPG").write_bytes(b"\xff\xd8" + b"x" * 4096)
         compressor = ZipCompressor()
+        compressor.PREFETCH_MAX_FILE_SIZE = prefetch_limit
         archive = tmp_path / "backup.zip"
         
         compressor.compress(source_dir, archive, simple_exclusion_filter)
         
-        # Verifica conteúdo do arquivo
-        with zipfile.ZipFile(archive, 'r') as zipf:
-            names = zipf.namelist()
-            # Deve conter subdir/nested.txt
-            assert any('subdir' in name and 'nested.txt' in name for name in names)
+        with zipfile.ZipFile(archive) as zipf:
+            assert zipf.getinfo("source/foto.JPG").compress_type == zipfile.ZIP_STORED
+            assert zipf.getinfo("source/file1.txt").compress_type == zipfile.ZIP_DEFLATED
+            assert zipf.read("source/foto.JPG") == (source_dir / "foto.JPG").read_bytes()
+            assert zipf.testzip() is None
+    
+    def test_entry_level_applied(self, source_dir, tmp_path, simple_exclusion_filter):
+        """Testa que o nível vai para cada entrada (compress_level/_compresslevel)"""
+        zinfo = ZipCompressor()._build_zipinfo("a.txt", os.stat(source_dir / "file1.txt"), 1)
+        assert getattr(zinfo, compression_mod._ZIPINFO_LEVEL_ATTR) == 1
+        
+        (source_dir / "grande.txt").write_text("".join(f"linha {i}\n" for i in range(20000)))
+        tamanhos = {}
+        for nivel in (1, 9):
+            archive = tmp_path / f"nivel{nivel}.zip"
+            ZipCompressor().compress(source_dir, archive, simple_exclusion_filter,
+                                     compression_level=nivel)
+            with zipfile.ZipFile(archive) as zipf:
+                tamanhos[nivel] = zipf.getinfo("source/grande.txt").compress_size
+        assert tamanhos[9] < tamanhos[1]
+    
+    def test_level_zero_stores_everything(self, source_dir, tmp_path, simple_exclusion_filter):
+        """Testa que nível 0 grava todas as entradas sem compressão"""
+        compressor = ZipCompressor()
+        archive = tmp_path / "backup.zip"
+        
+        compressor.compress(source_dir, archive, simple_exclusion_filter, compression_level=0)
+        
+        with zipfile.ZipFile(archive) as zipf:
+            assert {i.compress_type for i in zipf.infolist()} == {zipfile.ZIP_STORED}
+            assert zipf.testzip() is None
+    
+    @pytest.mark.parametrize("nome", ["video.mp4", "dados.bin"])
+    def test_streamed_entries_copied_in_chunks(self, nome, source_dir, tmp_path,
+                                               simple_exclusion_filter):
+        """Testa a cópia por buffer reutilizado em entradas stored e deflate"""
+        import os
+        conteudo = os.urandom(10000) + b"z" * 5000
+        (source_dir / nome).write_bytes(conteudo)
+        compressor = ZipCompressor()
+        compressor.PREFETCH_MAX_FILE_SIZE = -1   # Todos pelo caminho de streaming
+        compressor.COPY_BUFSIZE = 4096           # Vários blocos por arquivo
+        archive = tmp_path / "backup.zip"
+        
+        compressor.compress(source_dir, archive, simple_exclusion_filter,
+                            hasher=hashlib.sha256())
+        
+        with zipfile.ZipFile(archive) as zipf:
+            assert zipf.read(f"source/{nome}") == conteudo
+            assert zipf.testzip() is None
+    
+    def test_large_entries_forced_zip64(self, source_dir, tmp_path, simple_exclusion_filter):
+        """Testa que entradas grandes já saem com cabeçalho ZIP64"""
+        compressor = ZipCompressor()
+        compressor.PREFETCH_MAX_FILE_SIZE = -1   # Todos pelo caminho de streaming
+        compressor.ZIP64_FORCE_SIZE = 12
+        archive = tmp_path / "backup.zip"
+        
+        compressor.compress(source_dir, archive, simple_exclusion_filter)
+        
+        with zipfile.ZipFile(archive) as zipf:
+            grande = zipf.getinfo("source/subdir/nested.txt")   # 16 bytes
+            pequeno = zipf.getinfo("source/file1.txt")          # 11 bytes
+            assert grande.extract_version >= zipfile.ZIP64_VERSION
+            assert pequeno.extract_version < zipfile.ZIP64_VERSION
+            assert zipf.read(grande) == b"arquivo aninhado"
+            assert zipf.testzip() is None
+
+class TestTarZstdCompressor:
+    """Testes para TarZstdCompressor"""
+    
+    def test_extension(self):
+        """Testa propriedade extension"""
+        assert TarZstdCompressor().extension == ".tar.zst"
+    
+    def test_compress_and_decompress(self, source_dir, tmp_path, simple_exclusion_filter):
+        """Testa ida e volta em tar.zst"""
+        pytest.importorskip("zstandard")
+        compressor = TarZstdCompressor()
+        archive = tmp_path / "backup.tar.zst"
+        extract_dir = tmp_path / "extracted"
+        extract_dir.mkdir()
+        
+        total_files, _, excluded_dirs = compressor.compress(source_dir, archive, simple_exclusion_filter)
+        compressor.decompress(archive, extract_dir)
+        
+        assert total_files >= 3
+        assert excluded_dirs >= 1
+        assert (extract_dir / source_dir.name / "subdir" / "nested.txt").read_text() == "arquivo aninhado"
+    
+    def test_missing_dependency(self, tmp_path, monkeypatch):
+        """Testa erro claro quando zstandard não está instalado"""
+        import builtins
+        real_import = builtins.__import__
+        
+        def fake_import(name, *args, **kwargs):
+            if name == "zstandard":
+                raise ImportError(name)
+            return real_import(name, *args, **kwargs)
+        
+        monkeypatch.setattr(builtins, "__import__", fake_import)
+        
+        with pytest.raises(RuntimeError, match="zstandard"):
+            TarZstdCompressor().decompress(tmp_path / "x.tar.zst", tmp_path)
 
 
 class TestGetCompressor:
@@ -253,6 +804,17 @@ class TestGetCompressor:
         assert isinstance(compressor, ZipCompressor)
         assert compressor.extension == ".zip"
     
+    def test_get_tar_zst_compressor(self):
+        """Testa obter compressor tar.zst"""
+        compressor = get_compressor('tar.zst')
+        assert isinstance(compressor, TarZstdCompressor)
+        assert compressor.extension == ".tar.zst"
+    
+    def test_get_zstd_alias(self):
+        """Testa 'zstd' como sinônimo de 'tar.zst'"""
+        assert isinstance(get_compressor('zstd'), TarZstdCompressor)
+        assert isinstance(get_compressor('ZSTD'), TarZstdCompressor)
+    
     def test_get_tar_case_insensitive(self):
         """Testa que formato é case-insensitive"""
         compressor1 = get_compressor('TAR')
@@ -277,6 +839,157 @@ class TestGetCompressor:
             get_compressor('7z')
 
 
+class TestHashWhileWriting:
+    """Testes do hash calculado durante a escrita (sem reler o arquivo)"""
+    
+    @pytest.mark.parametrize("format_type", ["tar", "zip", "tar.zst"])
+    def test_hash_matches_file(self, format_type, source_dir, tmp_path, simple_exclusion_filter):
+        """Testa que o hash do stream é igual ao hash do arquivo final"""
+        if format_type == "tar.zst":
+            pytest.importorskip("zstandard")
+        compressor = get_compressor(format_type)
+        archive = tmp_path / f"backup{compressor.extension}"
+        hasher = hashlib.sha256()
+        
+        compressor.compress(source_dir, archive, simple_exclusion_filter, hasher=hasher)
+        
+        assert hasher.hexdigest() == hashlib.sha256(archive.read_bytes()).hexdigest()
+    
+    def test_streamed_zip_is_readable(self, source_dir, tmp_path, simple_exclusion_filter):
+        """Testa que o zip gravado sem seek() continua válido"""
+        compressor = ZipCompressor()
+        archive = tmp_path / "backup.zip"
+        
+        total_files, _, _ = compressor.compress(
+            source_dir, archive, simple_exclusion_filter, hasher=hashlib.sha256()
+        )
+        
+        with zipfile.ZipFile(archive) as zipf:
+            assert zipf.testzip() is None
+            assert len(zipf.namelist()) == total_files
+
+
+
+class TestParallelGzipWriter:
+    """Testes do ParallelGzipWriter"""
+    
+    def test_blocks_roundtrip_in_order(self):
+        """Testa que os blocos voltam na ordem original"""
+        import gzip
+        import io
+        destino = io.BytesIO()
+        writer = ParallelGzipWriter(destino, compression_level=1, workers=3)
+        writer.BLOCK_SIZE = 100
+        dados = bytes(range(256)) * 40
+        
+        for i in range(0, len(dados), 77):
+            writer.write(dados[i:i + 77])
+        writer.close()
+        
+        assert gzip.decompress(destino.getvalue()) == dados
+    
+    def test_empty_stream_is_valid_gzip(self):
+        """Testa que fechar sem dados ainda gera um gzip válido"""
+        import gzip
+        import io
+        destino = io.BytesIO()
+        ParallelGzipWriter(destino).close()
+        
+        assert gzip.decompress(destino.getvalue()) == b""
+
+@pytest.mark.parametrize("compressor_cls", [TarCompressor, ZipCompressor])
+def test_output_opened_with_large_buffer(compressor_cls, source_dir, tmp_path,
+                                         simple_exclusion_filter, monkeypatch):
+    """Testa que o arquivo de saída é aberto com buffer de OUTPUT_BUFSIZE"""
+    import builtins
+    buffers = []
+    
+    def spy_open(file, mode='r', *args, **kwargs):
+        if 'w' in mode:
+            buffers.append(kwargs.get('buffering'))
+        return builtins.open(file, mode, *args, **kwargs)
+    
+    monkeypatch.setattr(compression_mod, 'open', spy_open, raising=False)
+    compressor = compressor_cls()
+    archive = tmp_path / f"backup{compressor.extension}"
+    
+    compressor.compress(source_dir, archive, simple_exclusion_filter, hasher=hashlib.sha256())
+    
+    assert buffers == [compressor_cls.OUTPUT_BUFSIZE]
+
+
+class TestPrefetch:
+    """Testes da leitura antecipada de arquivos"""
+    
+    def _files(self, source_dir):
+        import os
+        nomes = ["file1.txt", "file2.py", "README.md"]
+        return [(str(source_dir / n), f"source/{n}", os.lstat(source_dir / n)) for n in nomes]
+    
+    def test_preserves_order_and_content(self, source_dir):
+        """Testa que os itens saem na ordem da varredura com o conteúdo lido"""
+        files = self._files(source_dir)
+        compressor = TarCompressor()
+        compressor.PREFETCH_MAX_INFLIGHT = 2
+        
+        itens = list(compressor._prefetch(files))
+        
+        assert [i[1] for i in itens] == [f[1] for f in files]
+        for file_path, _, _, future in itens:
+            assert future.result() == Path(file_path).read_bytes()
+    
+    def test_large_files_read_serially(self, source_dir):
+        """Testa que arquivos acima do limite não são lidos antecipadamente"""
+        compressor = TarCompressor()
+        compressor.PREFETCH_MAX_FILE_SIZE = 0
+        
+        itens = list(compressor._prefetch(self._files(source_dir)))
+        
+        assert all(future is None for *_, future in itens)
+    
+    @pytest.mark.parametrize("format_type", ["tar", "zip"])
+    def test_same_content_with_and_without_prefetch(self, format_type, source_dir, tmp_path,
+                                                    simple_exclusion_filter):
+        """Testa que os dois caminhos de leitura geram o mesmo conteúdo"""
+        def conteudo(archive):
+            if format_type == "zip":
+                with zipfile.ZipFile(archive) as zipf:
+                    return {n: zipf.read(n) for n in zipf.namelist()}
+            with tarfile.open(archive) as tar:
+                return {m.name: tar.extractfile(m).read() for m in tar.getmembers()}
+        
+        antecipado = get_compressor(format_type)
+        serial = get_compressor(format_type)
+        serial.PREFETCH_MAX_FILE_SIZE = -1
+        a = tmp_path / f"a{antecipado.extension}"
+        b = tmp_path / f"b{serial.extension}"
+        
+        antecipado.compress(source_dir, a, simple_exclusion_filter)
+        serial.compress(source_dir, b, simple_exclusion_filter)
+        
+        assert conteudo(a) == conteudo(b)
+        assert len(conteudo(a)) == 4
+    
+    def test_read_error_counts_as_excluded(self, source_dir, tmp_path, simple_exclusion_filter,
+                                           monkeypatch):
+        """Testa que falha de leitura numa thread exclui só aquele arquivo"""
+        original = compression_mod._read_file
+        
+        def falha(file_path):
+            if file_path.endswith("file1.txt"):
+                raise OSError("falha simulada")
+            return original(file_path)
+        
+        monkeypatch.setattr(compression_mod, "_read_file", falha)
+        compressor = TarCompressor()
+        archive = tmp_path / "backup.tar.gz"
+        
+        total_files, excluded_files, _ = compressor.compress(source_dir, archive,
+                                                             simple_exclusion_filter)
+        
+        assert total_files == 3
+        assert excluded_files == 3  # file.pyc, temp.tmp + falha de leitura
+
 class TestCompressionComparison:
     """Testes comparativos entre compressores"""
     
@@ -296,29 +1009,20 @@ class TestCompressionComparison:
         assert tar_stats[1] == zip_stats[1]  # excluded_files
         assert tar_stats[2] == zip_stats[2]  # excluded_dirs
     
-    def test_both_preserve_content(self, source_dir, tmp_path, simple_exclusion_filter):
+    def test_both_preserve_content(self, prebuilt_tar_archive, prebuilt_zip_archive, tmp_path):
         """Testa que ambos preservam conteúdo dos arquivos"""
-        tar_comp = TarCompressor()
-        zip_comp = ZipCompressor()
-        
-        tar_archive = tmp_path / "backup.tar.gz"
-        zip_archive = tmp_path / "backup.zip"
-        
         tar_extract = tmp_path / "tar_extracted"
         zip_extract = tmp_path / "zip_extracted"
         tar_extract.mkdir()
         zip_extract.mkdir()
         
-        # Comprime e descomprime com ambos
-        tar_comp.compress(source_dir, tar_archive, simple_exclusion_filter)
-        zip_comp.compress(source_dir, zip_archive, simple_exclusion_filter)
-        
-        tar_comp.decompress(tar_archive, tar_extract)
-        zip_comp.decompress(zip_archive, zip_extract)
+        # Descomprime os arquivos pré-montados com ambos
+        TarCompressor().decompress(prebuilt_tar_archive, tar_extract)
+        ZipCompressor().decompress(prebuilt_zip_archive, zip_extract)
         
         # Verifica que conteúdo é igual
-        tar_file = tar_extract / source_dir.name / "file1.txt"
-        zip_file = zip_extract / source_dir.name / "file1.txt"
+        tar_file = tar_extract / "source" / "file1.txt"
+        zip_file = zip_extract / "source" / "file1.txt"
         
         assert tar_file.read_text() == zip_file.read_text()
 
@@ -107,7 +107,7 @@ class TestPathProperties:
     def test_index_file(self, config_file):
         """Testa index_file (derivado de backup_destination)"""
         config = Config(config_file)
-        expected = Path("/tmp/test_backups") / "indice_backups.json"
+        expected = Path("/tmp/test_backups") / "indice_backups.jsonl"
         assert config.index_file == expected
 
 
@@ -163,6 +163,23 @@ class TestCompressionProperties:
         assert config.default_compression_level == 6
 
 
+class TestIntegrityProperties:
+    """Testes para propriedades de integrity"""
+    
+    def test_hash_algorithm_default(self, config_file):
+        """Testa que SHA256 é o padrão sem seção integrity"""
+        config = Config(config_file)
+        assert config.hash_algorithm == "sha256"
+    
+    def test_hash_algorithm_configured(self, tmp_path):
+        """Testa algoritmo escolhido no config.json"""
+        custom = tmp_path / "custom.json"
+        custom.write_text('{"integrity": {"hash_algorithm": "blake3"}}')
+        
+        config = Config(custom)
+        assert config.hash_algorithm == "blake3"
+
+
 class TestExclusionPatternsProperties:
     """Testes para propriedades de exclusion_patterns"""
     
@@ -233,6 +250,26 @@ class TestExclusionPatternsProperties:
         config.remove_custom_pattern("*.nonexistent")
         
         assert len(config.custom_exclusion_patterns) == initial_count
+    
+    def test_add_custom_patterns_saves_once(self, config_file, monkeypatch):
+        """Testa add_custom_patterns(): ignora repetidos e grava uma só vez"""
+        config = Config(config_file)
+        saves = []
+        original_save = config.save
+        monkeypatch.setattr(config, "save", lambda: (saves.append(1), original_save()))
+        
+        novos = config.add_custom_patterns(["*.bak", "*.log", "*.iso", "*.bak"])
+        
+        assert novos == ["*.bak", "*.iso"]
+        assert len(saves) == 1
+        assert Config(config_file).custom_exclusion_patterns.count("*.bak") == 1
+    
+    def test_add_custom_patterns_nothing_new(self, config_file, monkeypatch):
+        """Testa que add_custom_patterns() sem novidades não grava"""
+        config = Config(config_file)
+        monkeypatch.setattr(config, "save", lambda: pytest.fail("save() chamado"))
+        
+        assert config.add_custom_patterns(["*.log"]) == []
 
 
 class TestNotificationsProperties:
@@ -316,6 +353,41 @@ class TestSaveAndLoad:
         config2 = Config(config_file)
         assert config2.get('new_key') == 'new_value'
     
+    def test_save_unchanged_skips_write(self, config_file):
+        """Testa que save() sem alterações não regrava o arquivo"""
+        config = Config(config_file)
+        config.set('new_key', 'new_value')
+        mtime = config_file.stat().st_mtime_ns
+        
+        config.save()
+        config.set('new_key', 'new_value')
+        
+        assert config_file.stat().st_mtime_ns == mtime
+    
+    def test_save_is_atomic(self, config_file, monkeypatch):
+        """Testa que uma falha na troca preserva o arquivo e não deixa temporários"""
+        config = Config(config_file)
+        original = config_file.read_bytes()
+        
+        def falha(src, dst):
+            raise OSError("disco cheio")
+        monkeypatch.setattr(config_mod.os, "replace", falha)
+        
+        with pytest.raises(OSError):
+            config.set('new_key', 'new_value')
+        
+        assert config_file.read_bytes() == original
+        assert list(config_file.parent.glob("*.tmp")) == []
+    
+    def test_save_keeps_permissions(self, config_file):
+        """Testa que save() mantém as permissões do config.json"""
+        config_file.chmod(0o644)
+        config = Config(config_file)
+        
+        config.set('new_key', 'new_value')
+        
+        assert config_file.stat().st_mode & 0o777 == 0o644
+    
     def test_load_preserves_structure(self, config_file):
         """Testa que load() preserva estrutura"""
         config = Config(config_file)
@@ -328,6 +400,106 @@ class TestSaveAndLoad:
         assert 'compression' in config._config
 
 
+class TestLoadCache:
+    """Testes do cache de leitura por (mtime, tamanho)"""
+    
+    def test_unchanged_file_not_reparsed(self, config_file, monkeypatch):
+        """Testa que um arquivo inalterado não é parseado de novo"""
+        Config(config_file)
+        
+        def fail(raw):
+            raise AssertionError("config.json reparseado sem mudança em disco")
+        monkeypatch.setattr(config_mod, "_loads", fail)
+        
+        assert Config(config_file).default_compression_level == 9
+    
+    def test_changed_file_reloaded(self, config_file):
+        """Testa que alterações em disco invalidam o cache"""
+        assert Config(config_file).days_to_keep == 60
+        
+        data = json.loads(config_file.read_text())
+        data["retention_policy"]["days_to_keep"] = 7
+        config_file.write_text(json.dumps(data, indent=4))
+        
+        assert Config(config_file).days_to_keep == 7
+    
+    def test_modification_does_not_leak_to_other_instances(self, config_file):
+        """Testa copy-on-write: modificar uma instância não altera outra já carregada"""
+        a = Config(config_file)
+        b = Config(config_file)
+        
+        a.add_custom_pattern("*.bak")
+        
+        assert "*.bak" in a.custom_exclusion_patterns
+        assert "*.bak" not in b.custom_exclusion_patterns
+        assert "*.bak" in Config(config_file).custom_exclusion_patterns
+    
+    def test_returned_values_do_not_leak_to_other_instances(self, config_file):
+        """Testa que modificar o que get() e as propriedades devolvem não altera o cache"""
+        a = Config(config_file)
+        b = Config(config_file)
+        
+        a.get("exclusion_patterns")["custom"].append("*.bak")
+        a.get("paths")["temp_dir"] = "/outro"
+        a.custom_exclusion_patterns.append("*.iso")
+        a.default_exclusion_patterns.clear()
+        
+        for config in (a, b, Config(config_file)):
+            assert config.get("exclusion_patterns")["custom"] == ["*.log"]
+            assert config.get("paths")["temp_dir"] == "/tmp/backup-temp"
+        for config in (b, Config(config_file)):
+            assert config.default_exclusion_patterns == ["*.pyc", "*.tmp", "__pycache__"]
+            assert config.custom_exclusion_patterns == ["*.log"]
+    
+    def test_set_value_is_copied(self, config_file):
+        """Testa que o valor passado a set() não fica compartilhado com o chamador"""
+        valor = {"nivel": 1}
+        Config(config_file).set("extra", valor)
+        valor["nivel"] = 2
+        
+        assert Config(config_file).get("extra") == {"nivel": 1}
+    
+    def test_stdlib_fallback_without_orjson(self, config_file, monkeypatch):
+        """Testa leitura sem o orjson instalado"""
+        monkeypatch.setattr(config_mod, "orjson", None)
+        monkeypatch.setattr(config_mod, "_CACHE", {})
+        
+        assert Config(config_file).default_format == "tar"
+
+
+class TestCachedProperties:
+    """Testes da memorização das propriedades"""
+    
+    def test_destination_created_once(self, config_file, monkeypatch):
+        """Testa que o destino é expandido e criado uma só vez"""
+        config = Config(config_file)
+        chamadas = []
+        mkdir = Path.mkdir
+        monkeypatch.setattr(Path, "mkdir", lambda self, *a, **k: (chamadas.append(self), mkdir(self, *a, **k)))
+        
+        assert config.backup_destination is config.backup_destination
+        assert config.index_file.parent == config.backup_destination
+        assert len(chamadas) == 1
+    
+    def test_set_invalidates_cached_values(self, config_file):
+        """Testa que set() descarta os valores memorizados"""
+        config = Config(config_file)
+        assert config.default_format == "tar"
+        
+        config.set("compression", {"default_format": "zip", "default_level": 3})
+        
+        assert config.default_format == "zip"
+        assert config.default_compression_level == 3
+    
+    def test_all_patterns_returns_independent_list(self, config_file):
+        """Testa que all_exclusion_patterns devolve sempre uma lista nova"""
+        config = Config(config_file)
+        padroes = config.all_exclusion_patterns
+        padroes.append("*.extra")
+        
+        assert "*.extra" not in config.all_exclusion_patterns
+
+
 class TestRepr:
     """Testes para __repr__()"""
     
@@ -18,6 +18,12 @@ spec.loader.exec_module(exclusion)
 ExclusionFilter = exclusion.ExclusionFilter
 
 
+@pytest.fixture
+def regex_filter():
+    """Filtro com um glob que exige regex ('test_*'), caso em que o cache é usado"""
+    return ExclusionFilter(['*.pyc', 'test_*', '*.tmp', '__pycache__', 'node_modules'])
+
+
 class TestExclusionFilterInit:
     """Testes de inicialização do ExclusionFilter"""
     
@@ -61,15 +67,15 @@ class TestAddPattern:
         exclusion_filter.add_pattern("")
         assert len(exclusion_filter) == initial_count
     
-    def test_cache_cleared_on_add(self, exclusion_filter):
+    def test_cache_cleared_on_add(self, regex_filter):
         """Testa se cache é limpo ao adicionar padrão"""
         # Popula cache
-        exclusion_filter.should_exclude("test.pyc")
-        assert len(exclusion_filter._cache) > 0
+        regex_filter.should_exclude("test.pyc")
+        assert len(regex_filter._cache) > 0
         
         # Adiciona padrão
-        exclusion_filter.add_pattern("*.log")
-        assert len(exclusion_filter._cache) == 0
+        regex_filter.add_pattern("*.log")
+        assert len(regex_filter._cache) == 0
 
 
 class TestAddPatterns:
@@ -107,15 +113,15 @@ class TestRemovePattern:
         exclusion_filter.remove_pattern("*.xyz")
         assert len(exclusion_filter) == initial_count
     
-    def test_cache_cleared_on_remove(self, exclusion_filter):
+    def test_cache_cleared_on_remove(self, regex_filter):
         """Testa se cache é limpo ao remover padrão"""
         # Popula cache
-        exclusion_filter.should_exclude("test.pyc")
-        assert len(exclusion_filter._cache) > 0
+        regex_filter.should_exclude("test.pyc")
+        assert len(regex_filter._cache) > 0
         
         # Remove padrão
-        exclusion_filter.remove_pattern("*.pyc")
-        assert len(exclusion_filter._cache) == 0
+        regex_filter.remove_pattern("*.pyc")
+        assert len(regex_filter._cache) == 0
 
 
 class TestShouldExclude:
@@ -153,15 +159,184 @@ class TestShouldExclude:
         assert filter.should_exclude("test_module.py") is True
         assert filter.should_exclude("my_test.py") is False
     
-    def test_cache_usage(self, exclusion_filter):
+    def test_combined_patterns_match_fnmatch(self):
+        """Testa que a regex combinada equivale a fnmatch padrão a padrão"""
+        import fnmatch
+        patterns = ["*.py[co]", "build", "?.tmp", "[!a]*.bak"]
+        filter = ExclusionFilter(patterns)
+        nomes = ["x.pyc", "x.pyo", "x.py", "build", "builder", "a.tmp",
+                 "ab.tmp", "a1.bak", "b1.bak"]
+        
+        for nome in nomes:
+            esperado = any(fnmatch.fnmatch(nome, p) for p in patterns)
+            assert filter.should_exclude(nome) is esperado, nome
+    
+    def test_literal_patterns_skip_regex(self):
+        """Testa que padrões sem curinga vão para o conjunto de literais"""
+        filter = ExclusionFilter(["node_modules", ".git", "*.pyc"])
+        assert filter._literals == frozenset({"node_modules", ".git"})
+        assert filter.should_exclude("projeto/.git") is True
+        assert filter.should_exclude(".github") is False
+        assert filter.should_exclude("x.pyc") is True
+    
+    def test_literals_updated_on_change(self):
+        """Testa que o conjunto de literais acompanha add/remove"""
+        filter = ExclusionFilter(["build"])
+        filter.add_pattern("dist")
+        filter.remove_pattern("build")
+        assert filter.should_exclude("dist") is True
+        assert filter.should_exclude("build") is False
+    
+    def test_same_patterns_reuse_compiled_regex(self):
+        """Testa que filtros com os mesmos padrões compartilham a compilação"""
+        a = ExclusionFilter(["build", "a?.tmp", "docs/*/tmp"])
+        b = ExclusionFilter(["build", "a?.tmp", "docs/*/tmp"])
+        assert a._regex is b._regex
+        assert a._path_regex is b._path_regex
+        
+        b.add_pattern("x.lo[gx]")
+        assert b._regex is not a._regex
+        assert a.should_exclude("x.log") is False
+        assert b.should_exclude("x.log") is True
+    
+    def test_literal_path_patterns_skip_regex(self):
+        """Testa que padrões de caminho sem curinga vão para um frozenset"""
+        filtro = ExclusionFilter(["docs/build", "/web/dist/", "*/gerado"])
+        
+        assert filtro._path_literals == frozenset({"docs/build", "web/dist"})
+        assert filtro.should_exclude("docs/build") is True
+        assert filtro.should_exclude("web/dist/") is True
+        assert filtro.should_exclude("docs/build2") is False
+        assert filtro.should_exclude("x/docs/build") is False
+        assert filtro.should_exclude("a/gerado") is True
+    
+    def test_literal_path_patterns_only(self):
+        """Testa filtro só com caminhos literais (sem regex de caminho)"""
+        filtro = ExclusionFilter(["docs/build"])
+        
+        assert filtro._path_regex is None
+        assert filtro.should_exclude(Path("docs/build")) is True
+        assert filtro.should_exclude(Path("build")) is False
+        assert filtro.partition(["docs/build", "docs"]) == (["docs"], 1)
+    
+    def test_suffix_patterns_skip_regex(self):
+        """Testa que '*<sufixo>' vira teste de sufixo, equivalente ao fnmatch"""
+        import fnmatch
+        patterns = ["*.pyc", "*~", "*.tar.gz", "a*.tmp", "*[0-9].bak"]
+        filter = ExclusionFilter(patterns)
+        
+        assert filter._suffixes == (".pyc", "~", ".tar.gz")
+        nomes = ["x.pyc", ".pyc", "x.py", "nota~", "b.tar.gz", "b.tar",
+                 "ab.tmp", "b.tmp", "a1.bak", "ab.bak"]
+        for nome in nomes:
+            esperado = any(fnmatch.fnmatch(nome, p) for p in patterns)
+            assert filter.should_exclude(nome) is esperado, nome
+    
+    def test_path_patterns_match_relative_path(self):
+        """Testa padrões com '/' contra o caminho relativo"""
+        filter = ExclusionFilter(["docs/build", "*/generated"])
+        assert filter.should_exclude("docs/build") is True
+        assert filter.should_exclude("build") is False  # Só o nome não basta
+        assert filter.should_exclude("src/api/generated") is True
+        assert filter.should_exclude("generated") is False
+        assert filter.should_exclude("docs/build.txt") is False
+    
+    def test_name_extracted_like_path_name(self):
+        """Testa que o nome base é extraído como Path(...).name"""
+        filter = ExclusionFilter(["build", "*.log"])
+        assert filter.should_exclude(Path("src/build")) is True
+        assert filter.should_exclude("src/build/") is True
+        assert filter.should_exclude("/abs/dir/app.log") is True
+        assert filter.should_exclude("build/src") is False
+    
+    def test_no_patterns_excludes_nothing(self):
+        """Testa filtro sem padrões"""
+        filter = ExclusionFilter()
+        assert filter.should_exclude("qualquer.txt") is False
+    
+    def test_case_sensitive_on_posix(self):
+        """Testa que, sem IGNORE_CASE, maiúsculas importam"""
+        filtro = ExclusionFilter(["node_modules", "*.log"])
+        filtro.IGNORE_CASE = False
+        filtro._patterns_changed()
+        
+        assert filtro.should_exclude("node_modules") is True
+        assert filtro.should_exclude("Node_Modules") is False
+        assert filtro.should_exclude("ERRO.LOG") is False
+    
+    def test_ignore_case_like_fnmatch_on_windows(self):
+        """Testa IGNORE_CASE (Windows): literais, globs e caminhos sem caixa"""
+        filtro = ExclusionFilter(["node_modules", "*.log", "Docs/Build"])
+        filtro.IGNORE_CASE = True
+        filtro._patterns_changed()
+        
+        assert filtro.should_exclude("Node_Modules") is True
+        assert filtro.should_exclude("ERRO.LOG") is True
+        assert filtro.should_exclude("docs/build") is True
+        assert filtro.should_exclude("main.py") is False
+    
+    def test_cache_usage(self, regex_filter):
         """Testa uso do cache"""
         # Primeira verificação
-        result1 = exclusion_filter.should_exclude("test.pyc")
-        assert "test.pyc" in exclusion_filter._cache
+        result1 = regex_filter.should_exclude("test.pyc")
+        assert "test.pyc" in regex_filter._cache
         
         # Segunda verificação (usa cache)
-        result2 = exclusion_filter.should_exclude("test.pyc")
+        result2 = regex_filter.should_exclude("test.pyc")
         assert result1 == result2
+    
+    def test_cache_keyed_by_basename(self, regex_filter):
+        """Testa que o cache usa o nome base e guarda resultados negativos"""
+        assert regex_filter.should_exclude("a/b/main.py") is False
+        assert regex_filter._cache["main.py"] is False
+        assert regex_filter.should_exclude("outro/main.py") is False
+        assert len(regex_filter._cache) == 1
+    
+    def test_path_objects_use_name(self, exclusion_filter, monkeypatch):
+        """Testa que Path sem padrões de caminho usa .name, sem converter para str"""
+        caminhos = [Path("src/x.pyc"), Path("a/node_modules"), Path("main.py"), Path("/")]
+        esperado = [exclusion_filter.should_exclude(str(p)) for p in caminhos]
+        
+        def sem_fspath(path):
+            raise AssertionError("os.fspath() chamado")
+        monkeypatch.setattr(exclusion.os, "fspath", sem_fspath)
+        
+        assert [exclusion_filter.should_exclude(p) for p in caminhos] == esperado
+    
+    def test_path_objects_with_path_patterns(self):
+        """Testa que, com padrões de caminho, Path ainda casa pelo caminho inteiro"""
+        filtro = ExclusionFilter(["docs/build", "*.log"])
+        assert filtro.should_exclude(Path("docs/build")) is True
+        assert filtro.should_exclude(Path("outro/build")) is False
+        assert filtro.should_exclude(Path("a/b.log")) is True
+    
+    @pytest.mark.parametrize("patterns", [
+        ["*.pyc", "node_modules"],
+        ["*.pyc", "test_*", "docs/build", "*/gerado"],
+    ])
+    def test_should_exclude_entry_matches_should_exclude(self, patterns):
+        """Testa que should_exclude_entry(nome, caminho) decide igual a should_exclude"""
+        filtro = ExclusionFilter(patterns)
+        for rel_path in ["a.py", "src/x.pyc", "web/node_modules", "test_a.py",
+                         "docs/build", "outro/build", "src/gerado", "gerado"]:
+            nome = rel_path.rpartition("/")[2]
+            assert filtro.should_exclude_entry(nome, rel_path) is filtro.should_exclude(rel_path), rel_path
+    
+    def test_no_cache_without_regex(self, exclusion_filter):
+        """Testa que só literais e sufixos dispensam o cache"""
+        assert exclusion_filter._regex is None
+        assert exclusion_filter.should_exclude("a/test.pyc") is True
+        assert exclusion_filter.should_exclude("main.py") is False
+        assert len(exclusion_filter._cache) == 0
+    
+    def test_cache_is_bounded(self, regex_filter):
+        """Testa que o cache descarta as entradas menos usadas"""
+        regex_filter.CACHE_MAX_SIZE = 3
+        for nome in ["a.py", "b.py", "c.py", "d.py"]:
+            regex_filter.should_exclude(nome)
+        
+        assert len(regex_filter._cache) == 3
+        assert "a.py" not in regex_filter._cache
 
 
 class TestFilterPaths:
@@ -211,6 +386,47 @@ class TestFilterPaths:
         assert len(filtered) == 3
 
 
+class TestPartition:
+    """Testes para partition()"""
+    
+    def test_partition_keeps_order_and_counts(self):
+        """Testa separação em mantidos e excluídos numa passada"""
+        filter = ExclusionFilter(["*.pyc", "build", "docs/tmp"])
+        nomes = ["a.py", "a.pyc", "build", "src", "docs/tmp", "b.pyc", "README"]
+        
+        kept, excluded = filter.partition(nomes)
+        
+        assert kept == ["a.py", "src", "README"]
+        assert excluded == 4
+    
+    def test_partition_accepts_paths(self):
+        """Testa partition() com objetos Path e iteradores"""
+        filter = ExclusionFilter(["*.tmp"])
+        kept, excluded = filter.partition(iter([Path("x/a.tmp"), Path("x/b.txt")]))
+        
+        assert kept == [Path("x/b.txt")]
+        assert excluded == 1
+    
+    @pytest.mark.parametrize("patterns", [
+        ["*.pyc", "node_modules", "*~"],           # Laço em linha
+        ["*.pyc", "node_modules", "test_*"],       # Com regex: should_exclude()
+        ["*.pyc", "node_modules", "docs/build"],   # Com padrão de caminho
+    ])
+    @pytest.mark.parametrize("ignore_case", [False, True])
+    def test_partition_matches_should_exclude(self, patterns, ignore_case):
+        """Testa que partition() decide igual a should_exclude() item a item"""
+        filter = ExclusionFilter(patterns)
+        filter.IGNORE_CASE = ignore_case
+        filter._patterns_changed()
+        entradas = ["a.py", "a.PYC", "src/Node_Modules", "nota~", "test_x.py",
+                    "docs/build/", Path("x/b.pyc"), Path("docs/build"), Path("/")]
+        
+        kept, excluded = filter.partition(entradas)
+        
+        assert kept == [e for e in entradas if not filter.should_exclude(e)]
+        assert excluded == len(entradas) - len(kept)
+
+
 class TestGetPatterns:
     """Testes para get_patterns()"""
     
@@ -226,16 +442,16 @@ class TestGetPatterns:
 class TestClearCache:
     """Testes para clear_cache()"""
     
-    def test_clear_cache(self, exclusion_filter):
+    def test_clear_cache(self, regex_filter):
         """Testa limpar cache"""
         # Popula cache
-        exclusion_filter.should_exclude("test.pyc")
-        exclusion_filter.should_exclude("module.pyc")
-        assert len(exclusion_filter._cache) > 0
+        regex_filter.should_exclude("test.pyc")
+        regex_filter.should_exclude("module.pyc")
+        assert len(regex_filter._cache) > 0
         
         # Limpa cache
-        exclusion_filter.clear_cache()
-        assert len(exclusion_filter._cache) == 0
+        regex_filter.clear_cache()
+        assert len(regex_filter._cache) == 0
 
 
 class TestMagicMethods:
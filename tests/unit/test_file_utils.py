@@ -17,6 +17,7 @@ file_utils_mod = importlib.util.module_from_spec(spec)
 spec.loader.exec_module(file_utils_mod)
 
 calculate_directory_size = file_utils_mod.calculate_directory_size
+scan_directory = file_utils_mod.scan_directory
 detect_directory_type = file_utils_mod.detect_directory_type
 get_directory_info = file_utils_mod.get_directory_info
 ensure_directory = file_utils_mod.ensure_directory
@@ -96,6 +97,97 @@ class TestCalculateDirectorySize:
         assert total_files == 1
 
 
+class TestScanDirectory:
+    """Testes para scan_directory()"""
+    
+    def test_collects_files_with_arcnames(self, tmp_path):
+        """Testa que arcnames preservam o nome da pasta de origem"""
+        source = tmp_path / "origem"
+        (source / "sub").mkdir(parents=True)
+        (source / "a.txt").write_text("a" * 10)
+        (source / "sub" / "b.txt").write_text("b" * 20)
+        
+        scan = scan_directory(source)
+        
+        arcnames = sorted(arcname for _, arcname, _ in scan.files)
+        assert arcnames == ["origem/a.txt", "origem/sub/b.txt"]
+        assert scan.total_size == 30
+        assert scan.total_files == 2
+    
+    def test_counts_exclusions(self, tmp_path):
+        """Testa contagem de arquivos e diretórios excluídos"""
+        (tmp_path / "keep.txt").write_text("a")
+        (tmp_path / "skip.tmp").write_text("b")
+        pycache = tmp_path / "__pycache__"
+        pycache.mkdir()
+        (pycache / "x.pyc").write_text("c")
+        
+        scan = scan_directory(tmp_path, ExclusionFilter(['*.tmp', '__pycache__']))
+        
+        assert scan.total_files == 1
+        assert scan.excluded_files == 1
+        assert scan.excluded_dirs == 1
+    
+    def test_filter_with_only_should_exclude(self, tmp_path):
+        """Testa filtro sem should_exclude_entry(): recebe o caminho relativo"""
+        (tmp_path / "keep.txt").write_text("a")
+        sub = tmp_path / "sub"
+        sub.mkdir()
+        (sub / "skip.txt").write_text("b")
+        vistos = []
+        
+        class FiltroSimples:
+            def should_exclude(self, rel_path):
+                vistos.append(rel_path)
+                return rel_path == "sub/skip.txt"
+        
+        scan = scan_directory(tmp_path, FiltroSimples())
+        
+        assert scan.total_files == 1
+        assert scan.excluded_files == 1
+        assert sorted(vistos) == ["keep.txt", "sub", "sub/skip.txt"]
+    
+    def test_sums_incompressible_bytes(self, tmp_path):
+        """Testa a soma de bytes em formatos já comprimidos"""
+        (tmp_path / "video.MP4").write_bytes(b"v" * 300)
+        (tmp_path / "notas.txt").write_bytes(b"t" * 100)
+        
+        scan = scan_directory(tmp_path)
+        
+        assert scan.incompressible_size == 300
+        assert scan.incompressible_ratio == 0.75
+    
+    def test_path_pattern_prunes_only_that_subtree(self, tmp_path):
+        """Testa padrão com '/' casando o caminho relativo à origem"""
+        source = tmp_path / "origem"
+        for sub in ("frontend/node_modules/pkg", "tools/node_modules"):
+            (source / sub).mkdir(parents=True)
+        (source / "frontend" / "node_modules" / "pkg" / "i.js").write_text("x")
+        (source / "tools" / "node_modules" / "t.js").write_text("y")
+        (source / "frontend" / "app.js").write_text("z")
+        
+        scan = scan_directory(source, ExclusionFilter(["frontend/node_modules"]))
+        
+        arcnames = sorted(arcname for _, arcname, _ in scan.files)
+        assert arcnames == ["origem/frontend/app.js", "origem/tools/node_modules/t.js"]
+        assert scan.excluded_dirs == 1
+
+
+    def test_does_not_follow_directory_symlinks(self, tmp_path):
+        """Testa que links para diretórios não são percorridos (como os.walk)"""
+        source = tmp_path / "origem"
+        source.mkdir()
+        (source / "a.txt").write_text("a")
+        outside = tmp_path / "fora"
+        outside.mkdir()
+        (outside / "b.txt").write_text("b")
+        (source / "link").symlink_to(outside, target_is_directory=True)
+        
+        scan = scan_directory(source)
+        
+        assert [arcname for _, arcname, _ in scan.files] == ["origem/a.txt"]
+
+
 class TestDetectDirectoryType:
     """Testes para detect_directory_type()"""
     
@@ -18,6 +18,7 @@ spec.loader.exec_module(formatters)
 
 format_bytes = formatters.format_bytes
 format_date = formatters.format_date
+parse_iso_date = formatters.parse_iso_date
 format_compression_rate = formatters.format_compression_rate
 format_progress = formatters.format_progress
 format_number = formatters.format_number
@@ -58,6 +59,16 @@ class TestFormatBytes:
         """Testa entrada com float"""
         assert format_bytes(1024.5) == "1.0 KB"
         assert format_bytes(1536.7) == "1.5 KB"
+    
+    def test_petabytes_is_last_unit(self):
+        """Testa que PB é a maior unidade"""
+        assert format_bytes(1024 ** 5) == "1.0 PB"
+        assert format_bytes(2048 * 1024 ** 5) == "2048.0 PB"
+    
+    def test_unit_boundaries(self):
+        """Testa valores logo abaixo da troca de unidade"""
+        assert format_bytes(1023) == "1023.0 B"
+        assert format_bytes(1024 ** 2 - 1) == "1024.0 KB"
 
 
 class TestFormatDate:
@@ -84,6 +95,28 @@ class TestFormatDate:
         assert format_date(date, "%Y-%m-%dT%H:%M:%S") == "2025-11-12T15:30:45"
 
 
+class TestParseIsoDate:
+    """Testes para parse_iso_date()"""
+    
+    def test_parses_index_date(self):
+        """Testa conversão da data gravada no índice"""
+        assert parse_iso_date("2025-11-12T15:30:45.123456") == datetime(2025, 11, 12, 15, 30, 45, 123456)
+    
+    def test_same_string_parsed_once(self):
+        """Testa que a mesma data não é convertida de novo"""
+        parse_iso_date.cache_clear()
+        primeira = parse_iso_date("2025-01-02T03:04:05")
+        segunda = parse_iso_date("2025-01-02T03:04:05")
+        
+        assert segunda is primeira
+        assert parse_iso_date.cache_info().hits == 1
+    
+    def test_invalid_string_raises(self):
+        """Testa que data inválida continua gerando ValueError"""
+        with pytest.raises(ValueError):
+            parse_iso_date("não é data")
+
+
 class TestFormatCompressionRate:
     """Testes para format_compression_rate()"""
     
@@ -103,6 +103,48 @@ class TestAddBackup:
         assert len(index2.get_all()) == 1
 
 
+class TestAddBackups:
+    """Testes para add_backups()"""
+    
+    @pytest.mark.parametrize("nome", ["index.json", "index.jsonl"])
+    def test_add_backups_persists(self, tmp_path, nome):
+        """Testa que as entradas são adicionadas em ordem e salvas em disco"""
+        index = BackupIndex(tmp_path / nome)
+        index.add_backup({"arquivo": "b0.tar.gz", "tamanho_backup": 1})
+        
+        adicionados = index.add_backups(
+            {"arquivo": f"b{i}.tar.gz", "tamanho_backup": 10} for i in range(1, 4)
+        )
+        
+        assert adicionados == 3
+        esperados = [f"b{i}.tar.gz" for i in range(4)]
+        assert [b["arquivo"] for b in index.get_all()] == esperados
+        assert [b["arquivo"] for b in BackupIndex(tmp_path / nome).get_all()] == esperados
+        assert index.get_total_size() == 31
+    
+    def test_add_backups_single_write(self, tmp_path, monkeypatch):
+        """Testa que todas as linhas vão numa única escrita"""
+        index = BackupIndex(tmp_path / "index.jsonl")
+        escritas = []
+        append = BackupIndex._append_lines
+        monkeypatch.setattr(
+            BackupIndex, "_append_lines",
+            lambda self, entries: escritas.append(len(entries)) or append(self, entries)
+        )
+        
+        index.add_backups([{"arquivo": f"b{i}.tar.gz"} for i in range(5)])
+        
+        assert escritas == [5]
+    
+    def test_add_backups_empty_does_not_write(self, tmp_path):
+        """Testa que uma lista vazia não cria o arquivo"""
+        index_file = tmp_path / "index.jsonl"
+        index = BackupIndex(index_file)
+        
+        assert index.add_backups([]) == 0
+        assert not index_file.exists()
+
+
 class TestRemoveBackup:
     """Testes para remove_backup()"""
     
@@ -145,6 +187,63 @@ class TestRemoveBackup:
         assert len(index2.get_all()) == 0
 
 
+class TestRemoveBackups:
+    """Testes para remove_backups()"""
+    
+    def test_remove_many_with_single_save(self, tmp_path, monkeypatch):
+        """Testa remoção em lote com uma única gravação"""
+        index = BackupIndex(tmp_path / "index.json")
+        for i in range(5):
+            index.add_backup({"arquivo": f"b{i}.tar.gz"})
+        
+        saves = []
+        original_save = index.save
+        monkeypatch.setattr(index, "save", lambda: (saves.append(1), original_save()))
+        
+        removidos = index.remove_backups(["b1.tar.gz", "b3.tar.gz", "inexistente.tar.gz"])
+        
+        assert removidos == 2
+        assert len(saves) == 1
+        arquivos = [b["arquivo"] for b in BackupIndex(tmp_path / "index.json").get_all()]
+        assert arquivos == ["b0.tar.gz", "b2.tar.gz", "b4.tar.gz"]
+    
+    def test_remove_nothing_skips_save(self, tmp_path, monkeypatch):
+        """Testa que nada é gravado se nenhum nome existe"""
+        index = BackupIndex(tmp_path / "index.json")
+        index.add_backup({"arquivo": "b1.tar.gz"})
+        monkeypatch.setattr(index, "save", lambda: pytest.fail("save() não deveria ser chamado"))
+        
+        assert index.remove_backups(["outro.tar.gz"]) == 0
+        assert index.remove_backups([]) == 0
+    
+    def test_jsonl_appends_tombstones_once(self, tmp_path):
+        """Testa que em JSON Lines os marcadores dos encontrados são acrescentados juntos"""
+        index_file = tmp_path / "index.jsonl"
+        index = BackupIndex(index_file)
+        for i in range(4):
+            index.add_backup({"arquivo": f"b{i}.tar.gz"})
+        
+        index.remove_backups(["b2.tar.gz", "b0.tar.gz", "inexistente.tar.gz"])
+        
+        linhas = [json.loads(l) for l in index_file.read_text(encoding="utf-8").splitlines()]
+        assert linhas[4:] == [
+            {BackupIndex.TOMBSTONE_KEY: "b0.tar.gz"},
+            {BackupIndex.TOMBSTONE_KEY: "b2.tar.gz"},
+        ]
+        arquivos = [b["arquivo"] for b in BackupIndex(index_file).get_all()]
+        assert arquivos == ["b1.tar.gz", "b3.tar.gz"]
+    
+    def test_lookup_follows_bulk_removal(self, tmp_path):
+        """Testa que as visões memorizadas são refeitas após a remoção"""
+        index = BackupIndex(tmp_path / "index.jsonl")
+        index.add_backup({"arquivo": "b1.tar.gz"})
+        assert index.get_by_file("b1.tar.gz") is not None
+        
+        index.remove_backups(["b1.tar.gz"])
+        
+        assert index.get_by_file("b1.tar.gz") is None
+
+
 class TestGetByDirectory:
     """Testes para get_by_directory()"""
     
@@ -169,6 +268,25 @@ class TestGetByDirectory:
         
         result = index.get_by_directory("nonexistent")
         assert result == []
+    
+    def test_get_by_directory_follows_changes(self, tmp_path):
+        """Testa que a busca reflete adições e remoções e devolve cópias"""
+        index = BackupIndex(tmp_path / "index.jsonl")
+        index.add_backup({"arquivo": "b1.tar.gz", "nome_diretorio": "projeto1"})
+        
+        index.get_by_directory("projeto1").clear()
+        index.add_backup({"arquivo": "b2.tar.gz", "nome_diretorio": "projeto1"})
+        index.remove_backup("b1.tar.gz")
+        
+        assert [b["arquivo"] for b in index.get_by_directory("projeto1")] == ["b2.tar.gz"]
+    
+    def test_get_by_directory_ignores_entries_without_directory(self, tmp_path):
+        """Testa que entradas sem nome_diretorio não aparecem como 'desconhecido'"""
+        index = BackupIndex(tmp_path / "index.jsonl")
+        index.add_backup({"arquivo": "b1.tar.gz"})
+        index.add_backup({"arquivo": "b2.tar.gz", "nome_diretorio": "desconhecido"})
+        
+        assert [b["arquivo"] for b in index.get_by_directory("desconhecido")] == ["b2.tar.gz"]
 
 
 class TestGetGroupedByDirectory:
@@ -206,6 +324,29 @@ class TestGetGroupedByDirectory:
         
         grouped = index.get_grouped_by_directory()
         assert "desconhecido" in grouped
+    
+    def test_grouped_returns_copies(self, tmp_path):
+        """Testa que modificar o agrupamento retornado não afeta o memorizado"""
+        index = BackupIndex(tmp_path / "index.json")
+        index.add_backup({"arquivo": "b1.tar.gz", "nome_diretorio": "proj"})
+        
+        grouped = index.get_grouped_by_directory()
+        grouped["proj"].clear()
+        grouped["outro"] = []
+        
+        assert index.get_grouped_by_directory() == {"proj": [{"arquivo": "b1.tar.gz", "nome_diretorio": "proj"}]}
+    
+    def test_grouped_follows_changes(self, tmp_path):
+        """Testa que o agrupamento memorizado é refeito após mudanças"""
+        index = BackupIndex(tmp_path / "index.jsonl")
+        index.add_backup({"arquivo": "b1.tar.gz", "nome_diretorio": "proj"})
+        assert list(index.get_grouped_by_directory()) == ["proj"]
+        
+        index.add_backup({"arquivo": "b2.tar.gz", "nome_diretorio": "docs"})
+        assert list(index.get_grouped_by_directory()) == ["proj", "docs"]
+        
+        index.remove_backups(["b1.tar.gz"])
+        assert list(index.get_grouped_by_directory()) == ["docs"]
 
 
 class TestGetSortedByDate:
@@ -240,6 +381,72 @@ class TestGetSortedByDate:
         assert sorted_backups[1]["arquivo"] == "b1"  # Mais recente
 
 
+class TestSortedCache:
+    """Testes da ordenação memorizada de get_sorted_by_date()"""
+    
+    def test_sorted_view_reused_until_change(self, tmp_path, monkeypatch):
+        """Testa que a ordenação só é refeita após mudanças no índice"""
+        index = BackupIndex(tmp_path / "index.jsonl")
+        index.add_backup({"arquivo": "b1", "data_criacao": "2025-01-02T00:00:00"})
+        index.add_backup({"arquivo": "b2", "data_criacao": "2025-01-01T00:00:00"})
+        
+        ordenacoes = []
+        
+        def spy_sorted(*args, **kwargs):
+            ordenacoes.append(1)
+            return sorted(*args, **kwargs)
+        
+        monkeypatch.setattr(index_mod, "sorted", spy_sorted, raising=False)
+        
+        assert [b["arquivo"] for b in index.get_sorted_by_date()] == ["b1", "b2"]
+        assert [b["arquivo"] for b in index.get_sorted_by_date()] == ["b1", "b2"]
+        assert len(ordenacoes) == 1
+        
+        index.add_backup({"arquivo": "b3", "data_criacao": "2025-01-03T00:00:00"})
+        assert [b["arquivo"] for b in index.get_sorted_by_date()] == ["b3", "b1", "b2"]
+        assert len(ordenacoes) == 2
+        
+        index.remove_backup("b3")
+        assert [b["arquivo"] for b in index.get_sorted_by_date(reverse=False)] == ["b2", "b1"]
+    
+    def test_sorted_view_returns_copy(self, tmp_path):
+        """Testa que modificar a lista retornada não afeta a ordenação memorizada"""
+        index = BackupIndex(tmp_path / "index.json")
+        index.add_backup({"arquivo": "b1", "data_criacao": "2025-01-01T00:00:00"})
+        
+        index.get_sorted_by_date().clear()
+        
+        assert len(index.get_sorted_by_date()) == 1
+
+
+class TestGetOldest:
+    """Testes para get_oldest()"""
+    
+    def _index(self, tmp_path):
+        index = BackupIndex(tmp_path / "index.jsonl")
+        datas = ["2025-03-01", "2025-01-01", "2025-02-01", "2025-01-01", "2025-04-01"]
+        for i, data in enumerate(datas):
+            index.add_backup({"arquivo": f"b{i}", "data_criacao": f"{data}T00:00:00"})
+        return index
+    
+    @pytest.mark.parametrize("n", [0, 1, 2, 3, 5, 10])
+    def test_same_as_sorted_prefix(self, tmp_path, n):
+        """Testa que equivale ao início de get_sorted_by_date(reverse=False), empates inclusive"""
+        index = self._index(tmp_path)
+        
+        oldest = [b["arquivo"] for b in index.get_oldest(n)]
+        
+        assert oldest == [b["arquivo"] for b in index.get_sorted_by_date(reverse=False)][:n]
+    
+    def test_uses_memoized_sort(self, tmp_path, monkeypatch):
+        """Testa que a ordenação memorizada é aproveitada"""
+        index = self._index(tmp_path)
+        index.get_sorted_by_date(reverse=False)
+        monkeypatch.setattr(index_mod.heapq, "nsmallest", lambda *a, **k: pytest.fail("nsmallest chamado"))
+        
+        assert [b["arquivo"] for b in index.get_oldest(2)] == ["b1", "b3"]
+
+
 class TestFindByHash:
     """Testes para find_by_hash()"""
     
@@ -256,6 +463,15 @@ class TestFindByHash:
         assert result is not None
         assert result["arquivo"] == "b1.tar.gz"
     
+    def test_find_by_hash_digest(self, tmp_path):
+        """Testa busca pelo campo hash_digest (backups novos)"""
+        index = BackupIndex(tmp_path / "index.json")
+        index.add_backup({"arquivo": "old.tar.gz", "hash_md5": "abc123"})
+        index.add_backup({"arquivo": "new.tar.gz", "hash_algo": "sha256", "hash_digest": "f00d"})
+        
+        assert index.find_by_hash("f00d")["arquivo"] == "new.tar.gz"
+        assert index.find_by_hash("abc123")["arquivo"] == "old.tar.gz"
+    
     def test_find_nonexistent_hash(self, tmp_path):
         """Testa buscar hash inexistente"""
         index_file = tmp_path / "index.json"
@@ -265,6 +481,29 @@ class TestFindByHash:
         
         result = index.find_by_hash("nonexistent")
         assert result is None
+    
+    def test_find_by_hash_follows_changes(self, tmp_path):
+        """Testa que a busca por hash acompanha adições, remoções e atualizações"""
+        index = BackupIndex(tmp_path / "index.jsonl")
+        index.add_backup({"arquivo": "b1.tar.gz", "hash_md5": "abc123"})
+        assert index.find_by_hash("abc123")["arquivo"] == "b1.tar.gz"
+        
+        index.add_backup({"arquivo": "b2.tar.gz", "hash_digest": "f00d"})
+        assert index.find_by_hash("f00d")["arquivo"] == "b2.tar.gz"
+        
+        index.update_backups({"b1.tar.gz": {"hash_digest": "beef"}})
+        assert index.find_by_hash("beef")["arquivo"] == "b1.tar.gz"
+        
+        index.remove_backup("b2.tar.gz")
+        assert index.find_by_hash("f00d") is None
+    
+    def test_find_by_hash_first_match_wins(self, tmp_path):
+        """Testa que, com hashes repetidos, vale o primeiro backup do índice"""
+        index = BackupIndex(tmp_path / "index.json")
+        index.add_backup({"arquivo": "b1.tar.gz", "hash_md5": "abc123"})
+        index.add_backup({"arquivo": "b2.tar.gz", "hash_digest": "abc123"})
+        
+        assert index.find_by_hash("abc123")["arquivo"] == "b1.tar.gz"
 
 
 class TestGetTotalSize:
@@ -301,6 +540,122 @@ class TestGetTotalSize:
         assert total == 1024
 
 
+class TestTotalSizeTracking:
+    """Testes do tamanho total mantido incrementalmente"""
+    
+    @staticmethod
+    def _soma(index):
+        return sum(b.get("tamanho_backup", 0) for b in index.get_all())
+    
+    def test_tracks_every_mutation(self, tmp_path):
+        """Testa que o total acompanha adições, remoções, atualizações e limpeza"""
+        index = BackupIndex(tmp_path / "index.jsonl")
+        for i in range(5):
+            index.add_backup({"arquivo": f"b{i}", "tamanho_backup": 100 * (i + 1)})
+        assert index.get_total_size() == self._soma(index) == 1500
+        
+        index.add_backup({"arquivo": "b5", "tamanho_backup": 1})
+        index.add_backup({"arquivo": "sem_tamanho"})
+        assert index.get_total_size() == self._soma(index) == 1501
+        
+        index.remove_backup("b0")
+        index.remove_backups(["b1", "b2", "inexistente"])
+        assert index.get_total_size() == self._soma(index) == 901
+        
+        index.update_backups({"b3": {"tamanho_backup": 50}})
+        assert index.get_total_size() == self._soma(index) == 551
+        
+        index.clear()
+        assert index.get_total_size() == 0
+    
+    def test_sum_not_recomputed_after_changes(self, tmp_path, monkeypatch):
+        """Testa que adicionar e remover não refaz a soma de todas as entradas"""
+        index = BackupIndex(tmp_path / "index.jsonl")
+        index.add_backup({"arquivo": "b1", "tamanho_backup": 10})
+        assert index.get_total_size() == 10
+        
+        monkeypatch.setattr(index_mod, "sum", lambda *a: pytest.fail("soma refeita"), raising=False)
+        index.add_backup({"arquivo": "b2", "tamanho_backup": 5})
+        index.remove_backup("b1")
+        
+        assert index.get_total_size() == 5
+
+
+class TestGetStatistics:
+    """Testes de get_statistics"""
+    
+    def test_empty_index(self, tmp_path):
+        """Testa as estatísticas de um índice vazio"""
+        stats = BackupIndex(tmp_path / "index.jsonl").get_statistics()
+        assert stats["total_backups"] == 0
+        assert stats["oldest_backup"] is None
+        assert stats["newest_backup"] is None
+    
+    def test_matches_sorted_ends(self, tmp_path):
+        """Testa que mais antigo/recente coincidem com as pontas da ordenação"""
+        index = BackupIndex(tmp_path / "index.jsonl")
+        for i, dia in enumerate([5, 1, 9, 3]):
+            index.add_backup({
+                "arquivo": f"b{i}",
+                "nome_diretorio": f"dir{i % 2}",
+                "data_criacao": f"2024-01-0{dia}T00:00:00",
+            })
+        
+        stats = index.get_statistics()
+        ordenados = index.get_sorted_by_date(reverse=False)
+        assert stats["oldest_backup"] == ordenados[0]["data_criacao"] == "2024-01-01T00:00:00"
+        assert stats["newest_backup"] == ordenados[-1]["data_criacao"] == "2024-01-09T00:00:00"
+        assert stats["unique_directories"] == 2
+        
+        # Com a ordenação memorizada o resultado é o mesmo
+        assert index.get_statistics() == stats
+    
+    def test_does_not_sort(self, tmp_path):
+        """Testa que as estatísticas não constroem a ordenação por data"""
+        index = BackupIndex(tmp_path / "index.jsonl")
+        index.add_backup({"arquivo": "b1", "data_criacao": "2024-01-02T00:00:00"})
+        index.add_backup({"arquivo": "b2", "data_criacao": "2024-01-01T00:00:00"})
+        
+        index.get_statistics()
+        assert not index._sorted
+
+
+class TestGetByFile:
+    """Testes para get_by_file()"""
+    
+    def test_get_by_file(self, tmp_path):
+        """Testa busca pelo nome do arquivo"""
+        index = BackupIndex(tmp_path / "index.jsonl")
+        index.add_backup({"arquivo": "b1.tar.gz", "n": 1})
+        index.add_backup({"arquivo": "b2.tar.gz", "n": 2})
+        
+        assert index.get_by_file("b2.tar.gz")["n"] == 2
+        assert index.get_by_file("b3.tar.gz") is None
+    
+    def test_lookup_follows_changes(self, tmp_path):
+        """Testa que a busca reflete adições, remoções e clear()"""
+        index = BackupIndex(tmp_path / "index.jsonl")
+        index.add_backup({"arquivo": "b1.tar.gz"})
+        assert index.get_by_file("b2.tar.gz") is None
+        
+        index.add_backup({"arquivo": "b2.tar.gz"})
+        assert index.get_by_file("b2.tar.gz") is not None
+        
+        index.remove_backup("b1.tar.gz")
+        assert index.get_by_file("b1.tar.gz") is None
+        
+        index.clear()
+        assert index.get_by_file("b2.tar.gz") is None
+    
+    def test_first_entry_wins_on_duplicates(self, tmp_path):
+        """Testa que, com nomes repetidos, vale a primeira entrada"""
+        index = BackupIndex(tmp_path / "index.json")
+        index.add_backup({"arquivo": "b1.tar.gz", "n": 1})
+        index.add_backup({"arquivo": "b1.tar.gz", "n": 2})
+        
+        assert index.get_by_file("b1.tar.gz")["n"] == 1
+
+
 class TestGetAll:
     """Testes para get_all()"""
     
@@ -316,6 +671,49 @@ class TestGetAll:
         
         # Não deve afetar o índice original
         assert len(index.get_all()) == 1
+    
+    def test_iter_all_without_copy(self, tmp_path):
+        """Testa que iter_all() percorre as mesmas entradas, sem lista nova"""
+        index = BackupIndex(tmp_path / "index.json")
+        index.add_backup({"arquivo": "b1.tar.gz"})
+        index.add_backup({"arquivo": "b2.tar.gz"})
+        
+        iterador = index.iter_all()
+        
+        assert not isinstance(iterador, list)
+        assert list(iterador) == index.get_all()
+
+
+class TestUpdateBackups:
+    """Testes para update_backups()"""
+    
+    def test_update_persists_with_single_save(self, tmp_path, monkeypatch):
+        """Testa que as atualizações são gravadas de uma só vez"""
+        index_file = tmp_path / "index.jsonl"
+        index = BackupIndex(index_file)
+        index.add_backup({"arquivo": "b1.tar.gz"})
+        index.add_backup({"arquivo": "b2.tar.gz"})
+        
+        saves = []
+        original_save = index.save
+        monkeypatch.setattr(index, "save", lambda: (saves.append(1), original_save()))
+        
+        atualizados = index.update_backups({
+            "b1.tar.gz": {"hash_algo": "sha256"},
+            "b2.tar.gz": {"hash_algo": "sha256"},
+            "inexistente.tar.gz": {"hash_algo": "sha256"},
+        })
+        
+        assert atualizados == 2
+        assert len(saves) == 1
+        assert all(b["hash_algo"] == "sha256" for b in BackupIndex(index_file).get_all())
+    
+    def test_update_nothing_skips_save(self, tmp_path, monkeypatch):
+        """Testa que nada é gravado sem entradas correspondentes"""
+        index = BackupIndex(tmp_path / "index.jsonl")
+        monkeypatch.setattr(index, "save", lambda: pytest.fail("save() chamado"))
+        
+        assert index.update_backups({"x.tar.gz": {"a": 1}}) == 0
 
 
 class TestLoadAndSave:
@@ -344,3 +742,193 @@ class TestLoadAndSave:
         backups = index.get_all()
         assert len(backups) == 1
         assert backups[0]["arquivo"] == "b1.tar.gz"
+    
+    def test_saved_file_is_readable_json(self, tmp_path):
+        """Testa que o arquivo salvo é JSON UTF-8 legível pelo json padrão"""
+        index_file = tmp_path / "index.json"
+        index = BackupIndex(index_file)
+        
+        index.add_backup({"arquivo": "b1.tar.gz", "nome_diretorio": "projeto_ção"})
+        
+        texto = index_file.read_text(encoding="utf-8")
+        assert "projeto_ção" in texto  # sem escapes \uXXXX
+        assert json.loads(texto) == [{"arquivo": "b1.tar.gz", "nome_diretorio": "projeto_ção"}]
+    
+    def test_stdlib_fallback_without_orjson(self, tmp_path, monkeypatch):
+        """Testa que o índice funciona sem o orjson instalado"""
+        monkeypatch.setattr(index_mod, "orjson", None)
+        index_file = tmp_path / "index.json"
+        
+        BackupIndex(index_file).add_backup({"arquivo": "b1.tar.gz"})
+        
+        assert BackupIndex(index_file).get_all() == [{"arquivo": "b1.tar.gz"}]
+    
+    @pytest.mark.parametrize("nome_arquivo", ["index.json", "index.jsonl"])
+    @pytest.mark.parametrize("sem_orjson", [False, True])
+    def test_backends_write_same_data(self, tmp_path, monkeypatch, nome_arquivo, sem_orjson):
+        """Testa que orjson e json da stdlib aceitam e gravam as mesmas entradas"""
+        if sem_orjson:
+            monkeypatch.setattr(index_mod, "orjson", None)
+        index_file = tmp_path / nome_arquivo
+        
+        BackupIndex(index_file).add_backup({"arquivo": "ação.tar.gz", "extras": {1: "um"}})
+        
+        assert "ação.tar.gz" in index_file.read_text(encoding="utf-8")
+        assert BackupIndex(index_file).get_all() == [{"arquivo": "ação.tar.gz", "extras": {"1": "um"}}]
+
+
+class TestLoadCache:
+    """Testes do cache de leitura por (mtime, tamanho)"""
+    
+    @pytest.mark.parametrize("nome_arquivo", ["index.json", "index.jsonl"])
+    def test_unchanged_file_not_reparsed(self, tmp_path, monkeypatch, nome_arquivo):
+        """Testa que um índice inalterado não é relido nem parseado de novo"""
+        index_file = tmp_path / nome_arquivo
+        index_file.write_text(
+            '[{"arquivo": "b1.tar.gz"}]' if nome_arquivo == "index.json" else '{"arquivo": "b1.tar.gz"}\n',
+            encoding="utf-8"
+        )
+        BackupIndex(index_file)
+        
+        def fail(raw):
+            raise AssertionError("índice reparseado sem mudança em disco")
+        monkeypatch.setattr(index_mod, "_loads", fail)
+        
+        assert BackupIndex(index_file).get_all() == [{"arquivo": "b1.tar.gz"}]
+    
+    def test_changed_file_reloaded(self, tmp_path):
+        """Testa que alterações em disco (inclusive de outra instância) invalidam o cache"""
+        index_file = tmp_path / "index.jsonl"
+        a = BackupIndex(index_file)
+        a.add_backup({"arquivo": "b1.tar.gz"})
+        assert len(BackupIndex(index_file)) == 1
+        
+        a.add_backup({"arquivo": "b2.tar.gz"})
+        assert len(BackupIndex(index_file)) == 2
+        
+        a.remove_backups(["b1.tar.gz", "b2.tar.gz"])
+        assert len(BackupIndex(index_file)) == 0
+    
+    def test_instances_do_not_share_entries(self, tmp_path):
+        """Testa que alterar entradas de uma instância não afeta outra nem o cache"""
+        index_file = tmp_path / "index.json"
+        index_file.write_text('[{"arquivo": "b1.tar.gz"}]', encoding="utf-8")
+        a = BackupIndex(index_file)
+        b = BackupIndex(index_file)
+        
+        a.get_by_file("b1.tar.gz")["hash_digest"] = "f00d"
+        
+        assert "hash_digest" not in b.get_by_file("b1.tar.gz")
+        assert "hash_digest" not in BackupIndex(index_file).get_by_file("b1.tar.gz")
+    
+    def test_non_list_json_treated_as_corrupted(self, tmp_path):
+        """Testa que um .json que não é lista de entradas conta como corrompido"""
+        index_file = tmp_path / "index.json"
+        index_file.write_text('{"arquivo": "b1.tar.gz"}', encoding="utf-8")
+        
+        assert BackupIndex(index_file).get_all() == []
+
+
+class TestJsonLines:
+    """Testes do índice em JSON Lines (.jsonl)"""
+    
+    def test_add_appends_single_line(self, tmp_path):
+        """Testa que add_backup() só acrescenta uma linha"""
+        index_file = tmp_path / "index.jsonl"
+        index = BackupIndex(index_file)
+        
+        index.add_backup({"arquivo": "b1.tar.gz"})
+        index.add_backup({"arquivo": "b2.tar.gz"})
+        
+        linhas = index_file.read_text(encoding="utf-8").splitlines()
+        assert [json.loads(l)["arquivo"] for l in linhas] == ["b1.tar.gz", "b2.tar.gz"]
+        assert [b["arquivo"] for b in BackupIndex(index_file).get_all()] == ["b1.tar.gz", "b2.tar.gz"]
+    
+    def test_remove_appends_tombstone(self, tmp_path):
+        """Testa que remove_backup() só acrescenta um marcador de remoção"""
+        index_file = tmp_path / "index.jsonl"
+        index = BackupIndex(index_file)
+        index.add_backup({"arquivo": "b1.tar.gz"})
+        index.add_backup({"arquivo": "b2.tar.gz"})
+        
+        index.remove_backup("b1.tar.gz")
+        
+        linhas = index_file.read_text(encoding="utf-8").splitlines()
+        assert json.loads(linhas[-1]) == {BackupIndex.TOMBSTONE_KEY: "b1.tar.gz"}
+        assert BackupIndex(index_file).get_all() == [{"arquivo": "b2.tar.gz"}]
+    
+    def test_readded_after_removal_is_kept(self, tmp_path):
+        """Testa que o marcador só apaga entradas anteriores a ele"""
+        index_file = tmp_path / "index.jsonl"
+        index = BackupIndex(index_file)
+        index.add_backup({"arquivo": "b1.tar.gz", "v": 1})
+        index.remove_backup("b1.tar.gz")
+        index.add_backup({"arquivo": "b1.tar.gz", "v": 2})
+        
+        assert BackupIndex(index_file).get_all() == [{"arquivo": "b1.tar.gz", "v": 2}]
+    
+    def test_compacts_when_dead_lines_dominate(self, tmp_path, monkeypatch):
+        """Testa a compactação quando as linhas mortas passam das vivas"""
+        monkeypatch.setattr(BackupIndex, "COMPACT_MIN_DEAD_LINES", 2)
+        index_file = tmp_path / "index.jsonl"
+        index = BackupIndex(index_file)
+        for i in range(6):
+            index.add_backup({"arquivo": f"b{i}.tar.gz"})
+        
+        index.remove_backup("b0.tar.gz")   # 2 linhas mortas: só marcador
+        assert len(index_file.read_text(encoding="utf-8").splitlines()) == 7
+        
+        index.remove_backup("b1.tar.gz")   # 4 mortas, 4 vivas: só marcador
+        index.remove_backup("b2.tar.gz")   # 6 mortas > 3 vivas: compacta
+        
+        linhas = index_file.read_text(encoding="utf-8").splitlines()
+        assert [json.loads(l)["arquivo"] for l in linhas] == ["b3.tar.gz", "b4.tar.gz", "b5.tar.gz"]
+        assert not (tmp_path / "index.jsonl.tmp").exists()
+        
+        # Contagem de linhas mortas também é recuperada no carregamento
+        index.remove_backup("b3.tar.gz")
+        assert BackupIndex(index_file)._dead_lines == 2
+    
+    def test_compact_force(self, tmp_path):
+        """Testa compact(force=True) abaixo do limite e sem linhas mortas"""
+        index_file = tmp_path / "index.jsonl"
+        index = BackupIndex(index_file)
+        index.add_backup({"arquivo": "b1.tar.gz"})
+        index.add_backup({"arquivo": "b2.tar.gz"})
+        index.remove_backup("b1.tar.gz")
+        
+        assert index.compact() is False  # Abaixo do limite
+        assert index.compact(force=True) is True
+        linhas = index_file.read_text(encoding="utf-8").splitlines()
+        assert [json.loads(l) for l in linhas] == [{"arquivo": "b2.tar.gz"}]
+        assert index.compact(force=True) is False  # Nada mais a compactar
+    
+    def test_compact_ignored_for_legacy_json(self, tmp_path):
+        """Testa que compact() não faz nada no índice .json"""
+        index = BackupIndex(tmp_path / "index.json")
+        index.add_backup({"arquivo": "b1.tar.gz"})
+        
+        assert index.compact(force=True) is False
+    
+    def test_truncated_line_is_skipped(self, tmp_path):
+        """Testa que uma linha truncada não derruba o índice nem a próxima entrada"""
+        index_file = tmp_path / "index.jsonl"
+        index_file.write_text('{"arquivo": "b1.tar.gz"}\n{"arquivo": "b2', encoding="utf-8")
+        
+        index = BackupIndex(index_file)
+        assert index.get_all() == [{"arquivo": "b1.tar.gz"}]
+        
+        index.add_backup({"arquivo": "b3.tar.gz"})
+        arquivos = [b["arquivo"] for b in BackupIndex(index_file).get_all()]
+        assert arquivos == ["b1.tar.gz", "b3.tar.gz"]
+    
+    def test_migrates_legacy_json(self, tmp_path):
+        """Testa a migração do índice .json antigo no primeiro carregamento"""
+        legacy = tmp_path / "index.json"
+        legacy.write_text(json.dumps([{"arquivo": "antigo.tar.gz"}]), encoding="utf-8")
+        
+        index = BackupIndex(tmp_path / "index.jsonl")
+        
+        assert index.get_all() == [{"arquivo": "antigo.tar.gz"}]
+        assert (tmp_path / "index.jsonl").exists()
+        assert legacy.exists()  # O antigo é mantido
@@ -4,6 +4,7 @@ Testa cálculo de hashes e verificação de integridade
 """
 
 import pytest
+import hashlib
 import importlib.util
 from pathlib import Path
 
@@ -211,6 +212,30 @@ class TestVerifyFile:
         
         assert IntegrityChecker.verify_file(nonexistent, fake_hash, 'md5') is False
     
+    def test_verify_uses_compare_digest(self, tmp_path, monkeypatch):
+        """Testa que a comparação é feita por hmac.compare_digest"""
+        file = tmp_path / "test.txt"
+        file.write_text("Hello")
+        chamadas = []
+        original = integrity.hmac.compare_digest
+        
+        def spy(a, b):
+            chamadas.append((a, b))
+            return original(a, b)
+        
+        monkeypatch.setattr(integrity.hmac, "compare_digest", spy)
+        esperado = hashlib.md5(b"Hello").hexdigest()
+        
+        assert IntegrityChecker.verify_file(file, esperado.upper(), 'md5') is True
+        assert chamadas == [(esperado, esperado)]
+    
+    def test_verify_non_ascii_hash(self, tmp_path):
+        """Testa que hash esperado com caracteres não ASCII não casa (sem erro)"""
+        file = tmp_path / "test.txt"
+        file.write_text("Hello")
+        
+        assert IntegrityChecker.verify_file(file, "hásh", 'md5') is False
+    
     def test_verify_unsupported_algorithm(self, tmp_path):
         """Testa algoritmo não suportado"""
         file = tmp_path / "test.txt"
@@ -235,12 +260,13 @@ class TestCalculateHash:
         assert hash_result is not None
         assert len(hash_result) == 64
     
-    def test_calculate_hash_default_md5(self, sample_text_file):
-        """Testa que MD5 é o padrão"""
-        hash_md5 = IntegrityChecker.calculate_hash(sample_text_file, 'md5')
+    def test_calculate_hash_default_sha256(self, sample_text_file):
+        """Testa que SHA256 é o padrão"""
+        hash_sha256 = IntegrityChecker.calculate_hash(sample_text_file, 'sha256')
         hash_default = IntegrityChecker.calculate_hash(sample_text_file)
         
-        assert hash_md5 == hash_default
+        assert hash_sha256 == hash_default
+        assert IntegrityChecker.verify_file(sample_text_file, hash_sha256) is True
     
     def test_calculate_hash_unsupported_algorithm(self, sample_text_file):
         """Testa algoritmo não suportado"""
@@ -261,16 +287,149 @@ class TestChunkSize:
     
     def test_chunk_size_constant(self):
         """Testa que CHUNK_SIZE está definido"""
-        assert IntegrityChecker.CHUNK_SIZE == 4096
+        assert IntegrityChecker.CHUNK_SIZE == 4 * 1024 * 1024
     
     def test_large_file_hash(self, tmp_path):
         """Testa hash de arquivo grande (maior que CHUNK_SIZE)"""
         large_file = tmp_path / "large.txt"
         
-        # Cria arquivo de ~10KB (maior que 4KB chunk)
-        content = "A" * 10240
-        large_file.write_text(content)
+        # Cria arquivo maior que dois chunks
+        content = b"A" * (IntegrityChecker.CHUNK_SIZE * 2 + 512)
+        large_file.write_bytes(content)
         
         hash_result = IntegrityChecker.calculate_md5(large_file)
-        assert hash_result is not None
-        assert len(hash_result) == 32
+        assert hash_result == hashlib.md5(content).hexdigest()
+    
+    def test_chunked_fallback_matches_mmap(self, tmp_path, monkeypatch):
+        """Testa que a leitura em chunks gera o mesmo hash que o mmap"""
+        data_file = tmp_path / "data.bin"
+        data_file.write_bytes(bytes(range(256)) * 5000)
+        
+        monkeypatch.setattr(IntegrityChecker, 'MMAP_MIN_SIZE', 1)
+        hash_mmap = IntegrityChecker.calculate_sha256(data_file)
+        
+        monkeypatch.setattr(IntegrityChecker, '_update_mmap', staticmethod(lambda f, h: False))
+        hash_chunked = IntegrityChecker.calculate_sha256(data_file)
+        
+        assert hash_mmap == hash_chunked
+    
+    def test_mmap_only_above_min_size(self, tmp_path, monkeypatch):
+        """Testa que só arquivos a partir de MMAP_MIN_SIZE são mapeados"""
+        mapeados = []
+        mmap_original = integrity.mmap.mmap
+        
+        def spy_mmap(*args, **kwargs):
+            mapeados.append(args)
+            return mmap_original(*args, **kwargs)
+        
+        monkeypatch.setattr(integrity.mmap, 'mmap', spy_mmap)
+        monkeypatch.setattr(IntegrityChecker, 'MMAP_MIN_SIZE', 1000)
+        
+        pequeno = tmp_path / "pequeno.bin"
+        pequeno.write_bytes(b"p" * 999)
+        grande = tmp_path / "grande.bin"
+        grande.write_bytes(b"g" * 1000)
+        
+        assert IntegrityChecker.calculate_md5(pequeno) == hashlib.md5(b"p" * 999).hexdigest()
+        assert mapeados == []
+        assert IntegrityChecker.calculate_md5(grande) == hashlib.md5(b"g" * 1000).hexdigest()
+        assert len(mapeados) == 1
+    
+    @pytest.mark.skipif(not hasattr(hashlib, "file_digest"), reason="requer Python 3.11+")
+    def test_fallback_uses_file_digest(self, tmp_path, monkeypatch):
+        """Testa que, sem mmap, o hash é calculado por hashlib.file_digest()"""
+        data_file = tmp_path / "data.bin"
+        data_file.write_bytes(b"xyz" * 1000)
+        chamadas = []
+        
+        def spy(f, digest):
+            chamadas.append(f)
+            return hashlib.file_digest(f, digest)
+        
+        monkeypatch.setattr(IntegrityChecker, '_update_mmap', staticmethod(lambda f, h: False))
+        monkeypatch.setattr(integrity, '_file_digest', spy)
+        
+        assert IntegrityChecker.calculate_sha256(data_file) == hashlib.sha256(b"xyz" * 1000).hexdigest()
+        assert len(chamadas) == 1
+    
+    def test_file_opened_unbuffered(self, sample_text_file, monkeypatch):
+        """Testa que o arquivo é aberto sem o buffer do io (buffering=0)"""
+        aberturas = []
+        
+        def spy_open(path, mode="r", buffering=-1, **kwargs):
+            aberturas.append(buffering)
+            return open(path, mode, buffering, **kwargs)
+        
+        monkeypatch.setattr(integrity, 'open', spy_open, raising=False)
+        
+        assert IntegrityChecker.calculate_md5(sample_text_file) is not None
+        assert aberturas == [0]
+    
+    def test_fallback_without_file_digest(self, tmp_path, monkeypatch):
+        """Testa o laço readinto() usado antes do Python 3.11"""
+        data_file = tmp_path / "data.bin"
+        data_file.write_bytes(b"xyz" * 1000)
+        
+        monkeypatch.setattr(IntegrityChecker, '_update_mmap', staticmethod(lambda f, h: False))
+        monkeypatch.setattr(integrity, '_file_digest', None)
+        
+        assert IntegrityChecker.calculate_md5(data_file) == hashlib.md5(b"xyz" * 1000).hexdigest()
+
+
+class TestBlake3:
+    """Testes do BLAKE3 opcional"""
+    
+    def test_blake3_unavailable_raises(self, sample_text_file, monkeypatch):
+        """Testa erro claro quando o pacote blake3 não está instalado"""
+        monkeypatch.setattr(integrity, 'blake3', None)
+        
+        with pytest.raises(ValueError, match="blake3"):
+            IntegrityChecker.new_hasher('blake3')
+    
+    def test_blake3_used_when_available(self, sample_text_file, monkeypatch):
+        """Testa que blake3 é usado em calculate_hash e verify_file"""
+        class FakeBlake3:
+            AUTO = -1
+            def __init__(self, max_threads=1):
+                self._h = hashlib.sha256(b"blake3:")
+            def update(self, data):
+                self._h.update(data)
+            def hexdigest(self):
+                return self._h.hexdigest()
+        
+        monkeypatch.setattr(integrity, 'blake3', type("blake3", (), {"blake3": FakeBlake3}))
+        esperado = hashlib.sha256(b"blake3:" + sample_text_file.read_bytes()).hexdigest()
+        
+        assert IntegrityChecker.calculate_hash(sample_text_file, 'BLAKE3') == esperado
+        assert IntegrityChecker.verify_file(sample_text_file, esperado, 'blake3') is True
+    
+    def test_blake3_uses_update_mmap_when_available(self, sample_text_file, monkeypatch):
+        """Testa que calculate_blake3 delega a leitura ao update_mmap do pacote"""
+        caminhos = []
+        
+        class FakeBlake3:
+            AUTO = -1
+            def __init__(self, max_threads=1):
+                self.max_threads = max_threads
+            def update_mmap(self, path):
+                caminhos.append(path)
+            def hexdigest(self):
+                return "ab" * 32
+        
+        monkeypatch.setattr(integrity, 'blake3', type("blake3", (), {"blake3": FakeBlake3}))
+        
+        assert IntegrityChecker.calculate_hash(sample_text_file, 'blake3') == "ab" * 32
+        assert caminhos == [str(sample_text_file)]
+    
+    def test_blake3_nonexistent_file(self, tmp_path, monkeypatch):
+        """Testa arquivo inexistente com update_mmap"""
+        class FakeBlake3:
+            AUTO = -1
+            def __init__(self, max_threads=1):
+                pass
+            def update_mmap(self, path):
+                open(path, 'rb')
+        
+        monkeypatch.setattr(integrity, 'blake3', type("blake3", (), {"blake3": FakeBlake3}))
+        
+        assert IntegrityChecker.calculate_blake3(tmp_path / "nada.bin") is None
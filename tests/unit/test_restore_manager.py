@@ -7,7 +7,18 @@ import pytest
 from backup.restore.restore_manager import RestoreManager
 
 
-class FakeIndexEmpty:
+class FakeIndexBase:
+    def get_by_file(self, arquivo):
+        return next((b for b in self.get_all() if b['arquivo'] == arquivo), None)
+
+    def iter_all(self):
+        return iter(self.get_all())
+
+    def __len__(self):
+        return len(self.get_all())
+
+
+class FakeIndexEmpty(FakeIndexBase):
     def get_all(self):
         return []
 
@@ -18,7 +29,7 @@ class FakeIndexEmpty:
         return []
 
 
-class FakeIndexGrouped:
+class FakeIndexGrouped(FakeIndexBase):
     def __init__(self, backups):
         self._backups = backups
 
@@ -91,7 +102,7 @@ def test_restore_by_name_file_missing(tmp_path, capsys):
         'diretorio_origem': '/tmp/proj',
         'tipo_diretorio': 'generico'
     }
-    class Idx:
+    class Idx(FakeIndexBase):
         def get_all(self):
             return [b]
 
@@ -115,7 +126,7 @@ def test_restore_by_name_success(tmp_path, monkeypatch, capsys):
         'total_arquivos': 1
     }
 
-    class Idx:
+    class Idx(FakeIndexBase):
         def get_all(self):
             return [b]
 
@@ -153,21 +164,20 @@ def test_verify_backup_integrity(tmp_path, monkeypatch, capsys):
         'hash_md5': 'abc123'
     }
 
-    class Idx:
+    class Idx(FakeIndexBase):
         def get_all(self):
             return [b]
 
     idx = Idx()
-    (tmp_path / 'check.tar.gz').write_bytes(b'0' * 10)
+    (tmp_path / 'check.tar.gz').write_bytes(b'0' * 1000)  # Igual a tamanho_backup
 
     class FakeIntegrity:
         @staticmethod
-        def calculate_md5(path):
+        def calculate_hash(path, algorithm):
+            assert algorithm == 'md5'  # entrada antiga, só com hash_md5
             return 'abc123'
 
-    # verify_backup_integrity imports IntegrityChecker from backup.core.integrity inside the method,
-    # so patch the class on that module.
-    monkeypatch.setattr('backup.core.integrity.IntegrityChecker', FakeIntegrity)
+    monkeypatch.setattr('backup.restore.restore_manager.IntegrityChecker', FakeIntegrity)
 
     rm = RestoreManager(idx, tmp_path)
     res = rm.verify_backup_integrity('check.tar.gz')
@@ -178,11 +188,170 @@ def test_verify_backup_integrity(tmp_path, monkeypatch, capsys):
     # now test corrupted
     class FakeIntegrity2:
         @staticmethod
-        def calculate_md5(path):
+        def calculate_hash(path, algorithm):
             return 'dead'
 
-    monkeypatch.setattr('backup.core.integrity.IntegrityChecker', FakeIntegrity2)
+    monkeypatch.setattr('backup.restore.restore_manager.IntegrityChecker', FakeIntegrity2)
     res2 = rm.verify_backup_integrity('check.tar.gz')
     out2 = capsys.readouterr().out
     assert res2 is False
     assert 'Backup corrompido' in out2
+
+
+def test_verify_backup_integrity_uses_recorded_algorithm(tmp_path, monkeypatch, capsys):
+    b = {
+        'arquivo': 'check.tar.gz',
+        'nome_diretorio': 'proj',
+        'hash_algo': 'sha256',
+        'hash_digest': 'f00d'
+    }
+
+    class Idx(FakeIndexBase):
+        def get_all(self):
+            return [b]
+
+    (tmp_path / 'check.tar.gz').write_bytes(b'0' * 10)
+
+    calls = []
+
+    class FakeIntegrity:
+        @staticmethod
+        def calculate_hash(path, algorithm):
+            calls.append(algorithm)
+            return 'f00d'
+
+    monkeypatch.setattr('backup.restore.restore_manager.IntegrityChecker', FakeIntegrity)
+
+    rm = RestoreManager(Idx(), tmp_path)
+    assert rm.verify_backup_integrity('check.tar.gz') is True
+    assert calls == ['sha256']
+
+
+def test_verify_all_runs_in_parallel(tmp_path, monkeypatch, capsys):
+    import threading
+
+    backups = [
+        {'arquivo': f'b{i}.tar.gz', 'hash_algo': 'sha256', 'hash_digest': f'h{i}'}
+        for i in range(4)
+    ]
+    for b in backups:
+        (tmp_path / b['arquivo']).write_bytes(b'0')
+
+    class Idx(FakeIndexBase):
+        def get_all(self):
+            return list(backups)
+
+    threads = set()
+    barrier = threading.Barrier(2, timeout=5)
+
+    class FakeIntegrity:
+        @staticmethod
+        def calculate_hash(path, algorithm):
+            threads.add(threading.get_ident())
+            if path.name in ('b0.tar.gz', 'b1.tar.gz'):
+                barrier.wait()  # só passa se as duas rodarem ao mesmo tempo
+            return 'ruim' if path.name == 'b2.tar.gz' else 'h' + path.name[1]
+
+    monkeypatch.setattr('backup.restore.restore_manager.IntegrityChecker', FakeIntegrity)
+
+    rm = RestoreManager(Idx(), tmp_path)
+    res = rm.verify_all(max_workers=2)
+
+    assert list(res) == ['b0.tar.gz', 'b1.tar.gz', 'b2.tar.gz', 'b3.tar.gz']
+    assert res == {'b0.tar.gz': True, 'b1.tar.gz': True, 'b2.tar.gz': False, 'b3.tar.gz': True}
+    assert len(threads) == 2
+
+
+def test_verify_all_unknown_and_empty(tmp_path, capsys):
+    rm = RestoreManager(FakeIndexEmpty(), tmp_path)
+
+    assert rm.verify_all() == {}
+    assert rm.verify_all(['nope.tar.gz']) == {'nope.tar.gz': False}
+    assert 'não encontrado no índice' in capsys.readouterr().out
+
+
+def test_upgrade_hashes_rehashes_legacy_entries(tmp_path, capsys):
+    import hashlib
+    from backup.storage.index import BackupIndex
+
+    ok = b'conteudo integro'
+    (tmp_path / 'antigo.tar.gz').write_bytes(ok)
+    (tmp_path / 'corrompido.tar.gz').write_bytes(b'alterado')
+    (tmp_path / 'novo.tar.gz').write_bytes(b'novo')
+
+    index = BackupIndex(tmp_path / 'index.jsonl')
+    index.add_backup({'arquivo': 'antigo.tar.gz', 'hash_md5': hashlib.md5(ok).hexdigest()})
+    index.add_backup({'arquivo': 'corrompido.tar.gz', 'hash_md5': hashlib.md5(b'x').hexdigest()})
+    index.add_backup({'arquivo': 'novo.tar.gz', 'hash_algo': 'sha256', 'hash_digest': 'f00d'})
+
+    rm = RestoreManager(index, tmp_path)
+    assert rm.upgrade_hashes() == 1
+    assert 'MD5 não confere' in capsys.readouterr().out
+
+    entradas = {b['arquivo']: b for b in BackupIndex(tmp_path / 'index.jsonl').get_all()}
+    assert entradas['antigo.tar.gz']['hash_algo'] == 'sha256'
+    assert entradas['antigo.tar.gz']['hash_digest'] == hashlib.sha256(ok).hexdigest()
+    assert entradas['antigo.tar.gz']['hash_md5'] == hashlib.md5(ok).hexdigest()
+    assert 'hash_digest' not in entradas['corrompido.tar.gz']
+    assert entradas['novo.tar.gz']['hash_digest'] == 'f00d'
+
+    # Segunda execução não tem o que migrar
+    assert rm.upgrade_hashes() == 0
+    assert rm.verify_backup_integrity('antigo.tar.gz') is True
+
+
+def test_verify_size_mismatch_skips_hash(tmp_path, monkeypatch, capsys):
+    b = {
+        'arquivo': 'truncado.tar.gz',
+        'tamanho_backup': 1000,
+        'hash_algo': 'sha256',
+        'hash_digest': 'f00d'
+    }
+
+    class Idx(FakeIndexBase):
+        def get_all(self):
+            return [b]
+
+    (tmp_path / 'truncado.tar.gz').write_bytes(b'0' * 600)
+
+    class FakeIntegrity:
+        @staticmethod
+        def calculate_hash(path, algorithm):
+            raise AssertionError("hash calculado apesar do tamanho divergente")
+
+    monkeypatch.setattr('backup.restore.restore_manager.IntegrityChecker', FakeIntegrity)
+
+    rm = RestoreManager(Idx(), tmp_path)
+    assert rm.verify_backup_integrity('truncado.tar.gz') is False
+    assert 'Tamanho divergente' in capsys.readouterr().out
+
+
+def test_verify_unsupported_algorithm_fails_cleanly(tmp_path, capsys):
+    b = {'arquivo': 'b.tar.gz', 'hash_algo': 'algoritmo-inexistente', 'hash_digest': 'f00d'}
+
+    class Idx(FakeIndexBase):
+        def get_all(self):
+            return [b]
+
+    (tmp_path / 'b.tar.gz').write_bytes(b'0')
+
+    rm = RestoreManager(Idx(), tmp_path)
+    assert rm.verify_all() == {'b.tar.gz': False}
+    assert 'Não foi possível verificar b.tar.gz' in capsys.readouterr().out
+
+
+def test_verify_stat_error_fails_cleanly(tmp_path, monkeypatch, capsys):
+    b = {'arquivo': 'b.tar.gz', 'hash_algo': 'sha256', 'hash_digest': 'f00d'}
+
+    class Idx(FakeIndexBase):
+        def get_all(self):
+            return [b]
+
+    def stat_negado(self, *args, **kwargs):
+        raise PermissionError(13, 'Permissão negada')
+
+    monkeypatch.setattr(Path, 'stat', stat_negado)
+
+    rm = RestoreManager(Idx(), tmp_path)
+    assert rm.verify_all() == {'b.tar.gz': False}
+    assert 'Erro ao acessar' in capsys.readouterr().out
@@ -5,6 +5,7 @@ Utilitários - Funções auxiliares para o sistema de backup
 from backup.utils.formatters import (
     format_bytes,
     format_date,
+    parse_iso_date,
     format_compression_rate,
     format_progress,
     format_number,
@@ -12,6 +13,8 @@ from backup.utils.formatters import (
 )
 
 from backup.utils.file_utils import (
+    DirectoryScan,
+    scan_directory,
     calculate_directory_size,
     detect_directory_type,
     get_directory_info,
@@ -20,19 +23,22 @@ from backup.utils.file_utils import (
     get_file_size
 )
 
-__all__ = [
+__all__ = (
     # Formatters
     'format_bytes',
     'format_date',
+    'parse_iso_date',
     'format_compression_rate',
     'format_progress',
     'format_number',
     'truncate_string',
     # File Utils
+    'DirectoryScan',
+    'scan_directory',
     'calculate_directory_size',
     'detect_directory_type',
     'get_directory_info',
     'ensure_directory',
     'safe_file_remove',
     'get_file_size'
-]
+)
@@ -4,43 +4,139 @@ Funções utilitárias para operações com arquivos e diretórios
 """
 
 import os
+import stat
 from pathlib import Path
 from datetime import datetime
-from typing import Tuple, Optional, Dict
+from typing import Tuple, Optional, Dict, List
 
 
-def calculate_directory_size(path: Path, exclusion_filter=None) -> Tuple[int, int]:
+# Extensões de formatos já comprimidos: recomprimir gasta CPU sem ganho
+INCOMPRESSIBLE_EXTENSIONS = frozenset({
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic',
+    '.mp3', '.ogg', '.flac', '.m4a', '.mp4', '.mkv', '.avi', '.mov', '.webm',
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.zst', '.7z', '.rar',
+    '.jar', '.apk', '.whl', '.docx', '.xlsx', '.pptx', '.odt',
+    '.iso', '.dmg', '.img', '.pdf',
+})
+
+
+class DirectoryScan:
+    """Resultado de uma varredura única do diretório de origem"""
+    
+    def __init__(self):
+        # (caminho, arcname, stat) de cada arquivo incluído. O arcname é
+        # relativo ao pai da origem, preservando o nome da pasta; o stat é o
+        # do próprio item (links simbólicos não são seguidos), como no tar.
+        self.files: List[Tuple[str, str, os.stat_result]] = []
+        self.total_size = 0
+        self.incompressible_size = 0  # Bytes em INCOMPRESSIBLE_EXTENSIONS
+        self.excluded_files = 0
+        self.excluded_dirs = 0
+    
+    @property
+    def total_files(self) -> int:
+        """Número de arquivos incluídos"""
+        return len(self.files)
+    
+    @property
+    def incompressible_ratio(self) -> float:
+        """Fração do tamanho total em formatos já comprimidos (0-1)"""
+        if self.total_size == 0:
+            return 0.0
+        return self.incompressible_size / self.total_size
+
+
+def scan_directory(path: Path, exclusion_filter=None) -> DirectoryScan:
     """
-    Calcula o tamanho total de um diretório
+    Percorre um diretório uma única vez coletando os arquivos a arquivar
+    
+    O resultado serve tanto para a estimativa de tamanho quanto para os
+    compressores, evitando percorrer a árvore duas vezes.
     
     Args:
         path: Caminho do diretório
         exclusion_filter: Filtro de exclusão (opcional)
         
     Returns:
-        Tupla (tamanho_total_bytes, total_arquivos)
+        DirectoryScan com arquivos, tamanho total e contagem de exclusões
     """
-    total_size = 0
-    total_files = 0
+    scan = DirectoryScan()
+    source = os.fspath(path)
     
-    for root, dirs, files in os.walk(path):
-        # Remove diretórios excluídos se houver filtro
-        if exclusion_filter:
-            dirs[:] = [d for d in dirs if not exclusion_filter.should_exclude(d)]
+    # Nome e caminho relativo já saem prontos do percurso: should_exclude_entry
+    # evita normalizá-los e dividi-los de novo a cada entrada
+    exclude = None
+    if exclusion_filter is not None:
+        exclude = getattr(exclusion_filter, 'should_exclude_entry', None)
+        if exclude is None:
+            exclude = lambda name, rel_path: exclusion_filter.should_exclude(rel_path)
+    arc_base = os.path.basename(os.path.abspath(source))
+    
+    # Percurso em profundidade com os.scandir: o DirEntry já traz o tipo
+    # e guarda o stat(), evitando syscalls extras por arquivo
+    # rel_dir: caminho relativo à origem, usado pelos padrões com '/'
+    pending = [(source, arc_base, "")]
+    while pending:
+        dir_path, arc_dir, rel_dir = pending.pop()
+        try:
+            with os.scandir(dir_path) as it:
+                entries = list(it)
+        except OSError:
+            continue
         
-        for arquivo in files:
+        subdirs = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            
+            if is_dir:
+                # Diretório excluído nunca é listado: a subárvore inteira é podada
+                if exclude is not None and exclude(entry.name, rel_path):
+                    scan.excluded_dirs += 1
+                # Como os.walk, não segue links simbólicos para diretórios
+                elif not entry.is_symlink():
+                    subdirs.append((entry.path, os.path.join(arc_dir, entry.name), rel_path))
+                continue
+            
             # Verifica exclusão de arquivo se houver filtro
-            if exclusion_filter and exclusion_filter.should_exclude(arquivo):
+            if exclude is not None and exclude(entry.name, rel_path):
+                scan.excluded_files += 1
                 continue
-                
+            
             try:
-                caminho_arquivo = Path(root) / arquivo
-                total_size += caminho_arquivo.stat().st_size
-                total_files += 1
-            except (OSError, IOError):
+                info = entry.stat(follow_symlinks=False)
+            except OSError:
+                scan.excluded_files += 1
                 continue
-                
-    return total_size, total_files
+            
+            scan.files.append((entry.path, os.path.join(arc_dir, entry.name), info))
+            scan.total_size += info.st_size
+            if os.path.splitext(entry.name)[1].lower() in INCOMPRESSIBLE_EXTENSIONS:
+                scan.incompressible_size += info.st_size
+        
+        # Empilha invertido para visitar subdiretórios na ordem listada
+        pending.extend(reversed(subdirs))
+    
+    return scan
+
+
+def calculate_directory_size(path: Path, exclusion_filter=None) -> Tuple[int, int]:
+    """
+    Calcula o tamanho total de um diretório
+    
+    Args:
+        path: Caminho do diretório
+        exclusion_filter: Filtro de exclusão (opcional)
+        
+    Returns:
+        Tupla (tamanho_total_bytes, total_arquivos)
+    """
+    scan = scan_directory(path, exclusion_filter)
+    return scan.total_size, scan.total_files
 
 
 def detect_directory_type(path: Path) -> str:
@@ -53,17 +149,21 @@ def detect_directory_type(path: Path) -> str:
     Returns:
         Tipo do diretório (nodejs, python, java, git, generico)
     """
-    if not path.exists() or not path.is_dir():
+    # Uma listagem do diretório no lugar de um stat por arquivo característico
+    try:
+        with os.scandir(path) as it:
+            nomes = {entry.name for entry in it}
+    except OSError:  # Inexistente ou não é diretório
         return "generico"
     
     # Detecta tipo baseado em arquivos característicos
-    if (path / "package.json").exists():
+    if "package.json" in nomes:
         return "nodejs"
-    elif (path / "requirements.txt").exists() or (path / "setup.py").exists():
+    elif "requirements.txt" in nomes or "setup.py" in nomes:
         return "python"
-    elif (path / "pom.xml").exists():
+    elif "pom.xml" in nomes:
         return "java"
-    elif (path / ".git").exists():
+    elif ".git" in nomes:
         return "git"
     
     return "generico"
@@ -79,20 +179,20 @@ def get_directory_info(path: Path) -> Optional[Dict]:
     Returns:
         Dicionário com informações ou None se não existir
     """
-    if not path.exists():
-        return None
-    
+    # Um único stat responde existência, tipo, mtime e tamanho
     try:
         stat_info = path.stat()
-        return {
-            "nome": path.name,
-            "caminho": str(path.absolute()),
-            "tipo": detect_directory_type(path),
-            "ultima_modificacao": datetime.fromtimestamp(stat_info.st_mtime).isoformat(),
-            "tamanho": stat_info.st_size if path.is_file() else None
-        }
-    except Exception:
+    except OSError:
         return None
+    
+    is_dir = stat.S_ISDIR(stat_info.st_mode)
+    return {
+        "nome": path.name,
+        "caminho": str(path.absolute()),
+        "tipo": detect_directory_type(path) if is_dir else "generico",
+        "ultima_modificacao": datetime.fromtimestamp(stat_info.st_mtime).isoformat(),
+        "tamanho": stat_info.st_size if stat.S_ISREG(stat_info.st_mode) else None
+    }
 
 
 def ensure_directory(path: Path) -> Path:
@@ -4,9 +4,13 @@ Funções utilitárias para formatação de dados (tamanhos, datas, etc)
 """
 
 from datetime import datetime
+from functools import lru_cache
 from typing import Union
 
 
+BYTE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB', 'PB')
+
+
 def format_bytes(bytes_size: Union[int, float]) -> str:
     """
     Formata tamanho em bytes para formato legível
@@ -17,11 +21,10 @@ def format_bytes(bytes_size: Union[int, float]) -> str:
     Returns:
         String formatada (ex: "45.2 MB")
     """
-    for unidade in ['B', 'KB', 'MB', 'GB', 'TB']:
-        if bytes_size < 1024.0:
-            return f"{bytes_size:.1f} {unidade}"
-        bytes_size /= 1024.0
-    return f"{bytes_size:.1f} PB"
+    # Cada unidade são 10 bits: o índice sai direto do bit_length, sem laço
+    inteiro = int(bytes_size)
+    unidade = min((inteiro.bit_length() - 1) // 10, 5) if inteiro > 0 else 0
+    return f"{bytes_size / (1 << (unidade * 10)):.1f} {BYTE_UNITS[unidade]}"
 
 
 def format_date(date: datetime, format_string: str = "%d/%m/%Y %H:%M:%S") -> str:
@@ -38,6 +41,24 @@ def format_date(date: datetime, format_string: str = "%d/%m/%Y %H:%M:%S") -> str
     return date.strftime(format_string)
 
 
+@lru_cache(maxsize=4096)
+def parse_iso_date(iso_string: str) -> datetime:
+    """
+    Converte data ISO 8601 (como 'data_criacao' do índice) em datetime
+    
+    Memorizada pela string: listar, restaurar e limpar relêem as mesmas
+    datas do índice, que são convertidas uma vez só (datetime é imutável,
+    então o objeto pode ser compartilhado).
+    
+    Args:
+        iso_string: Data no formato ISO 8601
+        
+    Returns:
+        Objeto datetime
+    """
+    return datetime.fromisoformat(iso_string)
+
+
 def format_compression_rate(original_size: int, compressed_size: int) -> float:
     """
     Calcula taxa de compressão em percentual